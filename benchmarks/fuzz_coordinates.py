@@ -0,0 +1,50 @@
+"""Benchmark for the coordinate fuzzer.
+
+Compares the old per-call geopy geodesic path against the numpy fuzzer, both one point at a time (how
+Location.serialize calls it) and as a batch.
+
+Run with:
+    python -m benchmarks.fuzz_coordinates
+"""
+import random
+import timeit
+
+import numpy as np
+from geopy.distance import geodesic
+
+from mnb_backend.addresses.model_helpers import fuzz_coordinates, fuzz_coordinates_batch
+
+POINT_COUNT = 10000
+
+
+def geodesic_fuzz_coordinates(y, x, distance_in_meters=200):
+    """ The original geopy based fuzzer """
+
+    random_angle = random.uniform(0, 360)
+    random_distance = random.uniform(0, distance_in_meters)
+    new_point = geodesic(kilometers=random_distance / 1000).destination((y, x), random_angle)
+
+    return new_point.longitude, new_point.latitude
+
+
+def main():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(25, 49, POINT_COUNT)
+    lons = rng.uniform(-124, -67, POINT_COUNT)
+    seeds = np.arange(POINT_COUNT)
+    points = list(zip(lats.tolist(), lons.tolist(), seeds.tolist()))
+
+    timings = {
+        "geopy geodesic, per point": lambda: [geodesic_fuzz_coordinates(lat, lon) for lat, lon, _ in points],
+        "fuzz_coordinates, per point": lambda: [fuzz_coordinates(lat, lon, seed=seed) for lat, lon, seed in points],
+        "fuzz_coordinates_batch": lambda: fuzz_coordinates_batch(lats, lons, seeds),
+    }
+
+    print(f"fuzzing {POINT_COUNT} points")
+    for name, func in timings.items():
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:<28} {best * 1000:10.2f} ms total {best / POINT_COUNT * 1e6:10.3f} us/point")
+
+
+if __name__ == '__main__':
+    main()
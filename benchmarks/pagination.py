@@ -0,0 +1,95 @@
+"""Benchmark for keyset pagination of list endpoints.
+
+Seeds listing_images with a million rows by default, then fetches pages of GET /api/listing_images/ at increasing
+depths with a cursor, next to the same page fetched with OFFSET, and reports p50 latency for each. Keyset pages
+should take the same time at every depth, OFFSET pages grow with the depth.
+
+The seeding step deletes every row in the database it runs against, so point it at the test database:
+    FLASK_DEBUG=test python -m benchmarks.pagination --seed
+    FLASK_DEBUG=test python -m benchmarks.pagination            # re-run against the already seeded data
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.pagination import encode_cursor
+from mnb_backend.test_setup_helpers import delete_all_tables
+
+DEPTHS = [0, 1_000, 10_000, 100_000, 500_000, 999_000]
+
+
+def seed(row_count):
+    """ Replaces the database contents with row_count listing_images """
+
+    delete_all_tables(None)
+    db.session.execute(text("INSERT INTO listing_images (image_url) "
+                            "SELECT 'https://images.example.com/' || n FROM generate_series(1, :count) AS n"),
+                       {"count": row_count})
+    db.session.commit()
+
+    db.session.execute(text("ANALYZE listing_images"))
+    db.session.commit()
+
+
+def time_ms(fetch, rounds):
+    """ Returns the p50 of rounds calls of fetch, in milliseconds """
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def run(rounds, limit):
+    """ Fetches a page at every depth in DEPTHS with a cursor and with OFFSET and prints their p50 latency """
+
+    row_count = db.session.scalar(select(func.count(ListingImage.id)))
+    first_id = db.session.scalar(select(func.min(ListingImage.id)))
+    print(f"{row_count} listing_images, pages of {limit}")
+    print(f"{'depth':>8} {'cursor ms':>10} {'offset ms':>10}")
+
+    with app.test_client() as client:
+        for depth in DEPTHS:
+            if depth >= row_count:
+                continue
+
+            query_string = {"limit": limit}
+            if depth:
+                # ids are contiguous after seeding, so the row before the page has id first_id + depth - 1
+                query_string["cursor"] = encode_cursor([first_id + depth - 1])
+
+            def fetch_with_cursor():
+                response = client.get("/api/listing_images/", query_string=query_string)
+                assert response.status_code == 200, response.get_json()
+
+            def fetch_with_offset():
+                db.session.scalars(select(ListingImage).order_by(ListingImage.id).offset(depth).limit(limit)).all()
+
+            print(f"{depth:>8} {time_ms(fetch_with_cursor, rounds):10.2f} {time_ms(fetch_with_offset, rounds):10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="wipe the database and seed it before running")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.seed:
+        db.create_all()
+        seed(args.rows)
+
+    run(args.rounds, args.limit)
+
+
+if __name__ == '__main__':
+    main()
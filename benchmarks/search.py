@@ -0,0 +1,155 @@
+"""Benchmark for GET /api/searches/.
+
+Seeds a dataset of listings (100k by default) spread over a few hundred owners in different cities, then replays a
+mix of searches through the test client and reports the number of queries per request and p50/p95 latency.
+
+The seeding step deletes every row in the database it runs against, so point it at the test database:
+    FLASK_DEBUG=test python -m benchmarks.search --seed
+    FLASK_DEBUG=test python -m benchmarks.search            # re-run against the already seeded data
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import insert, select
+
+from mnb_backend import app
+from mnb_backend.addresses.models import Address, City, Location, State, ZipCode
+from mnb_backend.addresses.states import states
+from mnb_backend.database import db
+from mnb_backend.enums import ListingStatusEnum, RackActivityTypeEnum, RackMountTypeEnum, UserStatusEnums
+from mnb_backend.listings.models import Listing
+from mnb_backend.test_setup_helpers import count_queries, delete_all_tables
+from mnb_backend.users.models import User
+
+CITIES = [
+    ("Hercules", "CA", "94547", 38.0172, -122.2886),
+    ("Oakland", "CA", "94612", 37.8044, -122.2712),
+    ("Sacramento", "CA", "95814", 38.5816, -121.4944),
+    ("Tucson", "AZ", "85705", 32.2226, -110.9747),
+    ("Denver", "CO", "80202", 39.7392, -104.9903),
+    ("Seattle", "WA", "98101", 47.6062, -122.3321),
+]
+
+TITLE_WORDS = ["Large", "Small", "Cargo", "Basket", "Box", "Bike", "Hitch", "Roof", "Ski", "Snowboard", "Rack",
+               "Carrier", "Thule", "Yakima", "Kuat", "Two", "Four"]
+
+SEARCHES = [
+    {},
+    {"title": "cargo"},
+    {"title": "ski rack"},
+    {"mount_type": "roof", "activity_type": "cargo"},
+    {"min_price": 500, "max_price": 1500},
+    {"city": "Oakland"},
+    {"state": "CA", "title": "bike"},
+    {"zipcode": "85705", "mount_type": "hitch"},
+    {"latitude": 37.8, "longitude": -122.27, "radius": 25},
+    {"latitude": 39.7, "longitude": -104.99, "radius": 10, "activity_type": "skissnowboard"},
+]
+
+
+def seed(listing_count, owner_count):
+    """ Replaces the database contents with owners spread over CITIES and listing_count listings """
+
+    delete_all_tables(None)
+    rng = random.Random(0)
+
+    for state_data in states:
+        db.session.add(State(state_name=state_data['name'], state_abbreviation=state_data['abbreviation']))
+    db.session.commit()
+
+    city_rows = []
+    for city_name, state_abbreviation, code, lat, lon in CITIES:
+        city = City(city_name=city_name)
+        zipcode = ZipCode(code=code)
+        db.session.add_all([city, zipcode])
+        db.session.flush()
+        state = State.query.filter(State.state_abbreviation == state_abbreviation).first()
+        state.city_uid = city.id
+        city_rows.append((city.id, zipcode.id, lat, lon))
+    db.session.commit()
+
+    user_ids = db.session.scalars(insert(User).returning(User.id), [{
+        "email": f"bench{i}@email.com",
+        "password": "$2b$12$AZH7virni5jlTTiGgEg4zu3lSvAw68qVEfSIOjJ3RqtbJbdW/Oi5q",
+        "status": UserStatusEnums.ACTIVE,
+        "firstname": f"bench{i}",
+        "lastname": "user",
+        "about_me": "benchmark user",
+    } for i in range(owner_count)]).all()
+
+    for i, user_id in enumerate(user_ids):
+        city_id, zipcode_id, lat, lon = city_rows[i % len(city_rows)]
+        address_id = db.session.scalar(insert(Address).returning(Address.id).values(
+            user_id=user_id, street_address=f"{i} Bench St", city_uid=city_id, zipcode_uid=zipcode_id))
+        db.session.execute(insert(Location).values(
+            address_id=address_id,
+            point=f"SRID=4326;POINT({lon + rng.uniform(-0.2, 0.2)} {lat + rng.uniform(-0.2, 0.2)})"))
+    db.session.commit()
+
+    batch = []
+    for i in range(listing_count):
+        batch.append({
+            "owner_id": rng.choice(user_ids),
+            "title": " ".join(rng.sample(TITLE_WORDS, 3)),
+            "mount_type": rng.choice(list(RackMountTypeEnum)),
+            "activity_type": rng.choice(list(RackActivityTypeEnum)),
+            "rate_price": rng.randrange(100, 3000, 50),
+            "status": ListingStatusEnum.AVAILABLE,
+            "record_complete": True,
+        })
+        if len(batch) == 5000:
+            db.session.execute(insert(Listing), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Listing), batch)
+    db.session.commit()
+
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+
+
+def run(rounds):
+    """ Replays SEARCHES rounds times and prints query counts and latency per search """
+
+    listing_count = db.session.scalar(select(db.func.count(Listing.id)))
+    print(f"{listing_count} listings")
+    print(f"{'search':<75} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8}")
+
+    with app.test_client() as client:
+        for query_string in SEARCHES:
+            timings = []
+            query_counts = set()
+            for _ in range(rounds):
+                db.session.expire_all()
+                with count_queries() as statements:
+                    start = time.perf_counter()
+                    response = client.get("/api/searches/", query_string=query_string)
+                    timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.get_json()
+                query_counts.add(len(statements))
+
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            queries = "/".join(str(count) for count in sorted(query_counts))
+            print(f"{str(query_string):<75} {queries:>7} {p50:8.2f} {p95:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="wipe the database and seed it before running")
+    parser.add_argument("--listings", type=int, default=100000)
+    parser.add_argument("--owners", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.seed:
+        db.create_all()
+        seed(args.listings, args.owners)
+
+    run(args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark for serializing listings.
+
+Builds 10k listings in memory, each with an owner, address, city, zipcode and location, the rows a listings response
+embeds, with every attribute set like rows loaded from the database. Then reports the throughput of serializing them
+with Listing.serialize() and of encoding the result with Flask's default JSON provider and with the orjson provider
+the app uses. Doesn't touch the database:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --listings 100000 --rounds 5
+"""
+import argparse
+import random
+import statistics
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from mnb_backend import app
+from mnb_backend.addresses.models import Address, City, Location, State, ZipCode
+from mnb_backend.enums import ListingStatusEnum, LocationStatusEnum, RackActivityTypeEnum, RackMountTypeEnum, \
+    UserStatusEnums
+from mnb_backend.json_provider import OrjsonProvider
+from mnb_backend.listings.models import Listing
+from mnb_backend.users.models import User
+
+
+def make_listings(count, owner_count):
+    """ Returns count transient listings spread over owner_count owners """
+
+    state = State(id=1, state_abbreviation="CA", state_name="California")
+    city = City(id=1, city_name="Hercules", state=state)
+    zipcode = ZipCode(id=1, code="94547")
+
+    owners = []
+    for owner_id in range(1, owner_count + 1):
+        location = Location(id=owner_id, point_x=-122.2886 + random.uniform(-0.1, 0.1),
+                            point_y=38.0172 + random.uniform(-0.1, 0.1), status=LocationStatusEnum.GEOCODED)
+        address = Address(id=owner_id, user_id=owner_id, street_address=f"{owner_id} Main St", apt_number=None,
+                          city=city, zipcode=zipcode, location=location)
+        owners.append(User(id=owner_id, status=UserStatusEnums.ACTIVE, email=f"u{owner_id}@email.com",
+                           firstname="Owner", lastname=str(owner_id), about_me="I lend racks.", is_admin=False,
+                           user_rating=5, preferred_trade_location=None, profile_image=None,
+                           address=address))
+
+    return [
+        Listing(id=listing_id, owner=owners[listing_id % owner_count], owner_id=listing_id % owner_count + 1,
+                primary_image_url=f"https://images.example.com/{listing_id}", title=f"Rack {listing_id}",
+                mount_type=RackMountTypeEnum.ROOF, activity_type=RackActivityTypeEnum.BICYCLE,
+                rate_price=random.randint(10, 100), status=ListingStatusEnum.AVAILABLE)
+        for listing_id in range(1, count + 1)
+    ]
+
+
+def time_ms(work, rounds):
+    """ Returns the p50 of rounds calls of work, in milliseconds """
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        work()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def run(count, owner_count, rounds):
+    """ Prints the p50 time and throughput of serializing and encoding count listings """
+
+    listings = make_listings(count, owner_count)
+    serialized = [listing.serialize() for listing in listings]
+
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+    results = [
+        ("serialize()", lambda: [listing.serialize() for listing in listings]),
+        ("encode, default provider", lambda: default_provider.response(listings=serialized)),
+        ("encode, orjson provider", lambda: orjson_provider.response(listings=serialized)),
+    ]
+
+    print(f"{count} listings, {owner_count} owners, p50 of {rounds} rounds")
+    print(f"{'':<26} {'ms':>10} {'listings/s':>12}")
+    with app.app_context():
+        for name, work in results:
+            elapsed = time_ms(work, rounds)
+            print(f"{name:<26} {elapsed:10.2f} {count / elapsed * 1000:12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=10_000)
+    parser.add_argument("--owners", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.listings, args.owners, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
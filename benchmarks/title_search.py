@@ -0,0 +1,57 @@
+"""Benchmark for listing title search: the old ILIKE '%...%' filter against the full-text/trigram search.
+
+Uses the dataset seeded by benchmarks.search, so seed that first:
+    FLASK_DEBUG=test python -m benchmarks.search --seed
+    FLASK_DEBUG=test python -m benchmarks.title_search
+"""
+import statistics
+import time
+
+from sqlalchemy import select
+
+from mnb_backend.database import db
+from mnb_backend.listings.models import Listing
+from mnb_backend.searches.search_engine import title_search_clauses
+
+TITLES = ["cargo", "ski rack", "bask", "yakima", "snowbord", "thule carrier"]
+ROUNDS = 30
+
+
+def time_statement(stmt):
+    """ Runs stmt ROUNDS times, returns (row count, p50 ms, p95 ms) """
+
+    timings = []
+    row_count = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        row_count = len(db.session.execute(stmt).all())
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return row_count, statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
+
+
+def get_plan(stmt):
+    """ Returns the top line of the query plan for stmt """
+
+    compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+    return db.session.execute(db.text(f"EXPLAIN {compiled}")).scalars().first()
+
+
+def main():
+    listing_count = db.session.scalar(select(db.func.count(Listing.id)))
+    print(f"{listing_count} listings, best 20 of each search")
+    print(f"{'title':<15} {'path':<10} {'rows':>6} {'p50 ms':>8} {'p95 ms':>8}  plan")
+
+    for title in TITLES:
+        title_match, rank = title_search_clauses(title)
+        paths = {
+            "ilike": select(Listing.id).where(Listing.title.ilike(f"%{title}%")).order_by(Listing.id).limit(20),
+            "fts": select(Listing.id).where(title_match).order_by(rank.desc(), Listing.id.desc()).limit(20),
+        }
+        for path, stmt in paths.items():
+            row_count, p50, p95 = time_statement(stmt)
+            print(f"{title:<15} {path:<10} {row_count:>6} {p50:8.2f} {p95:8.2f}  {get_plan(stmt)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+-- Full-text and trigram search on listings.title.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0001_listing_title_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE listings
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_listings_search_vector ON listings USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_listings_title_trgm ON listings USING gin (title gin_trgm_ops);
@@ -0,0 +1,11 @@
+-- Geography copy of locations.point with a GiST index, used by ST_DWithin radius searches and <-> KNN ordering.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0002_location_geography_index.sql
+
+ALTER TABLE locations
+    ADD COLUMN IF NOT EXISTS geog geography(POINT, 4326)
+        GENERATED ALWAYS AS (point::geography) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_locations_geog ON locations USING gist (geog);
+
+ANALYZE locations;
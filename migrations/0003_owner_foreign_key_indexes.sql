@@ -0,0 +1,10 @@
+-- Indexes on the foreign keys the nearby search joins through (location -> address -> owner -> listings).
+-- New databases get these from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0003_owner_foreign_key_indexes.sql
+
+CREATE INDEX IF NOT EXISTS ix_listings_owner_id ON listings (owner_id);
+
+CREATE INDEX IF NOT EXISTS ix_addresses_user_id ON addresses (user_id);
+
+ANALYZE listings;
+ANALYZE addresses;
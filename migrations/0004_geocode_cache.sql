@@ -0,0 +1,12 @@
+-- Persistent geocoding cache keyed by normalized address, see mnb_backend/geocoding.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0004_geocode_cache.sql
+
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    id SERIAL PRIMARY KEY,
+    address_key TEXT NOT NULL UNIQUE,
+    latitude FLOAT NOT NULL,
+    longitude FLOAT NOT NULL,
+    provider TEXT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
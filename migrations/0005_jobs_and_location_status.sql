@@ -0,0 +1,31 @@
+-- Background job queue and geocoding status of locations, see mnb_backend/workers.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0005_jobs_and_location_status.sql
+
+DO $$ BEGIN
+    CREATE TYPE job_status_enum AS ENUM ('PENDING', 'RUNNING', 'DONE', 'FAILED');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status job_status_enum NOT NULL,
+    attempts INTEGER NOT NULL,
+    max_attempts INTEGER NOT NULL,
+    run_after TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    locked_at TIMESTAMP WITHOUT TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after);
+
+DO $$ BEGIN
+    CREATE TYPE location_status_enum AS ENUM ('PENDING', 'GEOCODED', 'FAILED');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+ALTER TABLE locations
+    ADD COLUMN IF NOT EXISTS status location_status_enum NOT NULL DEFAULT 'GEOCODED';
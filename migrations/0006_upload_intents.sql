@@ -0,0 +1,29 @@
+-- Direct-to-storage upload intents, see mnb_backend/uploads.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0006_upload_intents.sql
+
+DO $$ BEGIN
+    CREATE TYPE upload_purpose_enum AS ENUM ('LISTING_IMAGE', 'USER_IMAGE');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE upload_intent_status_enum AS ENUM ('PENDING', 'CONFIRMED');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS upload_intents (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    listing_id INTEGER REFERENCES listings (id) ON DELETE CASCADE,
+    purpose upload_purpose_enum NOT NULL,
+    status upload_intent_status_enum NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    content_type TEXT NOT NULL,
+    max_bytes INTEGER NOT NULL,
+    expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_upload_intents_user_id ON upload_intents (user_id);
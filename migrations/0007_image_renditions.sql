@@ -0,0 +1,8 @@
+-- Rendition urls on image rows, see mnb_backend/images.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0007_image_renditions.sql
+-- Existing images get their renditions from the reprocess command once it is available, until then they are
+-- served at their original size.
+
+ALTER TABLE listing_images ADD COLUMN IF NOT EXISTS renditions JSONB;
+ALTER TABLE user_images ADD COLUMN IF NOT EXISTS renditions JSONB;
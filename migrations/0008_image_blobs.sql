@@ -0,0 +1,25 @@
+-- Content-addressed image originals shared by listing and user images, see mnb_backend/images/blobs.py.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0008_image_blobs.sql
+-- Existing images keep their uuid keys and no blob, they are deleted from storage the way they were before.
+
+CREATE TABLE IF NOT EXISTS image_blobs (
+    id SERIAL PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    key TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL,
+    renditions JSONB,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+
+ALTER TABLE listing_images ADD COLUMN IF NOT EXISTS blob_id INTEGER REFERENCES image_blobs (id);
+ALTER TABLE user_images ADD COLUMN IF NOT EXISTS blob_id INTEGER REFERENCES image_blobs (id);
+
+CREATE INDEX IF NOT EXISTS ix_listing_images_blob_id ON listing_images (blob_id);
+CREATE INDEX IF NOT EXISTS ix_user_images_blob_id ON user_images (blob_id);
+
+-- renditions cleared with None were stored as a JSON null, make them SQL NULL so the reprocess command finds them
+UPDATE listing_images SET renditions = NULL WHERE renditions = 'null'::jsonb;
+UPDATE user_images SET renditions = NULL WHERE renditions = 'null'::jsonb;
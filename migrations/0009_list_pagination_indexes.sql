@@ -0,0 +1,9 @@
+-- Indexes behind the keyset pagination of the reservation and message lists.
+-- New databases get these from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0009_list_pagination_indexes.sql
+
+CREATE INDEX IF NOT EXISTS ix_reservations_renter_id_start_date ON reservations (renter_id, start_date, id);
+
+CREATE INDEX IF NOT EXISTS ix_messages_reservation_uid_timestamp ON messages (reservation_uid, timestamp, message_uid);
+CREATE INDEX IF NOT EXISTS ix_messages_sender_uid_timestamp ON messages (sender_uid, timestamp, message_uid);
+CREATE INDEX IF NOT EXISTS ix_messages_recipient_uid_timestamp ON messages (recipient_uid, timestamp, message_uid);
@@ -0,0 +1,5 @@
+-- Index behind the upcoming and past reservation lists of a listing, which range scan it from now.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0010_reservation_listing_start_date_index.sql
+
+CREATE INDEX IF NOT EXISTS ix_reservations_listing_uid_start_date ON reservations (listing_uid, start_date, id);
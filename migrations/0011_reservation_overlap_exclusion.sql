@@ -0,0 +1,19 @@
+-- Keeps active reservations of a listing from overlapping: a generated tsrange period column and a GiST exclusion
+-- constraint on (listing_uid, period) for pending, accepted and in progress reservations.
+-- New databases get these from db.create_all(); run this once against databases created before it. Adding the
+-- constraint fails if the table already holds overlapping active reservations, decline or cancel those first.
+--   psql "$DATABASE_URL" -f migrations/0011_reservation_overlap_exclusion.sql
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE reservations
+    ADD COLUMN IF NOT EXISTS period tsrange GENERATED ALWAYS AS (tsrange(start_date, end_date, '[)')) STORED;
+
+DO $$ BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'reservations_listing_uid_period_excl') THEN
+        ALTER TABLE reservations
+            ADD CONSTRAINT reservations_listing_uid_period_excl
+            EXCLUDE USING gist (listing_uid WITH =, period WITH &&)
+            WHERE (status IN ('PENDING', 'ACCEPTED', 'IN_PROGRESS'));
+    END IF;
+END $$;
@@ -0,0 +1,11 @@
+-- Booked days of each listing as a day bitmap, read by GET /api/listings/<id>/availability.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0012_listing_calendars.sql
+-- A listing's calendar is saved the first time one of its reservations changes, reads build it until then.
+
+CREATE TABLE IF NOT EXISTS listing_calendars (
+    listing_id INTEGER PRIMARY KEY REFERENCES listings (id) ON DELETE CASCADE,
+    first_day DATE,
+    days BYTEA NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
@@ -0,0 +1,14 @@
+-- Row versions behind the ETag and Last-Modified headers, see mnb_backend/conditional.py.
+-- New databases get these from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0013_updated_at.sql
+-- Existing rows start out modified now. The default is only there to fill them in, the app sets updated_at itself.
+
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE reservations ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE addresses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc');
+
+ALTER TABLE listings ALTER COLUMN updated_at DROP DEFAULT;
+ALTER TABLE users ALTER COLUMN updated_at DROP DEFAULT;
+ALTER TABLE reservations ALTER COLUMN updated_at DROP DEFAULT;
+ALTER TABLE addresses ALTER COLUMN updated_at DROP DEFAULT;
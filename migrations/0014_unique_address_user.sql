@@ -0,0 +1,19 @@
+-- One address per user, searches join listings to their owner's address and would return a listing once per address.
+-- New databases get this from db.create_all(); run this once against databases created before it.
+--   psql "$DATABASE_URL" -f migrations/0014_unique_address_user.sql
+-- Older addresses of a user with several are detached, as the app does when a user's address is replaced.
+
+UPDATE addresses
+SET user_id = NULL, updated_at = now() AT TIME ZONE 'utc'
+WHERE user_id IS NOT NULL
+  AND id NOT IN (SELECT max(id) FROM addresses WHERE user_id IS NOT NULL GROUP BY user_id);
+
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+        WHERE pg_class.relname = 'ix_addresses_user_id' AND pg_index.indisunique
+    ) THEN
+        DROP INDEX IF EXISTS ix_addresses_user_id;
+        CREATE UNIQUE INDEX ix_addresses_user_id ON addresses (user_id);
+    END IF;
+END $$;
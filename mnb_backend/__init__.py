@@ -5,6 +5,7 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
 from mnb_backend.database import connect_db
+from mnb_backend.json_provider import OrjsonProvider
 from mnb_backend.config import DevelopmentConfig, TestConfig, ProductionConfig
 
 from mnb_backend.auth.routes import auth_routes
@@ -20,18 +21,22 @@ from mnb_backend.reservations.routes import reservations_routes
 
 from mnb_backend.messages.routes import messages_routes
 from mnb_backend.searches.routes import searches_routes
+from mnb_backend.storage.routes import storage_routes
+from mnb_backend.uploads.routes import uploads_routes
+from mnb_backend.metrics.routes import metrics_routes
 
 from mnb_backend.error_handlers import error_handlers_bp
 
 
 # TODO: CREATE REVIEWS ROUTES / MODELS
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # breakpoint()
 if os.environ.get('FLASK_DEBUG') == 'test':
     app.config.from_object(TestConfig)
-# elif os.environ.get('FLASK_ENV') == 'prod':
-#     app.config.from_object(ProductionConfig)
+elif os.environ.get('FLASK_ENV') == 'prod':
+    app.config.from_object(ProductionConfig)
 else:
     app.config.from_object(DevelopmentConfig)
 
@@ -66,4 +71,8 @@ app.register_blueprint(listing_images_routes, url_prefix='/api/listing_images')
 app.register_blueprint(reservations_routes, url_prefix='/api/reservations')
 app.register_blueprint(messages_routes, url_prefix='/api/messages')
 app.register_blueprint(searches_routes, url_prefix='/api/searches')
+app.register_blueprint(uploads_routes, url_prefix='/api/uploads')
+app.register_blueprint(metrics_routes, url_prefix='/api/metrics')
+if app.config['STORAGE_BACKEND'] == 'local':
+    app.register_blueprint(storage_routes, url_prefix='/media')
 app.register_blueprint(error_handlers_bp)
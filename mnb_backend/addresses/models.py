@@ -1,10 +1,14 @@
 """Model for Address"""
+from datetime import datetime
+
 from mnb_backend.addresses.model_helpers import fuzz_coordinates
 from mnb_backend.database import db
-from geoalchemy2 import Geometry
+from mnb_backend.enums import enum_serializer, LocationStatusEnum
+from mnb_backend.serializers import Embed, Field, Serializer
+from geoalchemy2 import Geography, Geometry
 
-from sqlalchemy.sql import select
-from sqlalchemy import func
+from sqlalchemy import Enum as SQLAlchemyEnum, cast, func, select
+from sqlalchemy.orm import column_property, deferred, joinedload
 
 
 # region Address
@@ -18,9 +22,12 @@ class Address(db.Model):
         primary_key=True,
     )
 
+    # a user has one address, searches join listings to their owner's address and rely on it
     user_id = db.Column(
         db.Integer,
-        db.ForeignKey('users.id')
+        db.ForeignKey('users.id'),
+        index=True,
+        unique=True,
     )
     user = db.relationship('User', back_populates="address", uselist=False)
 
@@ -47,22 +54,48 @@ class Address(db.Model):
 
     location = db.relationship('Location', back_populates="address", uselist=False, cascade='delete')
 
+    # bumped on every change, and when its location changes, see mnb_backend/conditional.py
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
     def __repr__(self):
         return f"< Address #{self.id}, Street Address: {self.street_address}, Apt Number: {self.apt_number}, " \
                f"City: {self.city}, Zipcode: {self.zipcode}, Location: {self.location} >"
 
-    def serialize(self):
-        """ returns self """
+    serialize = Serializer(
+        Field('address_uid', 'id'),
+        'user_id',
+        'street_address',
+        'apt_number',
+        Embed('city'),
+        Embed('zipcode'),
+        Embed('location'),
+    )
 
-        return {
-            "address_uid": self.id,
-            "user_id": self.user_id,
-            "street_address": self.street_address,
-            "apt_number": self.apt_number,
-            "city": self.city.serialize(),
-            "zipcode": self.zipcode.serialize(),
-            "location": self.location.serialize()
-        }
+    @classmethod
+    def serialization_plan(cls):
+        """ Loader options for everything serialize() touches, so a query can load it in one round trip """
+
+        return (
+            joinedload(cls.city).joinedload(City.state),
+            joinedload(cls.zipcode),
+            joinedload(cls.location),
+        )
+
+    def version(self):
+        """ updated_at of this row and of the rows serialize() embeds, see mnb_backend/conditional.py """
+
+        return (self.updated_at,)
+
+    @classmethod
+    def select_version(cls, address_id):
+        """ Select of version() of an address, without loading it """
+
+        return select(cls.updated_at).where(cls.id == address_id)
 
 
 # endregion
@@ -92,20 +125,35 @@ class Location(db.Model):
         # nullable=False
     )
 
+    # point stays empty while PENDING, until the geocoding job fills it in
+    status = db.Column(
+        SQLAlchemyEnum(LocationStatusEnum, name='location_status_enum'),
+        nullable=False,
+        default=LocationStatusEnum.GEOCODED,
+        server_default=LocationStatusEnum.GEOCODED.name,
+    )
+
+    # geography copy of point kept up to date by postgres. Radius searches go through its gist index so distances
+    # are in meters on the spheroid. Never needed when serializing, so it isn't loaded with the row.
+    geog = deferred(db.Column(
+        Geography(geometry_type='POINT', srid=4326),
+        db.Computed("point::geography", persisted=True)
+    ))
+
+    # coordinates are selected alongside the row so serializing doesn't need its own round trip
+    point_x = column_property(func.ST_X(point))
+    point_y = column_property(func.ST_Y(point))
+
     def __repr__(self):
         return f"< Location #{self.id} >"
 
     def serialize(self):
         """ returns self """
 
-        stmt = select(func.ST_X(self.point).label("x"), func.ST_Y(self.point).label("y"))
-        stmt = stmt.select_from(self.__table__).where(self.__table__.c.id == self.id)
-        result = db.session.execute(stmt).fetchone()
-
-        x = result.x if result else None
-        y = result.y if result else None
+        x = self.point_x
+        y = self.point_y
 
-        fuzzed_lon, fuzzed_lat = fuzz_coordinates(y, x)
+        fuzzed_lon, fuzzed_lat = fuzz_coordinates(y, x, seed=self.id)
 
         return {
             "id": self.id,
@@ -113,8 +161,28 @@ class Location(db.Model):
             "fuzzed_point_y": fuzzed_lat,
             "point_x": x,
             "point_y": y,
+            "status": enum_serializer(self.status),
         }
 
+    @classmethod
+    def make_geography_point(cls, latitude, longitude):
+        """ returns a geography point expression for latitude/longitude to compare against Location.geog """
+
+        return cast(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326),
+                    Geography(geometry_type='POINT', srid=4326))
+
+    @classmethod
+    def within_radius(cls, latitude, longitude, radius_m):
+        """ returns a filter for locations within radius_m meters of latitude/longitude, backed by the gist index """
+
+        return func.ST_DWithin(cls.geog, cls.make_geography_point(latitude, longitude), radius_m)
+
+    @classmethod
+    def distance_from(cls, latitude, longitude):
+        """ returns the KNN (<->) distance in meters from latitude/longitude, ordering by it walks the gist index """
+
+        return cls.geog.op('<->', return_type=db.Float)(cls.make_geography_point(latitude, longitude))
+
 
 # endregion
 
@@ -142,15 +210,12 @@ class City(db.Model):
     def __repr__(self):
         return f"< City # {self.id}, City Name: {self.city_name} >"
 
-    def serialize(self):
-        """ returns self """
-
-        return {
-            "id": self.id,
-            "city_name": self.city_name,
-            # "state": self.state_uid,
-            "state": self.state.state_abbreviation
-        }
+    serialize = Serializer(
+        'id',
+        'city_name',
+        # 'state_uid',
+        Field('state', 'state.state_abbreviation'),
+    )
 
 
 # endregion
@@ -191,14 +256,11 @@ class State(db.Model):
     def __repr__(self):
         return f"< State # {self.id}, State Abbreviation: {self.state_abbreviation}, State name: {self.state_name}>"
 
-    def serialize(self):
-        """ returns self """
-
-        return {
-            "id": self.id,
-            "state_abbreviation": self.state_abbreviation,
-            "state_name": self.state_name
-        }
+    serialize = Serializer(
+        'id',
+        'state_abbreviation',
+        'state_name',
+    )
 
 
 # endregion
@@ -224,12 +286,9 @@ class ZipCode(db.Model):
     def __repr__(self):
         return f"< Zipcode # {self.id}, Code {self.code} >"
 
-    def serialize(self):
-        """ returns self """
-
-        return {
-            "id": self.id,
-            "code": self.code
-        }
+    serialize = Serializer(
+        'id',
+        'code',
+    )
 
 # endregion
@@ -1,10 +1,8 @@
+from mnb_backend.cache import invalidate
 from mnb_backend.database import db
-from mnb_backend.enums import StatesEnum
+from mnb_backend.enums import LocationStatusEnum, StatesEnum
 from mnb_backend.addresses.models import State, City, ZipCode, Address, Location
-
-
-
-from mnb_backend.util_filters import geocode_address
+from mnb_backend.geocoding.jobs import enqueue_geocode_location
 
 
 
@@ -75,6 +73,10 @@ def set_retrieve_address(user, address_str, city_str, state_str, zipcode_str):
     city = set_retrieve_city(city_str, state)
     zipcode = set_retrieve_zipcode(zipcode_str)
 
+    address_string = f"{address_str} {city.city_name}, {state.state_abbreviation} {zipcode.code}"
+
+    # the address, its pending location and the geocoding job are written together, so a failure leaves nothing
+    # half written and the request never waits on the geocoder
     try:
         address = Address(
             street_address=address_str,
@@ -82,38 +84,29 @@ def set_retrieve_address(user, address_str, city_str, state_str, zipcode_str):
             zipcode_uid=zipcode.id
         )
         user.address = address
-
         db.session.add(address)
+
+        set_retrieve_location(address, address_string)
         db.session.commit()
     except Exception as error:
         print("Error", error)
         db.session.rollback()
         raise error
 
-        # EXCEPT
-
-    address_string = f"{address.street_address} {city.city_name}, {state.state_abbreviation} {zipcode.code}"
-    set_retrieve_location(address, address_string)
+    invalidate(('users', user.id), ('addresses', address.id))
 
     return user, address, city, state, zipcode, address_string
 
 
 def set_retrieve_location(address, full_address_str):
-    """ Given a location string, return the location object from the db """
+    """ Given a location string, add a pending location for the address and queue it for geocoding.
+    Doesn't commit. """
 
-    # with app.app_context():
-    geocoded_address = geocode_address(full_address_str)
-    try:
-        location = Location(point=f"POINT({geocoded_address[1]} {geocoded_address[0]})")
-        db.session.add(location)
-        db.session.commit()
+    location = Location(address=address, status=LocationStatusEnum.PENDING)
+    db.session.add(location)
+    db.session.flush()
 
-        address = Address.query.get_or_404(address.id)
-        address.location = location
-        db.session.commit()
-    except Exception as error:
-        db.session.rollback()
-        raise error
+    enqueue_geocode_location(location, full_address_str)
 
     return location
 
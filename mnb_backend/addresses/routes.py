@@ -3,6 +3,8 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.exceptions import NotFound, abort
 
+from mnb_backend.cache import get_response_cache, invalidate
+from mnb_backend.conditional import get_validators_or_404, not_modified, with_validators
 from mnb_backend.database import db
 
 from mnb_backend.addresses.route_helpers import set_retrieve_address
@@ -46,13 +48,23 @@ def create_address():
 
 @addresses_routes.get("/api/address/<int:address_id>")
 def get_address(address_id):
-    """ Returns JSON like:
+    """ Served from the response cache. Sends an ETag and answers a matching If-None-Match with 304 Not Modified.
+    Returns JSON like:
         {address: {address_uid, street, city, state, zipcode}}
     """
 
+    def load():
+        address = Address.query.options(*Address.serialization_plan()).get_or_404(address_id)
+        return address.serialize(), [('addresses', address_id), ('users', address.user_id)]
+
     try:
-        address = Address.query.get_or_404(address_id)
-        return jsonify(address=address.serialize()), 200
+        etag, last_modified = get_validators_or_404('addresses', address_id, Address.select_version(address_id))
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
+
+        serialized = get_response_cache().get(('addresses', address_id, etag), load)
+        return with_validators(jsonify(address=serialized), etag, last_modified), 200
 
     except NotFound:
         abort(404)
@@ -79,6 +91,7 @@ def update_address(address_id):
                 db.session.delete(address.location)
                 db.session.delete(address)  # @Lucas: Should I be deleting the address here or should i just be changing it?
                 db.session.commit()
+                invalidate(('addresses', address_id))
             except Exception as error:
                 abort(500, description="Failed to update address")
 
@@ -116,6 +129,7 @@ def delete_address(address_id):
         if user.id == address.user.id:
             db.session.delete(address)
             db.session.commit()
+            invalidate(('addresses', address_id), ('users', user.id))
 
             return jsonify(user=user.serialize()), 200
         abort(401, description="Not authorized")
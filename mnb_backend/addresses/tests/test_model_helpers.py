@@ -0,0 +1,49 @@
+"""Tests for address model helpers"""
+
+from math import radians, sin, cos, asin, sqrt
+from unittest import TestCase
+
+from mnb_backend.addresses.model_helpers import fuzz_coordinates, fuzz_coordinates_batch
+
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    """ Great circle distance between two points in meters """
+
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371008.8 * asin(sqrt(a))
+
+
+class FuzzCoordinatesTestCase(TestCase):
+    def test_fuzz_coordinates_is_deterministic_per_seed(self):
+        first = fuzz_coordinates(38.006370860286694, -122.28195023589687, seed=7)
+        second = fuzz_coordinates(38.006370860286694, -122.28195023589687, seed=7)
+
+        self.assertEqual(first, second)
+
+    def test_fuzz_coordinates_differs_between_seeds(self):
+        first = fuzz_coordinates(38.006370860286694, -122.28195023589687, seed=7)
+        second = fuzz_coordinates(38.006370860286694, -122.28195023589687, seed=8)
+
+        self.assertNotEqual(first, second)
+
+    def test_fuzz_coordinates_stays_within_radius(self):
+        lat, lon = 38.006370860286694, -122.28195023589687
+        for seed in range(500):
+            fuzzed_lon, fuzzed_lat = fuzz_coordinates(lat, lon, seed=seed)
+            self.assertLessEqual(haversine_meters(lat, lon, fuzzed_lat, fuzzed_lon), 200.5)
+
+    def test_fuzz_coordinates_batch_matches_single_points(self):
+        lats = [38.006370860286694, 37.99945603355348, 32.239627]
+        lons = [-122.28195023589687, -122.25820007861707, -110.961431]
+        seeds = [1, 2, 3]
+
+        fuzzed_lons, fuzzed_lats = fuzz_coordinates_batch(lats, lons, seeds)
+
+        for i in range(3):
+            fuzzed_lon, fuzzed_lat = fuzz_coordinates(lats[i], lons[i], seed=seeds[i])
+            self.assertAlmostEqual(fuzzed_lon, fuzzed_lons[i], places=9)
+            self.assertAlmostEqual(fuzzed_lat, fuzzed_lats[i], places=9)
+
+    def test_fuzz_coordinates_missing_point(self):
+        self.assertEqual(fuzz_coordinates(None, None, seed=1), (None, None))
@@ -1,6 +1,5 @@
-import os
-from dotenv import load_dotenv
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+
 from werkzeug.utils import secure_filename
 import uuid
 from PIL import Image
@@ -8,91 +7,92 @@ import io
 from pathlib import Path
 import traceback
 
-from flask import jsonify
+from flask import current_app, jsonify
+from sqlalchemy import insert
 from werkzeug.exceptions import abort
 
 from mnb_backend.database import db
 from mnb_backend.enums import PriceEnums
+from mnb_backend.errors import StorageError
+from mnb_backend.images.jobs import enqueue_make_renditions
+from mnb_backend.images.renditions import get_image_keys
 from mnb_backend.listing_images.models import ListingImage
 # from mnb_backend.listings.models import Listing
 from mnb_backend.user_images.models import UserImage
 from mnb_backend.users.models import User
+from mnb_backend.storage.backends import get_storage
 
-load_dotenv()
+# uploads run on this pool, each thread sharing the app's storage backend
+UPLOAD_POOL_SIZE = 8
 
-aws_access_key_id = os.environ['aws_access_key_id']
-aws_secret_access_key = os.environ['aws_secret_access_key']
+upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_POOL_SIZE, thread_name_prefix='upload')
 
-s3 = boto3.client('s3', aws_access_key_id=aws_access_key_id,
-                  aws_secret_access_key=aws_secret_access_key)
 
-MNB_BUCKET_NAME_IMAGES = 'my-neighbors-bookshelf'
-mnb_bucket_base_url_images = "https://my-neighbors-bookshelf.s3.us-west-1.amazonaws.com/"
+def aws_put_image(file):
+    """ Uploads an original image, an IngestedFile, to the images bucket under the sha256 of its contents (see
+    mnb_backend/images/blobs.py). The file is streamed from its spool, as a multipart upload when it's large.
+    Raises StorageError if the upload fails. """
 
-BUCKET_NAME_LARGE_IMAGES = 'sharebnb-gmm'
-BUCKET_NAME_SMALL_IMAGES = 'sharebnb-gmm-small-images'
+    filename = file.sha256
+    return get_storage().put('images', filename, file, content_type=getattr(file, 'content_type', None))
 
-bucket_base_url_large_images = "https://sharebnb-gmm.s3.us-west-1.amazonaws.com/"
-bucket_base_url_small_images = "https://sharebnb-gmm-small-images.s3.us-west-1.amazonaws.com/"
 
+def upload_images_concurrently(files, upload=aws_put_image):
+    """ Uploads files in parallel on the upload pool, so n files cost about one storage round trip instead of n.
 
-def aws_upload_image(file):
-    """ Uploads an original image file to the MNB image_bucket of aws. """
+    Returns a list of (file, url, error) in the order of files, url is None when the upload failed. """
 
-    filename = f"{uuid.uuid4()}"
-    try:
-        s3.put_object(
-            Body=file,
-            Bucket=MNB_BUCKET_NAME_IMAGES,
-            Key=filename
-        )
-    except Exception as e:
-        print("failed to upload orig image: ", e)
+    app = current_app._get_current_object()
 
-    orig_image_url = f"{mnb_bucket_base_url_images}{filename}"
-    return orig_image_url
+    def upload_in_app_context(file):
+        with app.app_context():
+            return upload(file)
+
+    futures = [upload_pool.submit(upload_in_app_context, file) for file in files]
+
+    results = []
+    for file, future in zip(files, futures):
+        try:
+            results.append((file, future.result(), None))
+        except Exception as error:
+            print("failed to upload image: ", error)
+            results.append((file, None, error))
+
+    return results
 
 
 def aws_delete_image(image_url):
-    """ Deletes an image from the MNB image_bucket of aws. """
+    """ Deletes an image and its renditions from the images bucket. """
 
+    storage = get_storage()
+    image_key = image_url.split('/')[-1]
     try:
-        image_key = image_url.split('/')[-1]
-        s3.delete_object(
-            Bucket=MNB_BUCKET_NAME_IMAGES,
-            Key=image_key
-        )
-    except Exception as e:
+        for key in get_image_keys(image_key, current_app.config['IMAGE_RENDITIONS']):
+            storage.delete('images', key)
+    except StorageError as e:
         print("failed to delete image: ", e)
 
 
 def upload_to_aws(file):
-    """ Uploads an original image file to the large_image_bucket of  aws and
-    then resizes the image and uploads the resized/smaller image to the was
-    image small bucket. OG copy from sharebnb """
+    """ Uploads an original image file to the large_images bucket and
+    then resizes the image and uploads the resized/smaller image to the
+    small_images bucket. OG copy from sharebnb """
 
+    storage = get_storage()
     filename = f"{uuid.uuid4()}"
     try:
-        s3.put_object(
-            Body=file,
-            Bucket=BUCKET_NAME_LARGE_IMAGES,
-            Key=filename
-        )
-    except Exception as e:
+        storage.put('large_images', filename, file)
+    except StorageError as e:
         print("failed to upload orig image: ", e)
 
-    orig_image_url = f"{bucket_base_url_large_images}{filename}"
+    orig_image_url = storage.url('large_images', filename)
 
+    file.seek(0)
     small_image_file = resize_image(file)
 
     try:
-        s3.put_object(
-            Body=small_image_file,
-            Bucket=BUCKET_NAME_SMALL_IMAGES,
-            Key=f"{filename}-small"
-        )
-        small_image_url = f"{bucket_base_url_small_images}{filename}-small"
-    except Exception as e:
+        small_image_url = storage.put('small_images', f"{filename}-small", small_image_file)
+    except StorageError as e:
         print("failed to upload thumbnail image: ", e)
         traceback.print_exc()
 
@@ -152,6 +152,36 @@ def aux_make_thumbnail_manual(file):
     img.show()
 
 
+def db_add_listing_images(listing_uid, image_urls, blobs=None):
+    """ Inserts a listing_image for each url in one statement and commits. Returns the listing_images in order.
+
+    blobs are the image_blobs the urls are stored as, if any. Images of a blob whose renditions have been made get a
+    copy of them, the others are queued to have them made. """
+
+    if not image_urls:
+        return []
+
+    blobs = blobs or [None] * len(image_urls)
+
+    try:
+        listing_images = db.session.scalars(
+            insert(ListingImage).returning(ListingImage, sort_by_parameter_order=True),
+            [{"listing_id": listing_uid, "image_url": image_url, "blob_id": blob and blob.id,
+              "renditions": blob and blob.renditions}
+             for image_url, blob in zip(image_urls, blobs)],
+        ).all()
+        for listing_image in listing_images:
+            if listing_image.renditions is None:
+                enqueue_make_renditions('listing_image', listing_image.id)
+        db.session.commit()
+
+        return listing_images
+    except Exception as error:
+        print("Error", error)
+        db.session.rollback()
+        abort(500, "Failed to add listing_images")
+
+
 def db_add_listing_image(user_id, listing_uid, image_url):
     """ Posts listing_image to db while in try block and returns serialized if successful, returns an error if not. """
 
@@ -161,6 +191,8 @@ def db_add_listing_image(user_id, listing_uid, image_url):
             image_url=image_url,
         )
         db.session.add(listing_image)
+        db.session.flush()
+        enqueue_make_renditions('listing_image', listing_image.id)
         db.session.commit()
 
         return listing_image
@@ -171,16 +203,20 @@ def db_add_listing_image(user_id, listing_uid, image_url):
 
 
 
-# TODO: write function to re-thumbnail entire AWS bucket
+# re-thumbnail every image with python -m mnb_backend.images.reprocess
+
+def db_add_user_image(user_id, image_url, blob=None):
+    """ Posts user_image to db while in try block and returns serialized if successful, returns an error if not.
 
-def db_add_user_image(user_id, image_url):
-    """ Posts user_image to db while in try block and returns serialized if successful, returns an error if not. """
+    blob is the image_blob the url is stored as, if any, see db_add_listing_images. """
 
     try:
         user_image = UserImage(
             # listing_owner_uid=user_id,
 
             image_url=image_url,
+            blob=blob,
+            renditions=blob and blob.renditions,
         )
         db.session.add(user_image)
         db.session.commit()
@@ -188,6 +224,8 @@ def db_add_user_image(user_id, image_url):
         user = db.session.get(User, user_id)
         user_image = db.session.get(UserImage, user_image.id)
         user.profile_image = user_image
+        if user_image.renditions is None:
+            enqueue_make_renditions('user_image', user_image.id)
 
         db.session.commit()
         return user_image
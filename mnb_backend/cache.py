@@ -0,0 +1,184 @@
+"""In-process cache of serialized responses of the public read endpoints.
+
+A response is cached under a key like ('listings', 7) with the tags of every resource it embeds, e.g. the listing's
+owner ('users', 3). Write paths call invalidate() with the tags of what they changed after committing, which drops
+every entry embedding it, so this process never serves a response older than the last write it made.
+
+Entries are fresh for RESPONSE_CACHE_TTL seconds, then stale for RESPONSE_CACHE_STALE_TTL more: the first request
+for a stale entry reloads it while concurrent requests for it are served the stale copy, instead of all of them
+hitting the database at once. Least recently used entries are evicted past RESPONSE_CACHE_MAX_ENTRIES.
+
+Each process has its own cache, so a write only invalidates the process that made it. Endpoints with a row version
+(see mnb_backend/conditional.py) put it in the key, so they never serve a body older than the row whichever process
+changed it. For the others, changes made elsewhere (other web processes, the workers) show up once the TTL has
+passed. Keep the TTL short.
+
+Cached values are shared between requests, don't mutate them.
+"""
+
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+
+from flask import current_app
+
+
+class CacheEntry:
+    """ A cached value, the tags it depends on, and when it stops being fresh and stale """
+
+    def __init__(self, value, tags, fresh_until, stale_until):
+        self.value = value
+        self.tags = tags
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.reloading = False
+
+
+class ResponseCache:
+    """ A bounded LRU of values with a TTL, stale-while-revalidate and invalidation by tag. Thread safe. """
+
+    def __init__(self, max_entries, ttl, stale_ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._keys_by_tag = defaultdict(set)
+        self._lock = Lock()
+        # bumped by every invalidation, a load that started before one isn't stored since it may predate the write
+        self._generation = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, load):
+        """
+        Returns the value cached under key. On a miss, or for the first request of a stale entry, calls load(), which
+        returns (value, tags): the tags of the resources the value embeds, besides key itself. Exceptions raised by
+        load() aren't cached."""
+
+        if self.max_entries <= 0:
+            return load()[0]
+
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self.hits += 1
+                    return entry.value
+                if entry.reloading:
+                    self.stale_hits += 1
+                    return entry.value
+                entry.reloading = True
+
+            self.misses += 1
+            generation = self._generation
+
+        try:
+            value, tags = load()
+        except Exception:
+            with self._lock:
+                if entry is not None:
+                    entry.reloading = False
+            raise
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value, {key, *tags})
+            elif entry is not None:
+                entry.reloading = False
+
+        return value
+
+    def invalidate(self, *tags):
+        """
+        Drops every entry tagged with one of tags. A tag is a (resource, id) pair, like a key."""
+
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    if self._remove(key):
+                        self.invalidations += 1
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters, for tests that reset the database."""
+
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.hits = self.stale_hits = self.misses = self.invalidations = self.evictions = 0
+
+    def stats(self):
+        """ Counters and size, for the metrics endpoint """
+
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else None,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    def _store(self, key, value, tags):
+        now = self.clock()
+        self._remove(key)
+        self._entries[key] = CacheEntry(value, tags, now + self.ttl, now + self.ttl + self.stale_ttl)
+        for tag in tags:
+            self._keys_by_tag[tag].add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+        return True
+
+
+def get_response_cache():
+    """
+    Returns the response cache of the current app, building it the first time."""
+
+    extensions = current_app.extensions
+    if 'response_cache' not in extensions:
+        config = current_app.config
+        extensions['response_cache'] = ResponseCache(
+            config['RESPONSE_CACHE_MAX_ENTRIES'],
+            config['RESPONSE_CACHE_TTL'],
+            config['RESPONSE_CACHE_STALE_TTL'],
+        )
+
+    return extensions['response_cache']
+
+
+def invalidate(*tags):
+    """
+    Drops the cached responses embedding any of tags, e.g. invalidate(('listings', listing.id)). Call it after the
+    write commits."""
+
+    get_response_cache().invalidate(*tags)
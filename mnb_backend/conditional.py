@@ -0,0 +1,133 @@
+"""Conditional GETs: ETag, Last-Modified and 304 Not Modified.
+
+Listings, users, reservations and addresses have an updated_at bumped on every change. A row's version() is its
+updated_at together with the updated_at of the rows its serialize() embeds, so the version changes whenever the
+serialized JSON can. Rows embedded without an updated_at of their own bump their parent's instead, see
+touch_parents() below: a profile image or address bumps its user, a location bumps its address and that address's
+user.
+
+A detail endpoint selects the version alone, a single indexed lookup, and answers If-None-Match with a 304 before
+loading or serializing anything. List endpoints load their page, then compare before serializing it. Both tell the
+?fields= and ?embed= projections of a resource apart (see mnb_backend/projections.py).
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response, request
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import abort
+
+from mnb_backend.addresses.models import Address, Location
+from mnb_backend.database import db
+from mnb_backend.user_images.models import UserImage
+from mnb_backend.users.models import User
+
+
+def make_etag(*parts):
+    """
+    Returns a strong ETag, unquoted, for a representation identified by parts, e.g. ('listings', id, *version)."""
+
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def get_validators_or_404(name, resource_id, version_stmt, projection=None):
+    """
+    Runs the select_version() of a row and returns its (etag, last_modified), as projection serializes it if given.
+    Aborts 404 if there's no row. The version covers every row serialize() embeds, even those projection leaves
+    out."""
+
+    version = db.session.execute(version_stmt).first()
+    if version is None:
+        abort(404)
+
+    projection_key = projection.key if projection is not None else None
+
+    return make_etag(name, resource_id, projection_key, *version), last_modified_of(version)
+
+
+def last_modified_of(*versions):
+    """
+    Returns the latest updated_at of versions, as an aware datetime, or None if there are none."""
+
+    timestamps = [timestamp for version in versions for timestamp in version if timestamp is not None]
+
+    return max(timestamps).replace(tzinfo=timezone.utc) if timestamps else None
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Returns a 304 response if the request's If-None-Match matches etag, or, when it has no If-None-Match, if its
+    If-Modified-Since is at or after last_modified. Returns None otherwise."""
+
+    if request.if_none_match:
+        modified = not request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        # Last-Modified only has second precision
+        modified = last_modified.replace(microsecond=0) > request.if_modified_since
+    else:
+        modified = True
+
+    if modified:
+        return None
+
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """
+    Sets ETag and Last-Modified on response and returns it."""
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    return response
+
+
+def conditional_list(name, objects, next_cursor, projection):
+    """
+    Validators of a page of objects as projection serializes them: an ETag over their ids and versions, so a row
+    leaving the page changes it too, and the Last-Modified of the newest. Returns (etag, last_modified)."""
+
+    versions = [projection.version(object_) for object_ in objects]
+    etag = make_etag(name, request.query_string, projection.key, next_cursor,
+                     *[(object_.id, version) for object_, version in zip(objects, versions)])
+
+    return etag, last_modified_of(*versions)
+
+
+# region version propagation
+@event.listens_for(Session, 'after_flush')
+def touch_parents(session, flush_context):
+    """ Bumps updated_at of the users and addresses whose serialize() embeds a row this flush changed. """
+
+    user_ids = set()
+    address_ids = set()
+
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (UserImage, Address)) and instance.user_id is not None:
+            user_ids.add(instance.user_id)
+        elif isinstance(instance, Location) and instance.address_id is not None:
+            address_ids.add(instance.address_id)
+
+    if not user_ids and not address_ids:
+        return
+
+    connection = session.connection()
+    now = datetime.utcnow()
+
+    if address_ids:
+        user_ids.update(connection.scalars(
+            update(Address.__table__)
+            .where(Address.id.in_(address_ids))
+            .values(updated_at=now)
+            .returning(Address.user_id)
+        ))
+
+    user_ids.discard(None)
+    if user_ids:
+        connection.execute(update(User.__table__).where(User.id.in_(user_ids)).values(updated_at=now))
+
+# endregion
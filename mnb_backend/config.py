@@ -19,6 +19,68 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # connection pool of each process, see mnb_backend/database.py. queue keeps up to DATABASE_POOL_SIZE connections
+    # open, plus DATABASE_MAX_OVERFLOW more under load, and a checkout waits DATABASE_POOL_TIMEOUT seconds for one
+    # before failing. pgbouncer opens a connection per checkout and leaves the pooling to pgbouncer, in transaction
+    # pooling mode.
+    DATABASE_POOL = os.environ.get('DATABASE_POOL', 'queue')
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 10))
+    DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', 30))
+    # seconds after which a connection is replaced, -1 never. pre ping checks a connection is alive on checkout.
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', -1))
+    DATABASE_POOL_PRE_PING = os.environ.get('DATABASE_POOL_PRE_PING', 'false') == 'true'
+
+    # geocoding providers tried in order, see mnb_backend/geocoding/providers.py
+    GEOCODING_PROVIDERS = os.environ.get('GEOCODING_PROVIDERS', 'nominatim,zip_centroid').split(',')
+    GEOCODING_TIMEOUT = float(os.environ.get('GEOCODING_TIMEOUT', 2))
+    # csv of zipcode,latitude,longitude. the bundled file only has a few zipcodes, point this at a full table.
+    GEOCODING_ZIP_CENTROIDS_PATH = os.environ.get(
+        'GEOCODING_ZIP_CENTROIDS_PATH',
+        os.path.join(os.path.dirname(__file__), 'geocoding', 'data', 'zip_centroids.csv'),
+    )
+
+    # blob storage, see mnb_backend/storage/backends.py. s3, local or memory.
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 's3')
+    STORAGE_BUCKETS = {
+        'images': os.environ.get('STORAGE_BUCKET_IMAGES', 'my-neighbors-bookshelf'),
+        'large_images': os.environ.get('STORAGE_BUCKET_LARGE_IMAGES', 'sharebnb-gmm'),
+        'small_images': os.environ.get('STORAGE_BUCKET_SMALL_IMAGES', 'sharebnb-gmm-small-images'),
+    }
+    STORAGE_S3_REGION = os.environ.get('STORAGE_S3_REGION', 'us-west-1')
+    STORAGE_MAX_POOL_CONNECTIONS = int(os.environ.get('STORAGE_MAX_POOL_CONNECTIONS', 10))
+    # s3 uploads larger than this are sent in parts of STORAGE_S3_MULTIPART_CHUNKSIZE
+    STORAGE_S3_MULTIPART_THRESHOLD = int(os.environ.get('STORAGE_S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    STORAGE_S3_MULTIPART_CHUNKSIZE = int(os.environ.get('STORAGE_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+    STORAGE_LOCAL_ROOT = os.environ.get('STORAGE_LOCAL_ROOT', os.path.join(os.getcwd(), 'media'))
+    STORAGE_LOCAL_BASE_URL = os.environ.get('STORAGE_LOCAL_BASE_URL', 'http://localhost:5001/media')
+    # image renditions, name -> max (width, height), see mnb_backend/images/renditions.py
+    IMAGE_RENDITIONS = {
+        'thumb': (200, 200),
+        'card': (600, 600),
+        'detail': (1600, 1600),
+    }
+    IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 85))
+    # processes renditions are made in, 0 makes them in the worker process itself. One core is left for the worker
+    # process, which downloads and uploads while the pool encodes.
+    IMAGE_PROCESS_WORKERS = int(os.environ.get('IMAGE_PROCESS_WORKERS', (os.cpu_count() or 1) - 1))
+
+    # direct uploads, see mnb_backend/uploads
+    UPLOAD_MAX_IMAGE_BYTES = int(os.environ.get('UPLOAD_MAX_IMAGE_BYTES', 10 * 1024 * 1024))
+    # uploads through the API, see mnb_backend/uploads/ingest.py. Larger request bodies get a 413 before they're read.
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+    # bytes of each uploaded file held in memory before it's spooled to a temporary file
+    UPLOAD_SPOOL_BYTES = int(os.environ.get('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+    UPLOAD_INTENT_EXPIRES_IN = int(os.environ.get('UPLOAD_INTENT_EXPIRES_IN', 15 * 60))
+
+    # in-process cache of public read endpoints, see mnb_backend/cache.py. 0 entries turns it off.
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_STALE_TTL = float(os.environ.get('RESPONSE_CACHE_STALE_TTL', 30))
+    AWS_ACCESS_KEY_ID = os.environ.get('aws_access_key_id')
+    AWS_SECRET_ACCESS_KEY = os.environ.get('aws_secret_access_key')
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -27,9 +89,21 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
 
+    # a connection for each of a gunicorn worker's threads, set DATABASE_POOL_SIZE to its --threads. A request
+    # waiting on the pool fails after 10 seconds instead of holding its thread. Connections dropped by the server or
+    # a load balancer while idle are caught by the pre ping, and none is kept over half an hour.
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 10))
+    DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', 10))
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 1800))
+    DATABASE_POOL_PRE_PING = os.environ.get('DATABASE_POOL_PRE_PING', 'true') == 'true'
+
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL_TEST')
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    GEOCODING_PROVIDERS = ['zip_centroid']
+    STORAGE_BACKEND = 'memory'
+    IMAGE_PROCESS_WORKERS = 0
@@ -1,14 +1,177 @@
+"""The database and its connection pool.
+
+The pool is configured by the DATABASE_POOL settings of mnb_backend/config.py:
+    queue       a QueuePool per process, keeping DATABASE_POOL_SIZE connections open.
+    pgbouncer   a NullPool, opening a connection to pgbouncer for each checkout and closing it on checkin, so
+                pgbouncer pools the server connections of every process. pgbouncer in transaction pooling mode hands
+                a server connection to a client for one transaction only, so nothing may outlive a transaction:
+                no session SETs, advisory locks, LISTEN or server side prepared statements. psycopg2 never
+                prepares statements, psycopg 3 does after a few executions unless prepare_threshold is None.
+
+Both pools count checkouts and how long they waited for a connection, see pool_stats().
+"""
+
+import time
+from threading import Lock
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
 
 db = SQLAlchemy()
 
 
+class PoolStats:
+    """ Counters of a pool's checkouts. Thread safe. """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checked_out -= 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def as_dict(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_ms_total": self.wait_total * 1000,
+                "wait_ms_mean": self.wait_total * 1000 / waits if waits else None,
+                "wait_ms_max": self.wait_max * 1000,
+            }
+
+
+class InstrumentedPool:
+    """
+    Mixin for a pool counting its checkouts in self.stats. The wait of a checkout is the time spent getting a
+    connection, in the queue for one and connecting if a new one is opened."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+
+        self.stats.record_checkout(time.perf_counter() - start)
+        return record
+
+    def _do_return_conn(self, record):
+        self.stats.record_checkin()
+        super()._do_return_conn(record)
+
+    def _create_connection(self):
+        self.stats.record_connect()
+        return super()._create_connection()
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPool, NullPool):
+    pass
+
+
+def get_engine_options(config):
+    """
+    Returns the create_engine() options for the DATABASE_POOL settings of config."""
+
+    if config['DATABASE_POOL'] == 'pgbouncer':
+        options = {'poolclass': InstrumentedNullPool}
+    elif config['DATABASE_POOL'] == 'queue':
+        options = {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': config['DATABASE_POOL_SIZE'],
+            'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+            'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+            'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+            'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+        }
+    else:
+        raise ValueError(f"unknown DATABASE_POOL {config['DATABASE_POOL']}, queue or pgbouncer")
+
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if config['DATABASE_POOL'] == 'pgbouncer' and uri and make_url(uri).get_driver_name() == 'psycopg':
+        options['connect_args'] = {'prepare_threshold': None}
+
+    return options
+
+
+def pool_stats(engine):
+    """ Size and counters of the pool of engine, for the metrics endpoint """
+
+    pool = engine.pool
+    stats = {
+        "pool": type(pool).__name__,
+        "size": None,
+        "checked_in": None,
+        "overflow": None,
+        "max_overflow": None,
+        "timeout": None,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedPool):
+        stats.update(pool.stats.as_dict())
+
+    return stats
+
+
 def connect_db(app):
     """Connect this database to provided Flask app.
 
     You should call this in your Flask app.
     """
 
+    # SQLALCHEMY_ENGINE_OPTIONS set in the config win over the DATABASE_POOL settings
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **get_engine_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
     app.app_context().push()
     db.app = app
     db.init_app(app)
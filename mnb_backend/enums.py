@@ -46,6 +46,37 @@ class ListingStatusEnum(Enum):
     UNAVAILABLE = "Unavailable"
 
 
+class LocationStatusEnum(Enum):
+    """ Enum for location geocoding status """
+
+    PENDING = "Pending"
+    GEOCODED = "Geocoded"
+    FAILED = "Failed"
+
+
+class JobStatusEnum(Enum):
+    """ Enum for background job status """
+
+    PENDING = "Pending"
+    RUNNING = "Running"
+    DONE = "Done"
+    FAILED = "Failed"
+
+
+class UploadPurposeEnum(Enum):
+    """ Enum for what a direct upload is for """
+
+    LISTING_IMAGE = "Listing Image"
+    USER_IMAGE = "User Image"
+
+
+class UploadIntentStatusEnum(Enum):
+    """ Enum for upload intent status """
+
+    PENDING = "Pending"
+    CONFIRMED = "Confirmed"
+
+
 class RentalDurationEnum(Enum):
     """ Enum for rental duration"""
 
@@ -57,6 +57,27 @@ def handle_409(error):
     # return jsonify(error="Not found"), 404
 
 
+@error_handlers_bp.app_errorhandler(410)
+def handle_410(error):
+    """
+    Error handler for 410 errors"""
+    return basic_error_handler("Gone", error.description, 410)
+
+
+@error_handlers_bp.app_errorhandler(413)
+def handle_413(error):
+    """
+    Error handler for 413 errors"""
+    return basic_error_handler("Upload too large", error.description, 413)
+
+
+@error_handlers_bp.app_errorhandler(415)
+def handle_415(error):
+    """
+    Error handler for 415 errors"""
+    return basic_error_handler("Unsupported file type", error.description, 415)
+
+
 @error_handlers_bp.app_errorhandler(500)
 def handle_500(error):
     """
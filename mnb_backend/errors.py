@@ -4,3 +4,21 @@
 class EmailAlreadyExistsError(Exception):
     """Raised when email already exists in database."""
     pass
+
+
+class GeocodingError(Exception):
+    """Raised when no geocoding provider could locate an address."""
+    pass
+
+
+class StorageError(Exception):
+    """Raised when a blob storage backend fails to store, read or delete a blob."""
+    pass
+
+
+class UploadError(Exception):
+    """Raised when an uploaded file is rejected. status_code is the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
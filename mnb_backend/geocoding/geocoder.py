@@ -0,0 +1,95 @@
+"""Geocoding with caching in front of the providers.
+
+An address is looked up in an in-process LRU, then in the geocode_cache table, and only then sent to the providers
+configured in GEOCODING_PROVIDERS, in order. The first provider to locate it wins and its answer is saved to
+geocode_cache.
+"""
+
+import re
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from mnb_backend.database import db
+from mnb_backend.errors import GeocodingError
+from mnb_backend.geocoding.models import GeocodeCache
+from mnb_backend.geocoding.providers import build_providers
+
+GEOCODE_LRU_SIZE = 4096
+
+
+def normalize_address(address):
+    """
+    Normalizes an address string so spellings differing only in case, punctuation or spacing share a cache entry."""
+
+    address = re.sub(r'[^\w\s-]', ' ', address.lower())
+    return ' '.join(address.split())
+
+
+def get_providers():
+    """
+    Returns the geocoding providers of the current app, building them the first time."""
+
+    extensions = current_app.extensions
+    if 'geocoding_providers' not in extensions:
+        extensions['geocoding_providers'] = build_providers(current_app.config)
+
+    return extensions['geocoding_providers']
+
+
+def locate(address_key):
+    """
+    Asks each provider in turn. Returns (provider name, (latitude, longitude)) of the first to locate the address."""
+
+    errors = []
+    for provider in get_providers():
+        try:
+            point = provider.geocode(address_key)
+        except GeocodingError as error:
+            errors.append(str(error))
+            continue
+
+        if point is not None:
+            return provider.name, point
+
+    raise GeocodingError(f"Could not locate '{address_key}'" + (f": {'; '.join(errors)}" if errors else ""))
+
+
+@lru_cache(maxsize=GEOCODE_LRU_SIZE)
+def geocode_normalized(address_key):
+    """
+    Geocodes a normalized address. Misses raise GeocodingError, so they are never cached and are retried next time."""
+
+    cached = db.session.execute(
+        select(GeocodeCache.latitude, GeocodeCache.longitude).where(GeocodeCache.address_key == address_key)
+    ).first()
+    if cached is not None:
+        return cached.latitude, cached.longitude
+
+    provider_name, (latitude, longitude) = locate(address_key)
+
+    db.session.execute(
+        insert(GeocodeCache)
+        .values(address_key=address_key, latitude=latitude, longitude=longitude, provider=provider_name)
+        .on_conflict_do_nothing(index_elements=[GeocodeCache.address_key])
+    )
+
+    return latitude, longitude
+
+
+def geocode_address(address):
+    """
+    Geocode address and return (latitude, longitude). Raises GeocodingError if no provider can locate it.
+
+    A newly geocoded address is added to the session, it is saved when the caller commits."""
+
+    return geocode_normalized(normalize_address(address))
+
+
+def clear_geocode_cache():
+    """
+    Empties the in-process cache, for tests that reset the database."""
+
+    geocode_normalized.cache_clear()
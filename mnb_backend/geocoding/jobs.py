@@ -0,0 +1,49 @@
+"""Background geocoding of locations.
+
+An address write saves its Location as PENDING with no point and enqueues a geocode_location job in the same
+transaction. The worker geocodes those jobs in batches and fills in the point.
+"""
+
+from mnb_backend.addresses.models import Location
+from mnb_backend.enums import LocationStatusEnum
+from mnb_backend.errors import GeocodingError
+from mnb_backend.geocoding.geocoder import geocode_address
+from mnb_backend.workers.queue import enqueue, is_last_attempt
+
+GEOCODE_LOCATION = 'geocode_location'
+
+
+def enqueue_geocode_location(location, full_address_str):
+    """
+    Queues a pending location for geocoding. location must already have an id."""
+
+    return enqueue(GEOCODE_LOCATION, {'location_id': location.id, 'address': full_address_str})
+
+
+def geocode_locations(jobs):
+    """
+    Geocodes a batch of geocode_location jobs. Returns {job id: error} for the jobs that failed.
+
+    A location whose last attempt fails is marked FAILED. Jobs for locations deleted since are dropped."""
+
+    location_ids = [job.payload['location_id'] for job in jobs]
+    locations = {location.id: location for location in Location.query.filter(Location.id.in_(location_ids))}
+
+    failures = {}
+    for job in jobs:
+        location = locations.get(job.payload['location_id'])
+        if location is None:
+            continue
+
+        try:
+            latitude, longitude = geocode_address(job.payload['address'])
+        except GeocodingError as error:
+            failures[job.id] = error
+            if is_last_attempt(job):
+                location.status = LocationStatusEnum.FAILED
+            continue
+
+        location.point = f"POINT({longitude} {latitude})"
+        location.status = LocationStatusEnum.GEOCODED
+
+    return failures
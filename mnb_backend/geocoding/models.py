@@ -0,0 +1,49 @@
+"""Model for GeocodeCache"""
+from datetime import datetime
+
+from mnb_backend.database import db
+
+
+# region GeocodeCache
+class GeocodeCache(db.Model):
+    """ Geocoded coordinates of an address, keyed by the normalized address string. """
+
+    __tablename__ = 'geocode_cache'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    address_key = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+    latitude = db.Column(
+        db.Float,
+        nullable=False,
+    )
+
+    longitude = db.Column(
+        db.Float,
+        nullable=False,
+    )
+
+    provider = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self):
+        return f"< GeocodeCache #{self.id}, Address: {self.address_key}, " \
+               f"Point: ({self.latitude}, {self.longitude}), Provider: {self.provider} >"
+
+# endregion
@@ -0,0 +1,84 @@
+"""Geocoding providers.
+
+Each provider has a name and a geocode(address) method returning (latitude, longitude), or None when it can't locate
+the address. A provider raises GeocodingError when it couldn't answer at all (network down, timeout), so the caller
+can move on to the next one.
+"""
+
+import csv
+import os
+import re
+from functools import lru_cache
+
+from geopy.exc import GeopyError
+from geopy.geocoders import Nominatim
+
+from mnb_backend.errors import GeocodingError
+
+DEFAULT_ZIP_CENTROIDS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'zip_centroids.csv')
+
+ZIPCODE_PATTERN = re.compile(r'\b(\d{5})(?:-\d{4})?\s*$')
+
+
+@lru_cache(maxsize=None)
+def load_zip_centroids(path):
+    """
+    Reads a csv of zipcode,latitude,longitude rows. Returns a dict of zipcode -> (latitude, longitude)."""
+
+    with open(path, newline='') as centroids_file:
+        return {
+            row['zipcode'].zfill(5): (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(centroids_file)
+        }
+
+
+class ZipCentroidGeocoder:
+    """ Offline geocoder placing an address at the centroid of its zipcode. """
+
+    name = 'zip_centroid'
+
+    def __init__(self, path=DEFAULT_ZIP_CENTROIDS_PATH):
+        self.path = path
+
+    def geocode(self, address):
+        match = ZIPCODE_PATTERN.search(address)
+        if match is None:
+            return None
+
+        return load_zip_centroids(self.path).get(match.group(1))
+
+
+class NominatimGeocoder:
+    """ OpenStreetMap Nominatim geocoder. Makes a network call. """
+
+    name = 'nominatim'
+
+    def __init__(self, user_agent='mnb', timeout=2):
+        self.client = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocode(self, address):
+        try:
+            location = self.client.geocode(address)
+        except GeopyError as error:
+            raise GeocodingError(f"nominatim failed: {error}") from error
+
+        if location is None:
+            return None
+
+        return location.latitude, location.longitude
+
+
+PROVIDERS = {
+    ZipCentroidGeocoder.name: lambda config: ZipCentroidGeocoder(config['GEOCODING_ZIP_CENTROIDS_PATH']),
+    NominatimGeocoder.name: lambda config: NominatimGeocoder(timeout=config['GEOCODING_TIMEOUT']),
+}
+
+
+def build_providers(config):
+    """
+    Builds the providers named in config['GEOCODING_PROVIDERS'], in that order."""
+
+    try:
+        return [PROVIDERS[name](config) for name in config['GEOCODING_PROVIDERS']]
+    except KeyError as error:
+        raise ValueError(f"Unknown geocoding provider {error}") from error
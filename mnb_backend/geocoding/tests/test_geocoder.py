@@ -0,0 +1,108 @@
+"""test file for geocoding"""
+from unittest import TestCase
+from unittest.mock import patch
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.errors import GeocodingError
+from mnb_backend.geocoding.geocoder import geocode_address, normalize_address
+from mnb_backend.geocoding.models import GeocodeCache
+from mnb_backend.geocoding.providers import ZipCentroidGeocoder, build_providers
+from mnb_backend.test_setup_helpers import count_queries, delete_all_tables
+
+db.drop_all()
+db.create_all()
+
+
+class StubGeocoder:
+    """ Provider answering from a dict, or failing like a provider that can't be reached. """
+
+    def __init__(self, name, points=None, error=None):
+        self.name = name
+        self.points = points or {}
+        self.error = error
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        if self.error is not None:
+            raise GeocodingError(self.error)
+        return self.points.get(address)
+
+
+class GeocodingProvidersTestCase(TestCase):
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address("  123 Main St.,  Hercules, CA 94547 "), "123 main st hercules ca 94547")
+
+    def test_zip_centroid_geocoder(self):
+        geocoder = ZipCentroidGeocoder(app.config['GEOCODING_ZIP_CENTROIDS_PATH'])
+
+        self.assertEqual(geocoder.geocode("123 main st hercules ca 94547"), (38.012692, -122.263093))
+        self.assertEqual(geocoder.geocode("123 main st tucson az 85705-1234"), (32.268735, -110.992199))
+        self.assertIsNone(geocoder.geocode("123 main st nowhere ca 00000"))
+        self.assertIsNone(geocoder.geocode("123 main st hercules ca"))
+
+    def test_build_providers_rejects_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            build_providers({**app.config, 'GEOCODING_PROVIDERS': ['carrier_pigeon']})
+
+
+class GeocodeAddressTestCase(TestCase):
+    def setUp(self):
+        delete_all_tables(self)
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def test_geocode_address_offline(self):
+        self.assertEqual(geocode_address("123 Main St, Hercules, CA 94547"), (38.012692, -122.263093))
+
+    def test_geocode_address_saves_to_cache_table(self):
+        geocode_address("123 Main St, Hercules, CA 94547")
+        db.session.commit()
+
+        cached = GeocodeCache.query.one()
+        self.assertEqual(cached.address_key, "123 main st hercules ca 94547")
+        self.assertEqual(cached.provider, "zip_centroid")
+
+    def test_geocode_address_repeat_is_served_from_memory(self):
+        geocode_address("123 Main St, Hercules, CA 94547")
+
+        with count_queries() as statements:
+            point = geocode_address("123 MAIN ST HERCULES CA 94547")
+
+        self.assertEqual(point, (38.012692, -122.263093))
+        self.assertEqual(statements, [])
+
+    def test_geocode_address_uses_cache_table_before_providers(self):
+        db.session.add(GeocodeCache(address_key="1 elm st hercules ca 94547", latitude=38.0, longitude=-122.0,
+                                    provider="nominatim"))
+        db.session.commit()
+        provider = StubGeocoder("stub")
+
+        with patch("mnb_backend.geocoding.geocoder.get_providers", return_value=[provider]):
+            point = geocode_address("1 Elm St, Hercules, CA 94547")
+
+        self.assertEqual(point, (38.0, -122.0))
+        self.assertEqual(provider.calls, [])
+
+    def test_geocode_address_falls_back_when_provider_fails(self):
+        failing = StubGeocoder("network", error="timed out")
+        fallback = StubGeocoder("offline", points={"1 elm st hercules ca 94547": (38.0, -122.0)})
+
+        with patch("mnb_backend.geocoding.geocoder.get_providers", return_value=[failing, fallback]):
+            point = geocode_address("1 Elm St, Hercules, CA 94547")
+
+        self.assertEqual(point, (38.0, -122.0))
+        self.assertEqual(len(failing.calls), 1)
+
+    def test_geocode_address_misses_are_not_cached(self):
+        provider = StubGeocoder("stub")
+
+        with patch("mnb_backend.geocoding.geocoder.get_providers", return_value=[provider]):
+            with self.assertRaises(GeocodingError):
+                geocode_address("1 Elm St, Nowhere")
+            with self.assertRaises(GeocodingError):
+                geocode_address("1 Elm St, Nowhere")
+
+        self.assertEqual(len(provider.calls), 2)
@@ -0,0 +1,77 @@
+"""test file for background geocoding"""
+from unittest import TestCase
+from unittest.mock import patch
+
+from mnb_backend.addresses.models import City, Location, State
+from mnb_backend.addresses.route_helpers import set_retrieve_address
+from mnb_backend.addresses.states import states
+from mnb_backend.database import db
+from mnb_backend.enums import JobStatusEnum, LocationStatusEnum, UserStatusEnums
+from mnb_backend.errors import GeocodingError
+from mnb_backend.geocoding.jobs import GEOCODE_LOCATION
+from mnb_backend.test_setup_helpers import delete_all_tables
+from mnb_backend.users.models import User
+from mnb_backend.workers.models import Job
+from mnb_backend.workers.worker import run_once
+
+db.drop_all()
+db.create_all()
+
+
+class GeocodeLocationJobTestCase(TestCase):
+    def setUp(self):
+        delete_all_tables(self)
+
+        for state_data in states:
+            db.session.add(State(state_name=state_data['name'], state_abbreviation=state_data['abbreviation']))
+        db.session.add(City(city_name="Hercules"))
+
+        u1 = User.signup("ua@email.com", "password", "uafirstname", "uafirstname", "I am a test user",
+                         UserStatusEnums.ACTIVE)
+        db.session.add(u1)
+        db.session.commit()
+        self.u1_id = u1.id
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def create_address(self):
+        user = db.session.get(User, self.u1_id)
+        with patch("mnb_backend.geocoding.jobs.geocode_address") as mock_geocode_address:
+            user, address, city, state, zipcode, address_string = set_retrieve_address(
+                user, "123 Main St", "Hercules", "CALIFORNIA", "94547")
+
+        mock_geocode_address.assert_not_called()
+        return address
+
+    def test_address_write_queues_geocoding(self):
+        address = self.create_address()
+
+        location = Location.query.filter(Location.address_id == address.id).one()
+        job = Job.query.one()
+        self.assertEqual(location.status, LocationStatusEnum.PENDING)
+        self.assertIsNone(location.point)
+        self.assertEqual(job.kind, GEOCODE_LOCATION)
+        self.assertEqual(job.payload, {"location_id": location.id, "address": "123 Main St Hercules, CA 94547"})
+
+    def test_worker_geocodes_pending_location(self):
+        address = self.create_address()
+
+        self.assertEqual(run_once(), 1)
+
+        location = Location.query.filter(Location.address_id == address.id).one()
+        self.assertEqual(location.status, LocationStatusEnum.GEOCODED)
+        self.assertEqual((location.point_y, location.point_x), (38.012692, -122.263093))
+        self.assertEqual(Job.query.one().status, JobStatusEnum.DONE)
+
+    def test_worker_marks_location_failed_after_last_attempt(self):
+        address = self.create_address()
+        Job.query.update({Job.max_attempts: 1})
+        db.session.commit()
+
+        with patch("mnb_backend.geocoding.jobs.geocode_address", side_effect=GeocodingError("not found")):
+            run_once()
+
+        location = Location.query.filter(Location.address_id == address.id).one()
+        self.assertEqual(location.status, LocationStatusEnum.FAILED)
+        self.assertEqual(Job.query.one().status, JobStatusEnum.FAILED)
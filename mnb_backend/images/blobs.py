@@ -0,0 +1,139 @@
+"""Content-addressed storage of original images.
+
+An original is stored once, under the sha256 of its contents, and has a row in image_blobs counting the
+listing_images and user_images rows pointing at it. Adding an image whose contents are already stored only bumps
+ref_count: nothing is uploaded, and once the blob's renditions have been made they are copied instead of made again.
+Deleting the last image of a blob queues a delete_blob job, which removes the original and its renditions from
+storage unless the blob was referenced again in the meantime.
+"""
+
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import event, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from mnb_backend.api_helpers import upload_images_concurrently
+from mnb_backend.database import db
+from mnb_backend.errors import StorageError
+from mnb_backend.images.models import ImageBlob
+from mnb_backend.images.renditions import get_image_keys
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.user_images.models import UserImage
+from mnb_backend.workers.models import Job
+
+DELETE_BLOB = 'delete_blob'
+
+
+def get_blob_url(blob):
+    """
+    Url of a blob's original."""
+
+    return get_storage().url('images', blob.key)
+
+
+def add_blob_references(files, upload):
+    """
+    Takes a reference to the blob of each IngestedFile, for an image row the caller is about to add. Contents not
+    stored yet are uploaded with upload(file) in parallel on the upload pool, once however many files share them.
+
+    Returns a list of (file, blob, error) in the order of files, blob is None when its upload failed.
+
+    Doesn't commit. The blob rows stay locked until the caller commits, so a delete_blob job can't remove a blob being
+    referenced, and a concurrent upload of the same contents waits to see whether this one stored them."""
+
+    if not files:
+        return []
+
+    references = Counter(file.sha256 for file in files)
+    files_by_sha256 = {}
+    for file in files:
+        files_by_sha256.setdefault(file.sha256, file)
+
+    # sorted so two requests always lock the same blobs in the same order
+    stmt = insert(ImageBlob).values([
+        {'sha256': sha256, 'key': sha256, 'content_type': file.content_type, 'size': file.size,
+         'ref_count': references[sha256]}
+        for sha256, file in sorted(files_by_sha256.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImageBlob.sha256],
+        set_={'ref_count': ImageBlob.ref_count + stmt.excluded.ref_count},
+    ).returning(ImageBlob, literal_column('xmax = 0').label('inserted'))
+
+    blobs = {}
+    new_files = []
+    for blob, inserted in db.session.execute(stmt, execution_options={'populate_existing': True}):
+        blobs[blob.sha256] = blob
+        if inserted:
+            new_files.append(files_by_sha256[blob.sha256])
+
+    errors = {}
+    for file, url, error in upload_images_concurrently(new_files, upload):
+        if error is not None:
+            errors[file.sha256] = error
+            db.session.delete(blobs[file.sha256])
+    db.session.flush()
+
+    return [(file, None, errors[file.sha256]) if file.sha256 in errors else (file, blobs[file.sha256], None)
+            for file in files]
+
+
+def release_blob(connection, blob_id):
+    """
+    Drops a reference to a blob. Queues a delete_blob job when it was the last one.
+
+    Takes the connection to run on, so it can be called while the session is flushing."""
+
+    ref_count = connection.execute(
+        update(ImageBlob.__table__)
+        .where(ImageBlob.id == blob_id)
+        .values(ref_count=ImageBlob.ref_count - 1)
+        .returning(ImageBlob.ref_count)
+    ).scalar_one()
+
+    if ref_count == 0:
+        connection.execute(Job.__table__.insert().values(kind=DELETE_BLOB, payload={'blob_id': blob_id}))
+
+
+@event.listens_for(ListingImage, 'after_delete')
+@event.listens_for(UserImage, 'after_delete')
+def release_deleted_image_blob(mapper, connection, image):
+    """ An image row deleted through the session, directly or by a cascade, gives up its reference. """
+
+    if image.blob_id is not None:
+        release_blob(connection, image.blob_id)
+
+
+def delete_blobs(jobs):
+    """
+    Handles a batch of delete_blob jobs: deletes the blobs still unreferenced, with their original and renditions.
+    Returns {job id: error} for the jobs that failed.
+
+    The rows stay locked until the worker commits, so an upload of the same contents waits and then stores them
+    again instead of referencing objects that are being deleted."""
+
+    storage = get_storage()
+    sizes = current_app.config['IMAGE_RENDITIONS']
+    jobs_by_blob_id = {job.payload['blob_id']: job for job in jobs}
+
+    blobs = db.session.scalars(
+        select(ImageBlob)
+        .where(ImageBlob.id.in_(jobs_by_blob_id), ImageBlob.ref_count == 0)
+        .order_by(ImageBlob.id)
+        .with_for_update()
+    ).all()
+
+    failures = {}
+    for blob in blobs:
+        try:
+            for key in get_image_keys(blob.key, sizes):
+                storage.delete('images', key)
+        except StorageError as error:
+            failures[jobs_by_blob_id[blob.id].id] = error
+            continue
+
+        db.session.delete(blob)
+
+    return failures
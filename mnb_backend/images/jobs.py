@@ -0,0 +1,152 @@
+"""Background rendition making for listing and user images.
+
+Adding an image row enqueues a make_renditions job in the same transaction. The worker downloads the originals of a
+batch, makes their IMAGE_RENDITIONS sizes in a pool of IMAGE_PROCESS_WORKERS processes, uploads them next to the
+originals and records their urls on the rows. reprocess.py runs the same steps over every existing image.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from PIL import Image
+
+from mnb_backend.errors import StorageError
+from mnb_backend.images.renditions import make_renditions, store_renditions
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.user_images.models import UserImage
+from mnb_backend.workers.queue import enqueue
+
+MAKE_RENDITIONS = 'make_renditions'
+
+IMAGE_MODELS = {
+    'listing_image': ListingImage,
+    'user_image': UserImage,
+}
+
+image_pool = None
+
+
+def get_image_key(image_url):
+    """
+    Storage key of an original image, the last part of its url."""
+
+    return image_url.split('/')[-1]
+
+
+def enqueue_make_renditions(image_type, image_id):
+    """
+    Queues making the renditions of a listing_image or user_image row. Doesn't commit."""
+
+    return enqueue(MAKE_RENDITIONS, {'image_type': image_type, 'image_id': image_id})
+
+
+def get_image_pool():
+    """
+    Returns the process pool images are decoded and encoded in, or None when IMAGE_PROCESS_WORKERS is 0 and they are
+    made in this process. Pillow holds the GIL while resizing, so a pool of processes is what lets it use every core.
+
+    The pool's processes are started as soon as it is created, before the caller starts any threads of its own."""
+
+    global image_pool
+
+    workers = current_app.config['IMAGE_PROCESS_WORKERS']
+    if workers == 0:
+        return None
+
+    if image_pool is None:
+        image_pool = ProcessPoolExecutor(max_workers=workers)
+        image_pool.submit(int).result()
+
+    return image_pool
+
+
+def discard_image_pool(pool):
+    """
+    Shuts down a pool one of whose processes died, e.g. out of memory on a huge image, so the next get_image_pool()
+    starts a new one instead of every later batch failing on it."""
+
+    global image_pool
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    if image_pool is pool:
+        image_pool = None
+
+
+def make_renditions_for_images(images):
+    """
+    Makes, stores and records the renditions of image rows, and of their blobs. Images sharing an original are made
+    once. Originals are downloaded here while earlier ones are already being processed in the pool. Doesn't commit.
+
+    Returns {image: error} for the images that failed."""
+
+    storage = get_storage()
+    pool = get_image_pool()
+    config = current_app.config
+    options = (config['IMAGE_RENDITIONS'], config['IMAGE_WEBP_QUALITY'], config['IMAGE_JPEG_QUALITY'])
+
+    images_by_key = {}
+    for image in images:
+        images_by_key.setdefault(get_image_key(image.image_url), []).append(image)
+
+    failures = {}
+    pending = []
+    for key, key_images in images_by_key.items():
+        try:
+            original = storage.get('images', key)
+        except StorageError as error:
+            failures.update(dict.fromkeys(key_images, error))
+            continue
+
+        if pool is None:
+            pending.append((key_images, key, None, original))
+            continue
+
+        try:
+            pending.append((key_images, key, pool.submit(make_renditions, original, *options), None))
+        except BrokenProcessPool as error:
+            failures.update(dict.fromkeys(key_images, error))
+
+    for key_images, key, future, original in pending:
+        try:
+            renditions = make_renditions(original, *options) if future is None else future.result()
+            urls = store_renditions(storage, 'images', key, renditions)
+        # when the pool breaks, the images it hadn't finished fail and are retried, those it had are kept
+        except (StorageError, OSError, ValueError, Image.DecompressionBombError, BrokenProcessPool) as error:
+            failures.update(dict.fromkeys(key_images, error))
+            continue
+
+        for image in key_images:
+            image.renditions = urls
+            if image.blob is not None:
+                image.blob.renditions = urls
+
+    if any(isinstance(error, BrokenProcessPool) for error in failures.values()):
+        discard_image_pool(pool)
+
+    return failures
+
+
+def make_renditions_batch(jobs):
+    """
+    Handles a batch of make_renditions jobs. Returns {job id: error} for the jobs that failed.
+    Jobs for images deleted since are dropped. An image whose blob got its renditions from an earlier job gets a copy
+    of them."""
+
+    jobs_by_image = {}
+    for image_type, model in IMAGE_MODELS.items():
+        image_ids = {job.payload['image_id']: job for job in jobs if job.payload['image_type'] == image_type}
+        for image in model.query.filter(model.id.in_(image_ids)).order_by(model.id):
+            jobs_by_image[image] = image_ids[image.id]
+
+    to_make = []
+    for image in jobs_by_image:
+        if image.blob is not None and image.blob.renditions is not None:
+            image.renditions = image.blob.renditions
+        else:
+            to_make.append(image)
+
+    failures = make_renditions_for_images(to_make)
+
+    return {jobs_by_image[image].id: error for image, error in failures.items()}
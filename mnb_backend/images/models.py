@@ -0,0 +1,64 @@
+"""Model for ImageBlob"""
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import JSONB
+
+from mnb_backend.database import db
+
+
+# region ImageBlob
+class ImageBlob(db.Model):
+    """ An original image stored once under the sha256 of its contents, shared by every listing_image and user_image
+    with those contents. ref_count is the number of image rows pointing at it. """
+
+    __tablename__ = 'image_blobs'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    sha256 = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+    # storage key in the images bucket
+    key = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    content_type = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    size = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    ref_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+    )
+
+    # renditions made from this blob, copied to images added later instead of making them again
+    renditions = db.Column(
+        JSONB(none_as_null=True),
+        nullable=True,
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self):
+        return f"< ImageBlob #{self.id}, Key: {self.key}, References: {self.ref_count} >"
+
+# endregion
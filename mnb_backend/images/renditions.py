@@ -0,0 +1,130 @@
+"""Image derivative pipeline.
+
+An uploaded original is turned into a set of renditions (IMAGE_RENDITIONS, name -> max (width, height)), each
+encoded as WebP with a JPEG fallback for clients without WebP. The original is decoded once, at the smallest scale
+the largest rendition allows: JPEGs are decoded with draft(), which lets libjpeg scale down by up to 8x while
+decoding. Renditions are then made from the next larger one, largest first. EXIF and other metadata are dropped,
+after the EXIF orientation has been applied to the pixels.
+
+Nothing here touches the app or the database, so it can run in a worker process.
+"""
+
+import math
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+}
+
+
+def open_original(data, max_size):
+    """
+    Decodes an original at no less than max_size, upright and without metadata. Returns an RGB or RGBA image."""
+
+    with Image.open(BytesIO(data)) as image:
+        if image.format == 'JPEG':
+            # smallest decode that still covers max_size whichever way the EXIF orientation turns the image
+            width, height = image.size
+            scale = min(max_size[0] / width, max_size[1] / height, max_size[0] / height, max_size[1] / width)
+            if scale < 1:
+                image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+        image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    image.info = {}
+
+    return image
+
+
+def flatten(image):
+    """
+    Returns image without transparency, on a white background, for JPEG."""
+
+    if image.mode == 'RGB':
+        return image
+
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def encode(image, image_format, quality):
+    """
+    Encodes image as WEBP or JPEG. Returns the bytes."""
+
+    out = BytesIO()
+    if image_format == 'JPEG':
+        flatten(image).save(out, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(out, format='WEBP', quality=quality, method=4)
+
+    return out.getvalue()
+
+
+def make_renditions(data, sizes, webp_quality=80, jpeg_quality=85):
+    """
+    Makes every rendition in sizes (name -> max (width, height)) of the original image bytes in data.
+    A rendition is never larger than the original.
+
+    Returns {name: {'width', 'height', 'webp': bytes, 'jpeg': bytes}}."""
+
+    largest = max(sizes.values(), key=lambda size: size[0] * size[1])
+    image = open_original(data, largest)
+    quality = {'webp': webp_quality, 'jpeg': jpeg_quality}
+
+    renditions = {}
+    for name, size in sorted(sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True):
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+        renditions[name] = {'width': image.width, 'height': image.height}
+        for format_name, (image_format, content_type, extension) in FORMATS.items():
+            renditions[name][format_name] = encode(image, image_format, quality[format_name])
+
+    return renditions
+
+
+def get_rendition_key(key, name, format_name):
+    """
+    Storage key of a rendition of the original stored under key."""
+
+    return f"{key}-{name}.{FORMATS[format_name][2]}"
+
+
+def get_image_keys(key, sizes):
+    """
+    Storage keys of the original stored under key and of every rendition in sizes made from it."""
+
+    return [key] + [get_rendition_key(key, name, format_name) for name in sizes for format_name in FORMATS]
+
+
+def store_renditions(storage, bucket, key, renditions):
+    """
+    Uploads renditions made by make_renditions next to the original stored under key.
+
+    Returns {name: {'width', 'height', 'webp': url, 'jpeg': url}}, to be saved on the image row."""
+
+    urls = {}
+    for name, rendition in renditions.items():
+        urls[name] = {'width': rendition['width'], 'height': rendition['height']}
+        for format_name, (image_format, content_type, extension) in FORMATS.items():
+            urls[name][format_name] = storage.put(bucket, get_rendition_key(key, name, format_name),
+                                                  rendition[format_name], content_type=content_type)
+
+    return urls
+
+
+def get_rendition(renditions, name):
+    """
+    Returns the rendition called name from an image row's renditions, or None if it hasn't been made yet."""
+
+    if not renditions:
+        return None
+
+    return renditions.get(name)
@@ -0,0 +1,117 @@
+"""Remakes the renditions of every listing and user image.
+
+    python -m mnb_backend.images.reprocess [--all] [--batch-size 50] [--workers 4] [--checkpoint FILE] [--restart]
+
+Images are read in id order in batches. Each batch's renditions are made in parallel in the image process pool and
+committed together, then the last id done is written to the checkpoint file. An interrupted run picks up after the
+last committed batch. By default only images without renditions are done, --all remakes every image, e.g. after
+IMAGE_RENDITIONS changed.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from sqlalchemy import func, select
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.images.jobs import IMAGE_MODELS, get_image_pool, make_renditions_for_images
+
+DEFAULT_CHECKPOINT = '.reprocess_renditions.json'
+
+
+def load_checkpoint(path):
+    """
+    Returns {image type: last id done} from the checkpoint file, empty if there isn't one."""
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Writes the checkpoint through a temporary file, so an interrupted write never leaves a broken one."""
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def get_images_query(model, only_missing, after_id):
+    """
+    Select of the images of a model still to do, in id order."""
+
+    stmt = select(model).where(model.id > after_id).order_by(model.id)
+    if only_missing:
+        stmt = stmt.where(model.renditions.is_(None))
+
+    return stmt
+
+
+def reprocess(image_type, batch_size, only_missing, checkpoint, checkpoint_path, report=print):
+    """
+    Makes the renditions of every image of one type after the checkpoint. Returns (done, failed)."""
+
+    model = IMAGE_MODELS[image_type]
+    after_id = checkpoint.get(image_type, 0)
+    total = db.session.scalar(select(func.count()).select_from(
+        get_images_query(model, only_missing, after_id).order_by(None).subquery()))
+
+    done = failed = 0
+    started = time.monotonic()
+    while True:
+        images = db.session.scalars(get_images_query(model, only_missing, after_id).limit(batch_size)).all()
+        if not images:
+            break
+
+        failures = make_renditions_for_images(images)
+        db.session.commit()
+
+        for image, error in failures.items():
+            report(f"{image_type} {image.id} failed: {error}")
+
+        after_id = images[-1].id
+        checkpoint[image_type] = after_id
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        done += len(images)
+        failed += len(failures)
+        rate = done / max(time.monotonic() - started, 1e-9)
+        report(f"{image_type}: {done}/{total} ({done / total:.0%}), {failed} failed, {rate:.1f} images/s")
+
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--all', action='store_true', help="remake images that already have renditions too")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, help="image processes, defaults to IMAGE_PROCESS_WORKERS")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and start from the first image")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        app.config['IMAGE_PROCESS_WORKERS'] = args.workers
+
+    checkpoint = {} if args.restart else load_checkpoint(args.checkpoint)
+
+    with app.app_context():
+        get_image_pool()
+
+        for image_type in IMAGE_MODELS:
+            done, failed = reprocess(image_type, args.batch_size, not args.all, checkpoint, args.checkpoint)
+            print(f"{image_type}: finished, {done} done, {failed} failed")
+
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""test file for content-addressed image blobs"""
+from io import BytesIO
+
+from PIL import Image
+
+from mnb_backend import app
+from mnb_backend.api_helpers import aws_put_image, db_add_listing_images
+from mnb_backend.database import db
+from mnb_backend.images.blobs import DELETE_BLOB, add_blob_references, get_blob_url
+from mnb_backend.images.jobs import MAKE_RENDITIONS
+from mnb_backend.images.models import ImageBlob
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.listing_images.tests.setup import ListingImagesBaseViewTestCase
+from mnb_backend.listings.models import Listing
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.uploads.ingest import ingest_upload
+from mnb_backend.workers.models import Job
+from mnb_backend.workers.worker import run_once
+
+db.drop_all()
+db.create_all()
+
+
+def make_jpeg(color='red'):
+    out = BytesIO()
+    Image.new('RGB', (800, 600), color).save(out, format='JPEG')
+    return out.getvalue()
+
+
+class ImageBlobTestCase(ListingImagesBaseViewTestCase):
+    def add_listing_images(self, *contents):
+        """ Adds a listing image for each of contents the way the listing images route does. Returns their ids. """
+
+        files = [ingest_upload(BytesIO(data)) for data in contents]
+        blobs = [blob for file, blob, error in add_blob_references(files, aws_put_image)]
+        listing_images = db_add_listing_images(self.l1_id, [get_blob_url(blob) for blob in blobs], blobs)
+        return [listing_image.id for listing_image in listing_images]
+
+    def test_duplicates_are_made_once(self):
+        data = make_jpeg()
+        first_id, second_id = self.add_listing_images(data, data)
+
+        run_once()
+        [third_id] = self.add_listing_images(data)
+
+        first, second, third = [db.session.get(ListingImage, image_id) for image_id in (first_id, second_id, third_id)]
+        self.assertEqual(first.blob.ref_count, 3)
+        self.assertEqual(set(first.renditions), set(app.config['IMAGE_RENDITIONS']))
+        self.assertEqual(second.renditions, first.renditions)
+        self.assertEqual(third.renditions, first.renditions)
+        # the third image was added after the blob had renditions, so it didn't queue a job
+        self.assertEqual(Job.query.filter_by(kind=MAKE_RENDITIONS).count(), 2)
+
+    def test_last_reference_deletes_blob(self):
+        data = make_jpeg()
+        first_id, second_id = self.add_listing_images(data, data)
+        run_once()
+        blob = db.session.get(ListingImage, first_id).blob
+        key = blob.key
+
+        db.session.delete(db.session.get(ListingImage, first_id))
+        db.session.commit()
+
+        self.assertEqual(db.session.get(ImageBlob, blob.id).ref_count, 1)
+        self.assertEqual(Job.query.filter_by(kind=DELETE_BLOB).count(), 0)
+
+        db.session.delete(db.session.get(ListingImage, second_id))
+        db.session.commit()
+        run_once()
+
+        self.assertIsNone(db.session.get(ImageBlob, blob.id))
+        self.assertIsNone(get_storage().head('images', key))
+        self.assertIsNone(get_storage().head('images', f"{key}-thumb.webp"))
+
+    def test_deleted_listing_releases_its_blobs(self):
+        [image_id] = self.add_listing_images(make_jpeg())
+        blob_id = db.session.get(ListingImage, image_id).blob_id
+
+        db.session.delete(db.session.get(Listing, self.l1_id))
+        db.session.commit()
+
+        self.assertIsNone(db.session.get(ListingImage, image_id))
+        self.assertEqual(db.session.get(ImageBlob, blob_id).ref_count, 0)
+        self.assertEqual(Job.query.filter_by(kind=DELETE_BLOB).count(), 1)
+
+    def test_blob_referenced_again_is_kept(self):
+        data = make_jpeg()
+        [image_id] = self.add_listing_images(data)
+
+        db.session.delete(db.session.get(ListingImage, image_id))
+        db.session.commit()
+        self.add_listing_images(data)
+        run_once()
+
+        blob = ImageBlob.query.one()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertIsNotNone(get_storage().head('images', blob.key))
@@ -0,0 +1,89 @@
+"""test file for background rendition making"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from mnb_backend import app
+from mnb_backend.api_helpers import db_add_listing_images
+from mnb_backend.database import db
+from mnb_backend.enums import JobStatusEnum
+from mnb_backend.images import jobs
+from mnb_backend.images.jobs import MAKE_RENDITIONS
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.listing_images.tests.setup import ListingImagesBaseViewTestCase
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.workers.models import Job
+from mnb_backend.workers.worker import run_once
+
+db.drop_all()
+db.create_all()
+
+
+class BrokenPool:
+    """ A process pool one of whose processes died """
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class MakeRenditionsJobTestCase(ListingImagesBaseViewTestCase):
+    def add_listing_image(self, data):
+        image_url = get_storage().put('images', 'original', data, content_type='image/jpeg')
+        [listing_image] = db_add_listing_images(self.l1_id, [image_url])
+        return listing_image.id
+
+    def test_adding_image_queues_renditions(self):
+        listing_image_id = self.add_listing_image(b"not decoded yet")
+
+        job = Job.query.one()
+        self.assertEqual(job.kind, MAKE_RENDITIONS)
+        self.assertEqual(job.payload, {"image_type": "listing_image", "image_id": listing_image_id})
+        self.assertIsNone(db.session.get(ListingImage, listing_image_id).serialize()["rendition"])
+
+    def test_worker_makes_renditions(self):
+        out = BytesIO()
+        Image.new('RGB', (1200, 900), 'red').save(out, format='JPEG')
+        listing_image_id = self.add_listing_image(out.getvalue())
+
+        self.assertEqual(run_once(), 1)
+
+        listing_image = db.session.get(ListingImage, listing_image_id)
+        self.assertEqual(set(listing_image.renditions), set(app.config['IMAGE_RENDITIONS']))
+        card = listing_image.serialize(rendition='card')["rendition"]
+        self.assertEqual((card["width"], card["height"]), (600, 450))
+        self.assertEqual(get_storage().head('images', 'original-card.webp')['content_type'], 'image/webp')
+        self.assertEqual(Job.query.one().status, JobStatusEnum.DONE)
+
+    def test_worker_retries_undecodable_image(self):
+        self.add_listing_image(b"not an image")
+
+        run_once()
+
+        job = Job.query.one()
+        self.assertEqual(job.status, JobStatusEnum.PENDING)
+        self.assertIsNotNone(job.last_error)
+
+    def test_broken_pool_is_replaced(self):
+        self.add_listing_image(b"not decoded yet")
+        pool = BrokenPool()
+
+        with patch.dict(app.config, {'IMAGE_PROCESS_WORKERS': 1}), patch.object(jobs, 'image_pool', pool):
+            run_once()
+
+            self.assertTrue(pool.shut_down)
+            self.assertIsNone(jobs.image_pool)
+
+        job = Job.query.one()
+        self.assertEqual(job.status, JobStatusEnum.PENDING)
+        self.assertIn("terminated abruptly", job.last_error)
@@ -0,0 +1,76 @@
+"""test file for the image rendition pipeline"""
+from io import BytesIO
+from unittest import TestCase
+
+from PIL import Image
+
+from mnb_backend.images.renditions import get_rendition, make_renditions, open_original, store_renditions
+from mnb_backend.storage.backends import MemoryStorage
+
+SIZES = {'thumb': (200, 200), 'card': (600, 600), 'detail': (1600, 1600)}
+
+ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def make_jpeg(size, orientation=None):
+    exif = Image.Exif()
+    exif[0x010f] = "Test Camera"
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+
+    out = BytesIO()
+    Image.new('RGB', size, 'red').save(out, format='JPEG', exif=exif.tobytes())
+    return out.getvalue()
+
+
+class MakeRenditionsTestCase(TestCase):
+    def test_makes_every_size_in_both_formats(self):
+        renditions = make_renditions(make_jpeg((4000, 3000)), SIZES)
+
+        self.assertEqual({name: (rendition['width'], rendition['height']) for name, rendition in renditions.items()},
+                         {'thumb': (200, 150), 'card': (600, 450), 'detail': (1600, 1200)})
+        for rendition in renditions.values():
+            self.assertEqual(Image.open(BytesIO(rendition['webp'])).format, 'WEBP')
+            self.assertEqual(Image.open(BytesIO(rendition['jpeg'])).format, 'JPEG')
+
+    def test_applies_orientation_and_strips_exif(self):
+        renditions = make_renditions(make_jpeg((4000, 3000), orientation=ROTATED_90), SIZES)
+
+        detail = Image.open(BytesIO(renditions['detail']['jpeg']))
+        self.assertEqual(detail.size, (1200, 1600))
+        self.assertEqual(dict(detail.getexif()), {})
+        self.assertEqual(dict(Image.open(BytesIO(renditions['detail']['webp'])).getexif()), {})
+
+    def test_never_upscales(self):
+        renditions = make_renditions(make_jpeg((300, 100)), SIZES)
+
+        self.assertEqual((renditions['detail']['width'], renditions['detail']['height']), (300, 100))
+        self.assertEqual((renditions['thumb']['width'], renditions['thumb']['height']), (200, 67))
+
+    def test_large_jpegs_are_decoded_scaled_down(self):
+        image = open_original(make_jpeg((6400, 4800)), (1600, 1600))
+
+        self.assertEqual(image.size, (1600, 1200))
+
+    def test_transparent_png_gets_jpeg_fallback(self):
+        out = BytesIO()
+        Image.new('RGBA', (400, 400), (0, 0, 0, 0)).save(out, format='PNG')
+
+        renditions = make_renditions(out.getvalue(), SIZES)
+
+        self.assertEqual(Image.open(BytesIO(renditions['card']['jpeg'])).getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(Image.open(BytesIO(renditions['card']['webp'])).mode, 'RGBA')
+
+
+class StoreRenditionsTestCase(TestCase):
+    def test_stores_next_to_original(self):
+        storage = MemoryStorage({'images': 'test-images'})
+
+        urls = store_renditions(storage, 'images', 'abc', make_renditions(make_jpeg((800, 600)), SIZES))
+
+        self.assertEqual(urls['card'], {'width': 600, 'height': 450, 'webp': "memory://test-images/abc-card.webp",
+                                        'jpeg': "memory://test-images/abc-card.jpg"})
+        self.assertEqual(storage.head('images', 'abc-thumb.webp')['content_type'], 'image/webp')
+        self.assertEqual(get_rendition(urls, 'card'), urls['card'])
+        self.assertIsNone(get_rendition(None, 'card'))
@@ -0,0 +1,70 @@
+"""test file for reprocessing every image"""
+import os
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.images.reprocess import load_checkpoint, reprocess
+from mnb_backend.listing_images.models import ListingImage
+from mnb_backend.listing_images.tests.setup import ListingImagesBaseViewTestCase
+from mnb_backend.storage.backends import get_storage
+
+db.drop_all()
+db.create_all()
+
+
+class ReprocessTestCase(ListingImagesBaseViewTestCase):
+    def setUp(self):
+        super().setUp()
+
+        out = BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(out, format='JPEG')
+
+        self.image_ids = []
+        for key, data in [('original-1', out.getvalue()), ('original-2', b"not an image"),
+                          ('original-3', out.getvalue())]:
+            listing_image = ListingImage(listing_id=self.l1_id, image_url=get_storage().put('images', key, data))
+            db.session.add(listing_image)
+            db.session.commit()
+            self.image_ids.append(listing_image.id)
+
+        self.checkpoint_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.checkpoint_dir.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.checkpoint_dir.cleanup()
+
+    def get_renditions(self):
+        return [db.session.get(ListingImage, image_id).renditions for image_id in self.image_ids]
+
+    def test_reprocess_makes_missing_renditions(self):
+        checkpoint = {}
+        done, failed = reprocess('listing_image', 2, True, checkpoint, self.checkpoint_path, report=lambda line: None)
+
+        renditions = self.get_renditions()
+        self.assertEqual((done, failed), (3, 1))
+        self.assertIsNotNone(renditions[0])
+        self.assertIsNone(renditions[1])
+        self.assertIsNotNone(renditions[2])
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {'listing_image': self.image_ids[2]})
+
+    def test_reprocess_resumes_after_checkpoint(self):
+        checkpoint = {'listing_image': self.image_ids[1]}
+        done, failed = reprocess('listing_image', 2, True, checkpoint, self.checkpoint_path, report=lambda line: None)
+
+        renditions = self.get_renditions()
+        self.assertEqual((done, failed), (1, 0))
+        self.assertIsNone(renditions[0])
+        self.assertIsNotNone(renditions[2])
+
+    def test_reprocess_in_process_pool(self):
+        with patch.dict(app.config, {'IMAGE_PROCESS_WORKERS': 2}), \
+                patch("mnb_backend.images.jobs.image_pool", None):
+            done, failed = reprocess('listing_image', 10, True, {}, self.checkpoint_path, report=lambda line: None)
+
+        self.assertEqual((done, failed), (3, 1))
+        self.assertEqual(self.get_renditions()[2]['card']['width'], 600)
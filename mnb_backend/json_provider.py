@@ -0,0 +1,60 @@
+"""Flask JSON provider backed by orjson.
+
+jsonify() and request.get_json() go through app.json. orjson encodes straight to bytes, which become the response
+body as they are, and handles enums, dataclasses and UUIDs itself. Dates and datetimes keep the HTTP date format
+Flask's default provider writes, through default(), but the serialize() methods of the models already hand them
+over as strings, see mnb_backend/serializers.py.
+"""
+
+import decimal
+from datetime import date
+
+import orjson
+from flask.json.provider import JSONProvider
+
+from mnb_backend.serializers import http_date
+
+
+def default(value):
+    """ Converts what orjson can't encode itself, like Flask's default provider does """
+
+    if isinstance(value, date):
+        return http_date(value)
+
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """ JSON provider encoding with orjson. Keys are sorted and responses indented in debug, as by default. """
+
+    sort_keys = True
+    compact = None
+    mimetype = "application/json"
+
+    def _options(self, indent=False):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=default, option=self._options(indent=bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+
+        return self._app.response_class(orjson.dumps(obj, default=default, option=self._options(indent)) + b"\n",
+                                        mimetype=self.mimetype)
@@ -1,5 +1,9 @@
 """Listing Images Model"""
+from sqlalchemy.dialects.postgresql import JSONB
+
 from mnb_backend.database import db
+from mnb_backend.images.models import ImageBlob
+from mnb_backend.images.renditions import get_rendition
 # from mnb_backend import app
 
 
@@ -26,13 +30,29 @@ class ListingImage(db.Model):
         nullable=False
     )
 
-    def serialize(self):
-        """ returns self """
+    # the stored original, None for images uploaded straight to storage and images added before blobs
+    blob_id = db.Column(
+        db.Integer,
+        db.ForeignKey('image_blobs.id'),
+        nullable=True,
+        index=True,
+    )
+    blob = db.relationship(ImageBlob)
+
+    # {name: {width, height, webp, jpeg}} urls of the sizes made from image_url, empty until they have been made
+    renditions = db.Column(
+        JSONB(none_as_null=True),
+        nullable=True
+    )
+
+    def serialize(self, rendition='detail'):
+        """ returns self, with the urls of the rendition size the endpoint shows (see IMAGE_RENDITIONS) """
 
         return {
             "id": self.id,
             "listing_id": self.listing_id,
             "image_url": self.image_url,
+            "rendition": get_rendition(self.renditions, rendition),
         }
 
     @classmethod
@@ -1,30 +1,34 @@
 """Routes for listing images blueprint."""
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import select
 from werkzeug.exceptions import abort
 
+from mnb_backend.cache import get_response_cache, invalidate
 from mnb_backend.database import db
+from mnb_backend.errors import UploadError
 
-from mnb_backend.api_helpers import aws_upload_image
+from mnb_backend.api_helpers import aws_put_image, db_add_listing_images
+from mnb_backend.images.blobs import add_blob_references, get_blob_url
 from mnb_backend.listing_images.models import ListingImage
 from mnb_backend.listings.models import Listing
+from mnb_backend.pagination import paginate
+from mnb_backend.uploads.ingest import ingest_upload
 from mnb_backend.users.models import User
 
 listing_images_routes = Blueprint('listing_images_routes', __name__)
 
 
-
-
 @listing_images_routes.post("/listing/<int:listing_uid>")
 @jwt_required()
 def add_listing_image(listing_uid):
-    """Add listing image, and return data about listing image.
+    """Add listing images, uploading all files in parallel, and return data about each file.
+    Files are checked by their contents, JPEG and PNG images are accepted. Contents already stored aren't uploaded
+    again.
 
     Returns JSON like:
-        {listing_image: {id, listing_owner, image_url }}
+        {uploaded_results: [{id, listing_id, image_url}, ...], errors: [{filename: reason}, ...]}
     """
-    # TODO: if we get an array of files, then we could do a list comprehension where
-    # we use the helper function and add that to the table for each one in the comprehension
 
     current_user_id = get_jwt_identity()
     listing = Listing.query.get_or_404(listing_uid)
@@ -32,32 +36,40 @@ def add_listing_image(listing_uid):
     if current_user_id == listing.owner.id:
         files = request.files
 
-        errors = []
-        files_uploaded = []
-
         if len(files) == 0:
-            # if len(files.items()) is 0:
             abort(400, "Image required")
-        for title, file in files.items():
-            if file.content_type == "image/jpeg":
-                url = aws_upload_image(file)
-                # url = upload_to_aws(file)
-
-                listing_image = ListingImage.create_listing_image(
-                    listing_id=listing_uid,
-                    image_url=url
-                )
-
-                db.session.add(listing_image)
-                db.session.commit()
-
-                files_uploaded.append(listing_image.serialize())
 
+        errors = []
+        rejections = []
+        image_files = []
+        try:
+            for title, file in files.items():
+                try:
+                    image_files.append(ingest_upload(file))
+                except UploadError as error:
+                    rejections.append(error)
+                    errors.append({f"{file.filename}": str(error)})
+
+            if len(image_files) == 0:
+                abort(rejections[0].status_code, f"No files were uploaded. {rejections[0]}")
+
+            results = add_blob_references(image_files, aws_put_image)
+        finally:
+            for image_file in image_files:
+                image_file.close()
+
+        blobs = []
+        for file, blob, error in results:
+            if error is None:
+                blobs.append(blob)
             else:
-                errors.append({f"{file.filename}": file.content_type})
+                errors.append({f"{file.filename}": "Upload failed"})
 
-            if len(files_uploaded) == 0 and len(errors) > 0:
-                abort(400, "No files were uploaded because filetype was incorrect.")
+        if len(blobs) == 0:
+            abort(502, "Failed to upload images")
+
+        listing_images = db_add_listing_images(listing_uid, [get_blob_url(blob) for blob in blobs], blobs)
+        files_uploaded = [listing_image.serialize() for listing_image in listing_images]
 
         return jsonify(uploaded_results=files_uploaded, errors=errors), 201
     abort(401, "Not authorized")
@@ -65,33 +77,35 @@ def add_listing_image(listing_uid):
 
 @listing_images_routes.get("/")
 def get_all_listing_images():
-    """gets all listing images
+    """gets listing images, in id order. Paginate with limit and the cursor returned as next_cursor.
 
     Returns JSON like:
-        {listing_images: [{id, listing_owner, image_url }...]}
+        {listing_images: [{id, listing_id, image_url, rendition}...], next_cursor}
     """
 
-    listing_images = ListingImage.query.all()
-    serialized = [listing_image.serialize() for listing_image in listing_images]
+    listing_images, next_cursor = paginate(select(ListingImage), [ListingImage.id], request.args)
+    serialized = [listing_image.serialize(rendition='card') for listing_image in listing_images]
 
-    return jsonify(listing_images=serialized)
+    return jsonify(listing_images=serialized, next_cursor=next_cursor)
 
 
 @listing_images_routes.get("/<int:listing_image_id>")
 def get_listing_image(listing_image_id):
-    """gets listing image
+    """gets listing image. Served from the response cache.
 
     Returns JSON like:
         {listing_image: {id, listing_owner, image_url }}
     """
 
+    def load():
+        listing_image = db.session.get(ListingImage, listing_image_id)
+        if listing_image is None:
+            abort(404)
+        return listing_image.serialize(), [('listings', listing_image.listing_id)]
 
-    listing_image = db.session.get(ListingImage, listing_image_id)
-    if listing_image:
-        serialized = listing_image.serialize()
-        return jsonify(listing_image=serialized)
+    serialized = get_response_cache().get(('listing_images', listing_image_id), load)
 
-    abort(404)
+    return jsonify(listing_image=serialized)
 
 
 @listing_images_routes.delete("/<int:listing_image_id>")
@@ -110,6 +124,7 @@ def delete_listing_image(listing_image_id):
     if current_user_id == listing_image.listing.owner.id or is_admin is True:
         db.session.delete(listing_image)
         db.session.commit()
+        invalidate(('listing_images', listing_image_id))
 
         return jsonify("Listing Image successfully deleted"), 200
 
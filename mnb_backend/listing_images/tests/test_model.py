@@ -74,5 +74,6 @@ class GetListingImageTestCase(ListingImagesBaseViewTestCase):
             self.assertEqual(serialized_listing_image, {
                 "id": listing_image1.id,
                 "listing_id": listing_image1.listing.id,
-                "image_url": listing_image1.image_url
+                "image_url": listing_image1.image_url,
+                "rendition": None,
             })
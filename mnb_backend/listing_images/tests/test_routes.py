@@ -1,13 +1,21 @@
 """test file for listing routes"""
+import hashlib
 from io import BytesIO
+from threading import Barrier
 from unittest.mock import patch
-from mnb_backend.api_helpers import aws_upload_image
 from flask_jwt_extended import create_access_token
+from sqlalchemy import func, select, text
 
 from mnb_backend import app
 from mnb_backend.database import db
+from mnb_backend.enums import RackActivityTypeEnum, RackMountTypeEnum
+from mnb_backend.images.models import ImageBlob
+from mnb_backend.listing_images.models import ListingImage
 from mnb_backend.listings.models import Listing
 from mnb_backend.listing_images.tests.setup import ListingImagesBaseViewTestCase
+from mnb_backend.pagination import encode_cursor, keyset_paginate
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.test_setup_helpers import TEST_JPEG_BYTES, count_queries
 # from mnb_backend.listing_images.routes import
 from mnb_backend.users.models import User
 
@@ -26,7 +34,7 @@ listing_images_root = "/api/listing_images"
 # assert
 
 class CreateListingImageTestCase(ListingImagesBaseViewTestCase):
-    @patch("mnb_backend.listing_images.routes.aws_upload_image")
+    @patch("mnb_backend.listing_images.routes.aws_put_image")
     def test_add_listing_image_happy(self, mock_upload_to_aws):
         """Tests adding a listing image and verifies that it is created successfully."""
         # Arrange
@@ -38,7 +46,7 @@ class CreateListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             json_data = {"image1": test_image}
@@ -68,7 +76,7 @@ class CreateListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             json_data = {}
@@ -93,8 +101,8 @@ class CreateListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
-            test_image.name = "test_image.pdf"
+            test_image = BytesIO(b"%PDF-1.4 test data")
+            test_image.name = "test_image.jpg"
 
             json_data = {"image1": test_image}
 
@@ -104,12 +112,177 @@ class CreateListingImageTestCase(ListingImagesBaseViewTestCase):
                                    data=json_data)
 
             # Assert
-            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.status_code, 415)
             self.assertEqual(len(u1.listings[0].images), 0)
 
 
+class ConcurrentListingImageUploadTestCase(ListingImagesBaseViewTestCase):
+    def get_contents(self, name, contents=None):
+        """ Contents posted for a file, a JPEG different for every name unless contents has bytes for that name. """
+
+        return (contents or {}).get(name, TEST_JPEG_BYTES + name.encode())
+
+    def get_image_url(self, data):
+        return get_storage().url('images', hashlib.sha256(data).hexdigest())
+
+    def post_images(self, files, contents=None, listing_id=None):
+        access_token = create_access_token(identity=self.u1_id)
+        data = {}
+        for i, name in enumerate(files):
+            image = BytesIO(self.get_contents(name, contents))
+            image.name = name
+            data[f"image{i}"] = image
+
+        with app.test_client() as client:
+            return client.post(f"{listing_images_root}/listing/{listing_id or self.l1_id}",
+                               headers={"Authorization": f"Bearer {access_token}"}, data=data)
+
+    def test_add_listing_images_uploads_in_parallel(self):
+        """Every upload has to be in flight at once for the barrier to let them through."""
+
+        barrier = Barrier(3, timeout=5)
+
+        def upload(file):
+            barrier.wait()
+            return f"https://images.example.com/{file.filename}"
+
+        with patch("mnb_backend.listing_images.routes.aws_put_image", side_effect=upload):
+            response = self.post_images(["a.jpg", "b.jpg", "c.jpg"])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([image["image_url"] for image in response.json["uploaded_results"]],
+                         [self.get_image_url(self.get_contents(name)) for name in ["a.jpg", "b.jpg", "c.jpg"]])
+
+    def test_add_listing_images_reports_each_file(self):
+        def upload(file):
+            if file.filename == "b.jpg":
+                raise ConnectionError("S3 unavailable")
+            return f"https://images.example.com/{file.filename}"
+
+        with patch("mnb_backend.listing_images.routes.aws_put_image", side_effect=upload):
+            response = self.post_images(["a.jpg", "b.jpg", "c.pdf"], {"c.pdf": b"%PDF-1.4 test data"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([image["image_url"] for image in response.json["uploaded_results"]],
+                         [self.get_image_url(self.get_contents("a.jpg"))])
+        self.assertEqual(response.json["errors"], [{"c.pdf": "File must be one of image/jpeg, image/png"},
+                                                   {"b.jpg": "Upload failed"}])
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 1)
+
+    def test_add_listing_images_inserts_in_one_statement(self):
+        with patch("mnb_backend.listing_images.routes.aws_put_image", return_value="mocked_url"):
+            with count_queries() as statements:
+                response = self.post_images([f"{i}.jpg" for i in range(5)])
+
+        self.assertEqual(len(response.json["uploaded_results"]), 5)
+        inserts = [statement for statement in statements if statement.startswith("INSERT INTO listing_images")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_add_listing_images_checks_contents_not_content_type(self):
+        uploaded = []
+
+        def upload(file):
+            uploaded.append((file.filename, file.content_type, file.read()))
+            return f"https://images.example.com/{file.filename}"
+
+        png = b"\x89PNG\r\n\x1a\ntest image data"
+        with patch("mnb_backend.listing_images.routes.aws_put_image", side_effect=upload):
+            response = self.post_images(["a.bin"], {"a.bin": png})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(uploaded, [("a.bin", "image/png", png)])
+
+    def test_add_listing_images_rejects_large_files(self):
+        with patch.dict(app.config, UPLOAD_MAX_IMAGE_BYTES=10), \
+                patch("mnb_backend.listing_images.routes.aws_put_image") as mock_upload:
+            response = self.post_images(["a.jpg"])
+
+        self.assertEqual(response.status_code, 413)
+        mock_upload.assert_not_called()
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+    def test_same_contents_are_stored_once(self):
+        l2 = Listing.create_listing(owner=db.session.get(User, self.u1_id), title="Hitch bike rack",
+                                    mount_type=RackMountTypeEnum.HITCH.value,
+                                    activity_type=RackActivityTypeEnum.BICYCLE.value, rate_price=1500)
+        contents = {"a.jpg": TEST_JPEG_BYTES, "b.jpg": TEST_JPEG_BYTES}
+        with patch("mnb_backend.listing_images.routes.aws_put_image") as mock_upload:
+            response = self.post_images(["a.jpg", "b.jpg"], contents)
+            second_response = self.post_images(["a.jpg"], contents, listing_id=l2.id)
+
+        self.assertEqual((response.status_code, second_response.status_code), (201, 201))
+        mock_upload.assert_called_once()
+        blob = ImageBlob.query.one()
+        self.assertEqual((blob.sha256, blob.ref_count), (hashlib.sha256(TEST_JPEG_BYTES).hexdigest(), 3))
+        self.assertEqual({image.blob_id for image in ListingImage.query.all()}, {blob.id})
+        self.assertEqual(second_response.json["uploaded_results"][0]["image_url"],
+                         self.get_image_url(TEST_JPEG_BYTES))
+
+    def test_failed_upload_takes_no_reference(self):
+        with patch("mnb_backend.listing_images.routes.aws_put_image", side_effect=ConnectionError("S3 unavailable")):
+            self.post_images(["a.jpg"])
+
+        self.assertEqual(ImageBlob.query.count(), 0)
+
+    def test_add_listing_images_all_uploads_failed(self):
+        with patch("mnb_backend.listing_images.routes.aws_put_image", side_effect=ConnectionError("S3 unavailable")):
+            response = self.post_images(["a.jpg"])
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+
+class DeepPaginationTestCase(ListingImagesBaseViewTestCase):
+    """ A page deep into a million rows reads no more rows than the first page. """
+
+    row_count = 1_000_000
+
+    def setUp(self):
+        super().setUp()
+        db.session.execute(text("INSERT INTO listing_images (image_url) "
+                                "SELECT 'https://images.example.com/' || n FROM generate_series(1, :count) AS n"),
+                           {"count": self.row_count})
+        db.session.commit()
+        db.session.execute(text("ANALYZE listing_images"))
+
+    def get_scanned_rows(self, cursor_values):
+        """ Returns [(node type, rows read)] of each scan of listing_images in the plan of a page after
+        cursor_values """
+
+        stmt = keyset_paginate(select(ListingImage), [ListingImage.id], cursor_values, 20)
+        compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+        [[plan]] = db.session.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}")).scalar()
+
+        scans = []
+        nodes = [plan["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Relation Name") == "listing_images":
+                scans.append((node["Node Type"], node["Actual Rows"] + node.get("Rows Removed by Filter", 0)))
+            nodes.extend(node.get("Plans", []))
+
+        return scans
+
+    def test_deep_page_reads_one_page_of_rows(self):
+        last_id = db.session.scalar(select(func.max(ListingImage.id)))
+
+        self.assertEqual(self.get_scanned_rows(None), [("Index Scan", 21)])
+        self.assertEqual(self.get_scanned_rows([last_id - 100_000]), [("Index Scan", 21)])
+
+    def test_route_pages_deep(self):
+        last_id = db.session.scalar(select(func.max(ListingImage.id)))
+
+        with app.test_client() as client:
+            response = client.get(f"{listing_images_root}/",
+                                  query_string={"limit": 5, "cursor": encode_cursor([last_id - 3])})
+
+        self.assertEqual([image["id"] for image in response.json["listing_images"]],
+                         [last_id - 2, last_id - 1, last_id])
+        self.assertIsNone(response.json["next_cursor"])
+
+
 class ReadListingImageTestCase(ListingImagesBaseViewTestCase):
-    @patch("mnb_backend.listing_images.routes.aws_upload_image")
+    @patch("mnb_backend.listing_images.routes.aws_put_image")
     def test_get_all_listing_images_happy(self, mock_upload_to_aws):
         # Arrange
         u1 = db.session.get(User, self.u1_id)
@@ -120,7 +293,7 @@ class ReadListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             json_data = {"image1": test_image}
@@ -149,7 +322,7 @@ class ReadListingImageTestCase(ListingImagesBaseViewTestCase):
         # act
         # assert
 
-    @patch("mnb_backend.listing_images.routes.aws_upload_image")
+    @patch("mnb_backend.listing_images.routes.aws_put_image")
     def test_get_specific_listing_image_happy(self, mock_upload_to_aws):
         # Arrange
         u1 = db.session.get(User, self.u1_id)
@@ -160,7 +333,7 @@ class ReadListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             json_data = {"image1": test_image}
@@ -192,7 +365,7 @@ class ReadListingImageTestCase(ListingImagesBaseViewTestCase):
 
 
 class DeleteListingImageTestCase(ListingImagesBaseViewTestCase):
-    @patch("mnb_backend.listing_images.routes.aws_upload_image")
+    @patch("mnb_backend.listing_images.routes.aws_put_image")
     def test_delete_listing_image_happy(self, mock_upload_to_aws):
 
         # Arrange
@@ -204,7 +377,7 @@ class DeleteListingImageTestCase(ListingImagesBaseViewTestCase):
 
         with app.test_client() as client:
             # Create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             json_data = {"image1": test_image}
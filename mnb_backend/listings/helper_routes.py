@@ -5,7 +5,6 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from mnb_backend.util_filters import get_all_listings_in_city, get_all_listings_in_state, get_all_books_in_zipcode
 
 from mnb_backend.database import db
-from mnb_backend.api_helpers import aws_upload_image, db_add_listing_image
 from mnb_backend.decorators import user_address_required
 from mnb_backend.listings.models import Listing
 # from mnb_backend.listings.helpers import db_post_listing
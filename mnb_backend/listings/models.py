@@ -1,11 +1,16 @@
 """Models for listings"""
-from sqlalchemy import Enum as SQLAlchemyEnum
+from datetime import datetime
+
+from sqlalchemy import DDL, Enum as SQLAlchemyEnum, event, select
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, joinedload
 from werkzeug.exceptions import abort
 
 from mnb_backend.database import db
-from mnb_backend.enums import enum_serializer, ListingStatusEnum, RackMountTypeEnum, \
-    RackActivityTypeEnum
+from mnb_backend.enums import ListingStatusEnum, RackMountTypeEnum, RackActivityTypeEnum
 from mnb_backend.listings.helpers import get_mount_type_enum, get_activity_type_enum
+from mnb_backend.serializers import Embed, Serializer
+from mnb_backend.users.models import User
 
 
 # region Listings
@@ -13,6 +18,10 @@ class Listing(db.Model):
     """ Listing in the system """
 
     __tablename__ = 'listings'
+    __table_args__ = (
+        db.Index('ix_listings_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_listings_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(
         db.Integer,
@@ -23,6 +32,7 @@ class Listing(db.Model):
         db.Integer,
         db.ForeignKey("users.id"),
         nullable=False,
+        index=True,
     )
     owner = db.relationship("User", back_populates="listings", uselist=False)
 
@@ -31,13 +41,20 @@ class Listing(db.Model):
         nullable=True
     )
 
-    images = db.Relationship("ListingImage", back_populates="listing", uselist=True)
+    # deleted through the session with the listing, so each image releases its blob, see mnb_backend/images/blobs.py
+    images = db.Relationship("ListingImage", back_populates="listing", uselist=True, cascade='all, delete-orphan')
 
     title = db.Column(
         db.Text,
         nullable=False
     )
 
+    # kept up to date by postgres, only used for searching so it's never loaded with the row
+    search_vector = deferred(db.Column(
+        TSVECTOR,
+        db.Computed("to_tsvector('english', coalesce(title, ''))", persisted=True)
+    ))
+
     mount_type = db.Column(
         SQLAlchemyEnum(RackMountTypeEnum, name='rack_mount_enum'),
         nullable=False
@@ -69,23 +86,47 @@ class Listing(db.Model):
         nullable=False
     )
 
+    # bumped on every change, see mnb_backend/conditional.py
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
     reservations = db.relationship('Reservation', back_populates='listing', uselist=True)
 
-    def serialize(self):
-        """ returns self """
-
-        return {
-            "id": self.id,
-            "owner_id": self.owner_id,
-            "owner": self.owner.serialize(),
-            "primary_image_url": self.primary_image_url,
-            "title": self.title,
-            "mount_type": enum_serializer(self.mount_type),
-            "activity_type": enum_serializer(self.activity_type),
-            "rate_price": self.rate_price,
-            "status": enum_serializer(self.status),
-            # "reservations": [reservation.serialize() for reservation in self.reservations]
-        }
+    serialize = Serializer(
+        'id',
+        'owner_id',
+        Embed('owner'),
+        'primary_image_url',
+        'title',
+        'mount_type',
+        'activity_type',
+        'rate_price',
+        'status',
+        # Embed('reservations'),
+    )
+
+    @classmethod
+    def serialization_plan(cls):
+        """ Loader options for everything serialize() touches, so a query can load it in one round trip """
+
+        return (
+            joinedload(cls.owner).options(*User.serialization_plan()),
+        )
+
+    def version(self):
+        """ updated_at of this row and of the rows serialize() embeds, see mnb_backend/conditional.py """
+
+        return self.updated_at, *self.owner.version()
+
+    @classmethod
+    def select_version(cls, listing_id):
+        """ Select of version() of a listing, without loading it """
+
+        return select(cls.updated_at, User.updated_at).join(cls.owner).where(cls.id == listing_id)
 
     @classmethod
     def create_listing(cls, owner, title, activity_type, mount_type, rate_price,
@@ -146,3 +187,7 @@ class Listing(db.Model):
                f"Price: {self.rate_price}, Status: {self.status} >"
 
 # endregion
+
+
+# the trigram index on listings.title needs pg_trgm
+event.listen(Listing.__table__, 'before_create', DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
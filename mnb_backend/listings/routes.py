@@ -1,13 +1,22 @@
 """Routes for listings blueprint."""
+from datetime import timedelta
+
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
 from werkzeug.exceptions import abort
 
+from mnb_backend.cache import get_response_cache, invalidate
+from mnb_backend.conditional import conditional_list, get_validators_or_404, not_modified, with_validators
 from mnb_backend.database import db
 from mnb_backend.decorators import user_address_required
 from mnb_backend.enums import ListingStatusEnum
 from mnb_backend.listings.helpers import get_mount_type_enum, get_activity_type_enum
 from mnb_backend.listings.models import Listing
+from mnb_backend.pagination import paginate
+from mnb_backend.projections import get_projection
+from mnb_backend.reservations.calendar import get_availability_range
+from mnb_backend.reservations.models import ListingCalendar
 from mnb_backend.users.models import User
 
 listings_routes = Blueprint('listings_routes', __name__)
@@ -63,44 +72,112 @@ def get_listings_of_current_user():
     """Show books of specified user.
 
     Returns JSON like:
-        {books: {book_uid, owner_id, orig_image_url, small_image_url, title, author, isbn, genre, condition, price, reservations}, ...}
+        {listings: [{book_uid, owner_id, orig_image_url, small_image_url, title, author, isbn, genre, condition, price,
+        reservations}, ...], next_cursor}
+    Paginate with limit and the cursor returned as next_cursor. Narrow with ?fields= and ?embed=, see
+    mnb_backend/projections.py.
     """
 
     current_user_id = get_jwt_identity()
     current_user = User.query.get_or_404(current_user_id)
 
-    listings = current_user.listings
-    serialized = [listing.serialize() for listing in listings]
+    projection = get_projection(Listing, request.args)
+    listings, next_cursor = paginate(select(Listing)
+                                     .options(*projection.loader_options())
+                                     .where(Listing.owner_id == current_user.id),
+                                     [Listing.id], request.args)
+
+    etag, last_modified = conditional_list('listings', listings, next_cursor, projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    serialized = [projection.serialize(listing) for listing in listings]
 
-    return jsonify(listings=serialized)
+    return with_validators(jsonify(listings=serialized, next_cursor=next_cursor), etag, last_modified)
 
 
 # TODO: GET SPECIFIC LISTING
 @listings_routes.get('/<int:listing_id>')
 def get_specific_listing(listing_id):
-    """Return information on a specific book.
+    """Return information on a specific book. Served from the response cache. Sends an ETag and answers a matching
+    If-None-Match with 304 Not Modified. Narrow with ?fields= and ?embed=, see mnb_backend/projections.py.
 
     Returns JSON like:
         {book: {book_uid, owner_id, orig_image_url, small_image_url, title, author, isbn, genre, condition, price, reservations}, ...}
     """
-    listing = Listing.query.get_or_404(listing_id)
-    serialized = listing.serialize()
 
-    return jsonify(listing=serialized)
+    projection = get_projection(Listing, request.args)
+    etag, last_modified = get_validators_or_404('listings', listing_id, Listing.select_version(listing_id), projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    def load():
+        listing = Listing.query.options(*projection.loader_options()).get_or_404(listing_id)
+        return projection.serialize(listing), [('listings', listing_id), ('users', listing.owner_id)]
+
+    # keyed by the version, so this never serves a body older than the ETag, whichever process changed it
+    serialized = get_response_cache().get(('listings', listing_id, etag), load)
+
+    return with_validators(jsonify(listing=serialized), etag, last_modified)
+
+
+@listings_routes.get('/<int:listing_id>/availability')
+def get_listing_availability(listing_id):
+    """
+    Gets whether each day of a listing is booked, from ?from= to ?to= (YYYY-MM-DD, both included). Defaults to the
+    next 90 days, at most 366 days at a time. Pending, accepted and in progress reservations book their days.
+
+    Returns JSON like:
+        {availability: {listing_id, from, to, days: [{date, booked}, ...]}}
+    """
+
+    start_day, end_day = get_availability_range(request.args)
+
+    calendar = db.session.get(ListingCalendar, listing_id)
+    if calendar is None:
+        Listing.query.get_or_404(listing_id)
+        calendar = ListingCalendar.built(listing_id)
+
+    days = [{"date": (start_day + timedelta(days=offset)).isoformat(), "booked": booked}
+            for offset, booked in enumerate(calendar.booked_days(start_day, end_day))]
+
+    return jsonify(availability={
+        "listing_id": listing_id,
+        "from": start_day.isoformat(),
+        "to": (end_day - timedelta(days=1)).isoformat(),
+        "days": days,
+    })
 
 
 @listings_routes.get("/user/<int:user_id>")
 def get_listings_of_specific_user(user_id):
     """
-    Gets listings of current user
+    Gets listings of a user, in id order. Paginate with limit and the cursor returned as next_cursor. Narrow with
+    ?fields= and ?embed=, see mnb_backend/projections.py.
+
+    Returns JSON like:
+        {listings: [{id, owner_id, owner, primary_image_url, title, mount_type, activity_type, rate_price, status},
+        ...], next_cursor}
     """
 
     user = User.query.get_or_404(user_id)
 
-    listings = user.listings
-    serialized = [listing.serialize() for listing in listings]
+    projection = get_projection(Listing, request.args)
+    listings, next_cursor = paginate(select(Listing)
+                                     .options(*projection.loader_options())
+                                     .where(Listing.owner_id == user.id),
+                                     [Listing.id], request.args)
+
+    etag, last_modified = conditional_list('listings', listings, next_cursor, projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    serialized = [projection.serialize(listing) for listing in listings]
 
-    return jsonify(listings=serialized)
+    return with_validators(jsonify(listings=serialized, next_cursor=next_cursor), etag, last_modified)
 
 
 @listings_routes.patch('/<int:listing_uid>')
@@ -138,6 +215,7 @@ def update_listing(listing_uid):
 
         db.session.add(listing)
         db.session.commit()
+        invalidate(('listings', listing.id))
 
         return jsonify(listing=listing.serialize()), 200
 
@@ -161,6 +239,7 @@ def toggle_listing_status(listing_uid):
 
         db.session.add(listing)
         db.session.commit()
+        invalidate(('listings', listing.id))
 
         return jsonify(listing=listing.serialize()), 200
 
@@ -183,6 +262,7 @@ def delete_listing(listing_uid):
     if current_user_id == listing.owner_id:
         db.session.delete(listing)
         db.session.commit()
+        invalidate(('listings', listing_uid))
 
         return jsonify("Listing successfully deleted"), 200
 
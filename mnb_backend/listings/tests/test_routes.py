@@ -1,13 +1,16 @@
 """test file for listing routes"""
 from io import BytesIO
+from unittest.mock import patch
 
 from flask_jwt_extended import create_access_token
 
 from mnb_backend import app
+from mnb_backend.addresses.models import Address
 from mnb_backend.database import db
 from mnb_backend.enums import ListingStatusEnum, RackMountTypeEnum, RackActivityTypeEnum
 from mnb_backend.listings.models import Listing
 from mnb_backend.listings.tests.setup import ListingBaseViewTestCase
+from mnb_backend.test_setup_helpers import count_queries
 from mnb_backend.users.models import User
 
 from flask_bcrypt import Bcrypt
@@ -80,6 +83,145 @@ class GetSpecificListingOfCurrentUserTestCase(ListingBaseViewTestCase):
             self.assertEqual(data["listing"]["title"], listing_data["title"])
 
 
+class CachedListingTestCase(ListingBaseViewTestCase):
+    def test_cached_listing_is_served_with_only_its_version_query_until_a_write(self):
+        u1 = db.session.get(User, self.u1_id)
+        access_token = create_access_token(identity=u1.id)
+        listing = Listing.create_listing(owner=u1, title="testTitle", mount_type=RackMountTypeEnum.ROOF.value,
+                                         activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value, rate_price=400)
+        listing_id = listing.id
+
+        with app.test_client() as client:
+            client.get(f"{listings_root}/{listing_id}")
+            with count_queries() as statements:
+                cached = client.get(f"{listings_root}/{listing_id}").get_json()
+
+            # updating the owner drops the cached listings embedding them
+            client.patch(f"/api/users/{u1.id}",
+                         headers={"Authorization": f"Bearer {access_token}"},
+                         json={"firstname": "Renamed", "lastname": "Owner"})
+            after_owner_update = client.get(f"{listings_root}/{listing_id}").get_json()
+
+            client.patch(f"{listings_root}/{listing_id}",
+                         headers={"Authorization": f"Bearer {access_token}"},
+                         json={"rate_price": 500})
+            after_listing_update = client.get(f"{listings_root}/{listing_id}").get_json()
+
+        # the version lookup behind the ETag
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(cached["listing"]["owner"]["firstname"], "uafirstname")
+        self.assertEqual(after_owner_update["listing"]["owner"]["firstname"], "Renamed")
+        self.assertEqual(after_listing_update["listing"]["rate_price"], 500)
+
+
+class ConditionalListingTestCase(ListingBaseViewTestCase):
+    def create_listing(self, title="testTitle"):
+        u1 = db.session.get(User, self.u1_id)
+        return Listing.create_listing(owner=u1, title=title, mount_type=RackMountTypeEnum.ROOF.value,
+                                      activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value, rate_price=400).id
+
+    def test_matching_if_none_match_is_304_without_loading_the_listing(self):
+        listing_id = self.create_listing()
+
+        with app.test_client() as client:
+            response = client.get(f"{listings_root}/{listing_id}")
+            with count_queries() as statements:
+                not_modified = client.get(f"{listings_root}/{listing_id}",
+                                          headers={"If-None-Match": response.headers["ETag"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.headers.get("Last-Modified"))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b"")
+        self.assertEqual(not_modified.headers["ETag"], response.headers["ETag"])
+        self.assertEqual(len(statements), 1)
+
+    def test_etag_changes_when_an_embedded_row_changes(self):
+        listing_id = self.create_listing()
+
+        with app.test_client() as client:
+            etag = client.get(f"{listings_root}/{listing_id}").headers["ETag"]
+
+            # the owner's address is geocoded again, which the listing embeds through its owner
+            address = db.session.get(Address, self.a1_id)
+            address.location.point = 'POINT(-122.3 38.1)'
+            db.session.commit()
+
+            response = client.get(f"{listings_root}/{listing_id}", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_list_answers_if_modified_since_and_notices_removed_rows(self):
+        self.create_listing("first")
+        second_id = self.create_listing("second")
+        url = f"{listings_root}/user/{self.u1_id}"
+
+        with app.test_client() as client:
+            response = client.get(url)
+            not_modified = client.get(url, headers={"If-Modified-Since": response.headers["Last-Modified"]})
+
+            db.session.delete(db.session.get(Listing, second_id))
+            db.session.commit()
+            after_delete = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(after_delete.status_code, 200)
+        self.assertEqual(len(after_delete.get_json()["listings"]), 1)
+
+
+class ListingProjectionTestCase(ListingBaseViewTestCase):
+    def setUp(self):
+        super().setUp()
+        u1 = db.session.get(User, self.u1_id)
+        self.listing_id = Listing.create_listing(owner=u1, title="testTitle", mount_type=RackMountTypeEnum.ROOF.value,
+                                                 activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value,
+                                                 rate_price=400).id
+        # expire everything so each request loads what it serializes from the database
+        db.session.commit()
+
+    def test_fields_narrow_the_listing_and_what_is_loaded(self):
+        with app.test_client() as client:
+            with count_queries() as statements:
+                response = client.get(f"{listings_root}/user/{self.u1_id}",
+                                      query_string={"fields": "id,title,owner.firstname"})
+
+        listing = response.get_json()["listings"][0]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(listing, {"id": self.listing_id, "title": "testTitle", "owner": {"firstname": "uafirstname"}})
+
+        listings_select = next(statement for statement in statements if "FROM listings" in statement)
+        self.assertNotIn("addresses", listings_select)
+        self.assertNotIn("rate_price", listings_select)
+
+    def test_empty_embed_leaves_out_the_owner(self):
+        with app.test_client() as client:
+            with count_queries() as statements:
+                response = client.get(f"{listings_root}/{self.listing_id}", query_string={"embed": ""})
+
+        listing = response.get_json()["listing"]
+        self.assertNotIn("owner", listing)
+        self.assertEqual(listing["title"], "testTitle")
+        listing_select = next(statement for statement in statements if "listings.title" in statement)
+        self.assertNotIn("users", listing_select)
+
+    def test_each_projection_has_its_own_etag(self):
+        with app.test_client() as client:
+            whole = client.get(f"{listings_root}/{self.listing_id}")
+            narrowed = client.get(f"{listings_root}/{self.listing_id}", query_string={"fields": "id"},
+                                  headers={"If-None-Match": whole.headers["ETag"]})
+
+        self.assertEqual(narrowed.status_code, 200)
+        self.assertEqual(narrowed.get_json()["listing"], {"id": self.listing_id})
+        self.assertNotEqual(narrowed.headers["ETag"], whole.headers["ETag"])
+
+    def test_unknown_field_is_400(self):
+        with app.test_client() as client:
+            response = client.get(f"{listings_root}/{self.listing_id}", query_string={"fields": "id,password"})
+
+        self.assertEqual(response.status_code, 400)
+
+
 class GetListingsOfCurrentUserTestCase(ListingBaseViewTestCase):
     def test_get_listings_of_current_user_happy(self):
         u1 = db.session.get(User, self.u1_id)
@@ -229,3 +371,74 @@ class DeleteListingTestCase(ListingBaseViewTestCase):
 
             self.assertEqual(response_delete.status_code, 200)
             self.assertEqual(len(data_get_current["listings"]), 0)
+
+
+class ListingSerializationQueryCountTestCase(ListingBaseViewTestCase):
+    def create_listings(self, owner, count):
+        for i in range(count):
+            Listing.create_listing(owner=owner, title=f"testTitle{i}", mount_type=RackMountTypeEnum.ROOF.value,
+                                   activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value, rate_price=400)
+
+    def count_listing_queries(self, url):
+        # expire everything so each request has to load the full graph from the database
+        db.session.commit()
+
+        with app.test_client() as client:
+            with count_queries() as statements:
+                response = client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        return len(statements), len(response.get_json()["listings"])
+
+    @patch("mnb_backend.addresses.models.fuzz_coordinates")
+    def test_listings_of_specific_user_query_count_is_constant(self, mock_fuzz_coordinates):
+        mock_fuzz_coordinates.return_value = (-122.28195077277807, 38.006370801958916)
+        u1 = db.session.get(User, self.u1_id)
+
+        self.create_listings(u1, 1)
+        one_listing_queries, one_listing_count = self.count_listing_queries(f"{listings_root}/user/{u1.id}")
+
+        self.create_listings(u1, 5)
+        many_listing_queries, many_listing_count = self.count_listing_queries(f"{listings_root}/user/{u1.id}")
+
+        self.assertEqual(one_listing_count, 1)
+        self.assertEqual(many_listing_count, 6)
+        self.assertEqual(one_listing_queries, many_listing_queries)
+
+    @patch("mnb_backend.addresses.models.fuzz_coordinates")
+    def test_listings_of_current_user_query_count_is_constant(self, mock_fuzz_coordinates):
+        mock_fuzz_coordinates.return_value = (-122.28195077277807, 38.006370801958916)
+        u1 = db.session.get(User, self.u1_id)
+        access_token = create_access_token(identity=u1.id)
+
+        def count_current_user_queries():
+            db.session.commit()
+            with app.test_client() as client:
+                with count_queries() as statements:
+                    response = client.get(f"{listings_root}/current",
+                                          headers={"Authorization": f"Bearer {access_token}"})
+            return len(statements), len(response.get_json()["listings"])
+
+        self.create_listings(u1, 1)
+        one_listing_queries, _ = count_current_user_queries()
+
+        self.create_listings(u1, 5)
+        many_listing_queries, many_listing_count = count_current_user_queries()
+
+        self.assertEqual(many_listing_count, 6)
+        self.assertEqual(one_listing_queries, many_listing_queries)
+
+    @patch("mnb_backend.addresses.models.fuzz_coordinates")
+    def test_serializing_planned_listings_issues_no_queries(self, mock_fuzz_coordinates):
+        mock_fuzz_coordinates.return_value = (-122.28195077277807, 38.006370801958916)
+        u1 = db.session.get(User, self.u1_id)
+        self.create_listings(u1, 3)
+        db.session.commit()
+
+        listings = Listing.query.options(*Listing.serialization_plan()).all()
+
+        with count_queries() as statements:
+            serialized = [listing.serialize() for listing in listings]
+
+        self.assertEqual(len(statements), 0)
+        self.assertEqual(serialized[0]["owner"]["address"]["location"]["point_x"], -122.28195023589687)
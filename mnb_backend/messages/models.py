@@ -2,6 +2,7 @@
 from datetime import datetime
 
 from mnb_backend.database import db
+from mnb_backend.serializers import Field, Serializer
 
 
 # region Messages
@@ -43,7 +44,14 @@ class Message(db.Model):
     timestamp = db.Column(
         db.DateTime,
         nullable=False,
-        default=datetime.utcnow(),
+        default=datetime.utcnow,
+    )
+
+    # message lists are paginated on (timestamp, message_uid)
+    __table_args__ = (
+        db.Index('ix_messages_reservation_uid_timestamp', 'reservation_uid', 'timestamp', 'message_uid'),
+        db.Index('ix_messages_sender_uid_timestamp', 'sender_uid', 'timestamp', 'message_uid'),
+        db.Index('ix_messages_recipient_uid_timestamp', 'recipient_uid', 'timestamp', 'message_uid'),
     )
 
     # todo: add repr
@@ -56,18 +64,23 @@ class Message(db.Model):
                f"Message: {self.message_text}, " \
                f"Timestamp: {self.timestamp} >"
 
-    def serialize(self, sender_name, recipient_name):
-        """ returns self """
-        return {
-
-            "message_uid": self.message_uid,
-            "reservation_uid": self.reservation_uid,
-            "sender_uid": self.sender_uid,
-            "sender_name": sender_name,
-            "recipient_uid": self.recipient_uid,
-            "recipient_name": recipient_name,
-            "message_text": self.message_text,
-            "timestamp": self.timestamp,
-        }
+    @property
+    def sender_name(self):
+        return f"{self.sender.firstname} {self.sender.lastname}"
+
+    @property
+    def recipient_name(self):
+        return f"{self.recipient.firstname} {self.recipient.lastname}"
+
+    serialize = Serializer(
+        'message_uid',
+        'reservation_uid',
+        'sender_uid',
+        Field('sender_name', load=('sender',)),
+        'recipient_uid',
+        Field('recipient_name', load=('recipient',)),
+        'message_text',
+        'timestamp',
+    )
 
 # endregion
\ No newline at end of file
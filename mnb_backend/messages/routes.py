@@ -2,10 +2,13 @@
 from flask import jsonify, Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from collections import defaultdict
+from sqlalchemy import select
 from werkzeug.exceptions import abort
 
 from mnb_backend.listings.models import Listing
 from mnb_backend.messages.models import (db, Message)
+from mnb_backend.pagination import paginate
+from mnb_backend.projections import get_projection
 
 
 messages_routes = Blueprint('messages_routes', __name__)
@@ -40,8 +43,7 @@ def create_message():
         db.session.add(message)
         db.session.commit()
 
-        return jsonify(message=message.serialize(f"{message.sender.firstname} {message.sender.lastname}",
-                                                 f"{message.recipient.firstname} {message.recipient.lastname}")), 201
+        return jsonify(message=message.serialize()), 201
     except Exception as e:
         print(e)
         db.session.rollback()
@@ -51,70 +53,79 @@ def create_message():
 @messages_routes.get("/api/messages/all")
 @jwt_required()
 def show_all_messages():
-    """Gets all messages, organizing them into conversations
+    """Gets messages, newest first, organizing them into conversations.
+    Paginate with limit and the cursor returned as next_cursor, each page holds the next limit messages. Narrow the
+    messages with ?fields=, see mnb_backend/projections.py.
     Returns JSON like:
-        {conversations: {recipient_uid: [message, message, ...], ...}}"""
+        {conversations: {recipient_uid: [message, message, ...], ...}, next_cursor}"""
 
     current_user_id = get_jwt_identity()
 
-    # Query all messages involving the current user
-    messages = (Message.query
-                .filter((Message.sender_uid == current_user_id) | (Message.recipient_uid == current_user_id))
-                .order_by(Message.timestamp.desc()))
+    # Query a page of the messages involving the current user
+    projection = get_projection(Message, request.args)
+    messages, next_cursor = paginate(select(Message)
+                                     .options(*projection.loader_options())
+                                     .where((Message.sender_uid == current_user_id) |
+                                            (Message.recipient_uid == current_user_id)),
+                                     [Message.timestamp, Message.message_uid], request.args, descending=True)
 
     # Group messages into conversations based on sender and recipient
     conversations = defaultdict(list)
     for message in messages:
         # Determine the conversation participant
         participant_id = message.recipient_uid if message.sender_uid == current_user_id else message.sender_uid
-        conversations[participant_id].append(message.serialize(f"{message.sender.firstname} {message.sender.lastname}",
-                                                               f"{message.recipient.firstname} {message.recipient.lastname}"))
+        conversations[participant_id].append(projection.serialize(message))
 
     conversations = dict(conversations)
 
-    return jsonify(conversations=conversations), 200
+    return jsonify(conversations=conversations, next_cursor=next_cursor), 200
 
 
 @messages_routes.get("/api/messages/listing/<int:listing_id>")
 @jwt_required()
 def show_conversation(listing_id):
-    """Gets the conversation between the current user and the listing owner"""
+    """Gets the conversation between the current user and the listing owner, oldest first.
+    Paginate with limit and the cursor returned as next_cursor. Narrow the messages with ?fields=, see
+    mnb_backend/projections.py.
+    Returns JSON like:
+        {conversation: [message, message, ...], next_cursor}"""
 
     current_user_id = get_jwt_identity()
     listing = Listing.query.get_or_404(listing_id)
     listing_owner = listing.owner
 
     # Query messages between the current user and the listing owner
-    listing_messages = Message.query.filter(Message.reservation_uid == listing_id)
+    projection = get_projection(Message, request.args)
+    listing_messages = (select(Message)
+                        .options(*projection.loader_options())
+                        .where(Message.reservation_uid == listing_id))
 
     # check for message sender is listing owner or current user
-    users_messages = (listing_messages
-                      .filter(((Message.sender_uid == current_user_id) & (Message.recipient_uid == listing_owner.id)) |
-                              ((Message.sender_uid == listing_owner.id) & (Message.recipient_uid == current_user_id)))
-                      .order_by(Message.timestamp.asc())).all()
+    users_messages, next_cursor = paginate(
+        listing_messages
+        .where(((Message.sender_uid == current_user_id) & (Message.recipient_uid == listing_owner.id)) |
+               ((Message.sender_uid == listing_owner.id) & (Message.recipient_uid == current_user_id))),
+        [Message.timestamp, Message.message_uid], request.args)
 
-    conversation = [message.serialize(f"{message.sender.firstname} {message.sender.lastname}",
-                                      f"{message.recipient.firstname} {message.recipient.lastname}") for message in
-                    users_messages]
+    conversation = [projection.serialize(message) for message in users_messages]
 
-    return jsonify(conversation=conversation), 200
+    return jsonify(conversation=conversation, next_cursor=next_cursor), 200
 
 
 @messages_routes.get("/api/messages/single/<int:message_id>")
 @jwt_required()
 # @is_message_sender_reciever_or_admin
 def show_message(message_id):
-    """ Show specific message
+    """ Show specific message. Narrow it with ?fields=, see mnb_backend/projections.py.
 
     Returns JSON like:
         {message: {message_uid, reservation_uid, sender_uid, recipient_uid, text, timestamp}}
     """
 
-    message = Message.query.get_or_404(message_id)
-    sender_name = f"{message.sender.firstname} {message.sender.lastname}"
-    recipient_name = f"{message.recipient.firstname} {message.recipient.lastname}"
+    projection = get_projection(Message, request.args)
+    message = Message.query.options(*projection.loader_options()).get_or_404(message_id)
 
-    message = message.serialize(f"{sender_name}", f"{recipient_name}")
+    message = projection.serialize(message)
     return jsonify(message=message), 200
 
 # endregion
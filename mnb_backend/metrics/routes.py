@@ -0,0 +1,36 @@
+"""Routes for metrics blueprint. Admins only, the numbers are per process."""
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+from mnb_backend.cache import get_response_cache
+from mnb_backend.database import db, pool_stats
+from mnb_backend.decorators import admin_required
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+
+
+@metrics_routes.get("/cache")
+@jwt_required()
+@admin_required
+def get_cache_metrics():
+    """ Counters of this process's response cache
+
+    Returns JSON like:
+        {cache: {entries, max_entries, hits, stale_hits, misses, hit_ratio, invalidations, evictions}}
+    """
+
+    return jsonify(cache=get_response_cache().stats())
+
+
+@metrics_routes.get("/db_pool")
+@jwt_required()
+@admin_required
+def get_db_pool_metrics():
+    """ Size and counters of this process's database connection pool, see mnb_backend/database.py
+
+    Returns JSON like:
+        {db_pool: {pool, size, checked_in, checked_out, peak_checked_out, overflow, max_overflow, timeout, checkouts,
+                   connects, timeouts, wait_ms_total, wait_ms_mean, wait_ms_max}}
+    """
+
+    return jsonify(db_pool=pool_stats(db.engine))
@@ -0,0 +1,72 @@
+"""test file for metrics routes"""
+from unittest import TestCase
+
+from flask_jwt_extended import create_access_token
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.enums import UserStatusEnums
+from mnb_backend.test_setup_helpers import delete_all_tables
+from mnb_backend.users.models import User
+
+db.drop_all()
+db.create_all()
+
+
+class CacheMetricsTestCase(TestCase):
+    def setUp(self):
+        delete_all_tables(self)
+
+        admin = User.signup("admin@email.com", "password", "Admin", "Admin", "I am an admin",
+                            UserStatusEnums.ACTIVE, is_admin=True)
+        user = User.signup("user@email.com", "password", "User", "User", "I am a test user",
+                           UserStatusEnums.ACTIVE)
+        db.session.commit()
+
+        self.admin_id = admin.id
+        self.user_id = user.id
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def test_cache_metrics_count_hits_and_misses(self):
+        with app.test_client() as client:
+            client.get(f"/api/users/{self.user_id}")
+            client.get(f"/api/users/{self.user_id}")
+
+            response = client.get("/api/metrics/cache",
+                                  headers={"Authorization": f"Bearer {create_access_token(identity=self.admin_id)}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["cache"]["hits"], 1)
+        self.assertEqual(response.get_json()["cache"]["misses"], 1)
+
+    def test_cache_metrics_require_admin(self):
+        with app.test_client() as client:
+            response = client.get("/api/metrics/cache",
+                                  headers={"Authorization": f"Bearer {create_access_token(identity=self.user_id)}"})
+
+        self.assertEqual(response.status_code, 403)
+
+
+class DbPoolMetricsTestCase(TestCase):
+    def setUp(self):
+        delete_all_tables(self)
+
+        admin = User.signup("admin@email.com", "password", "Admin", "Admin", "I am an admin",
+                            UserStatusEnums.ACTIVE, is_admin=True)
+        db.session.commit()
+
+        self.admin_id = admin.id
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def test_db_pool_metrics_count_checkouts(self):
+        with app.test_client() as client:
+            response = client.get("/api/metrics/db_pool",
+                                  headers={"Authorization": f"Bearer {create_access_token(identity=self.admin_id)}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["db_pool"]["pool"], "InstrumentedQueuePool")
+        self.assertGreater(response.get_json()["db_pool"]["checkouts"], 0)
@@ -0,0 +1,144 @@
+"""Keyset (cursor) pagination helpers shared by list endpoints.
+
+A page is fetched with WHERE (sort key) > (cursor) ORDER BY sort key LIMIT n, so with an index on the sort key a
+page deep into a table costs the same as the first one, where OFFSET would scan and throw away every row before it.
+"""
+import base64
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+from werkzeug.exceptions import abort
+
+from mnb_backend.database import db
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of the last row on a page into an opaque, url safe cursor string."""
+
+    raw = json.dumps(list(values), separators=(',', ':'), default=datetime.isoformat).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor back into its sort key values. Returns None when no cursor is given and
+    aborts with a 400 if the cursor is malformed."""
+
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) == 0:
+        abort(400, description="Invalid cursor")
+
+    return values
+
+
+def get_page_limit(args, default=DEFAULT_PAGE_LIMIT, maximum=MAX_PAGE_LIMIT):
+    """
+    Reads ?limit= from the request args, clamped between 1 and maximum."""
+
+    try:
+        limit = int(args.get('limit', default))
+    except ValueError:
+        abort(400, description="limit must be an integer")
+
+    return max(1, min(limit, maximum))
+
+
+def keyset_paginate(stmt, sort_columns, cursor_values, limit, descending=False):
+    """
+    Orders a select by sort_columns and only returns rows after cursor_values.
+
+    The last sort column must be unique (usually the primary key) so the ordering is stable. One extra row is fetched
+    so build_page can tell whether there is another page."""
+
+    if cursor_values is not None:
+        if len(cursor_values) != len(sort_columns):
+            abort(400, description="Invalid cursor")
+
+        sort_key = tuple_(*sort_columns)
+        cursor_key = tuple_(*cursor_values)
+        stmt = stmt.where(sort_key < cursor_key if descending else sort_key > cursor_key)
+
+    ordering = [column.desc() if descending else column.asc() for column in sort_columns]
+
+    return stmt.order_by(*ordering).limit(limit + 1)
+
+
+def build_page(rows, limit, get_sort_key):
+    """
+    Drops the extra row fetched by keyset_paginate. Returns (rows, next_cursor), next_cursor is None on the last
+    page."""
+
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(get_sort_key(rows[-1]))
+
+
+def load_cursor_value(column, value):
+    """
+    Turns one value of a decoded cursor back into the type of column. Raises ValueError if it isn't of that type, a
+    crafted cursor would otherwise fail in the database."""
+
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError(f"{value!r} isn't a timestamp")
+        return datetime.fromisoformat(value)
+
+    python_type = column.type.python_type
+    if python_type is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{value!r} isn't a number")
+        return float(value)
+
+    if type(value) is not python_type:
+        raise ValueError(f"{value!r} isn't a {python_type.__name__}")
+
+    return value
+
+
+def load_cursor_values(sort_columns, cursor_values):
+    """
+    Turns the values of a decoded cursor back into the types of sort_columns. Timestamps travel as ISO strings.
+    Aborts with a 400 if there are more or fewer values than columns or one isn't of the type of its column."""
+
+    if cursor_values is None:
+        return None
+
+    if len(cursor_values) != len(sort_columns):
+        abort(400, description="Invalid cursor")
+
+    try:
+        return [load_cursor_value(column, value) for column, value in zip(sort_columns, cursor_values)]
+    except ValueError:
+        abort(400, description="Invalid cursor")
+
+
+def paginate(stmt, sort_columns, args, descending=False):
+    """
+    Runs one page of a select of model objects, ordered by sort_columns (attributes of that model, the last one
+    unique), with the limit and cursor from the request args.
+
+    Returns (objects, next_cursor), next_cursor is None on the last page."""
+
+    limit = get_page_limit(args)
+    cursor_values = load_cursor_values(sort_columns, decode_cursor(args.get('cursor')))
+
+    rows = db.session.scalars(keyset_paginate(stmt, sort_columns, cursor_values, limit, descending)).all()
+
+    return build_page(rows, limit, lambda row: [getattr(row, column.key) for column in sort_columns])
@@ -0,0 +1,170 @@
+"""Sparse fieldsets and embed depth, from the ?fields= and ?embed= query parameters.
+
+Both take comma separated keys, with dots for keys of embedded resources:
+    ?fields=id,title,owner.firstname    only these keys. owner.firstname keeps owner, with only its firstname.
+    ?embed=owner                        only these embedded resources, the owner but not the owner's address.
+    ?embed=                             no embedded resources at all.
+Without them a resource comes back whole, like serialize().
+
+A projection is built from the fields a model's Serializer declares (see mnb_backend/serializers.py). It compiles its
+own serializer, and its loader options load only what that serializer reads: load_only() of the columns it needs,
+joinedload() of the relationships it embeds, and lazyload() of those it leaves out, which are never loaded unless
+something else reads them.
+"""
+
+from functools import lru_cache
+from operator import attrgetter
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, lazyload, load_only
+from werkzeug.exceptions import abort
+
+from mnb_backend.serializers import Embed, compile_serializer
+
+MAX_CACHED_PROJECTIONS = 256
+
+
+class Projection:
+    """ The fields of a model to serialize, and the projections of the relationships it embeds """
+
+    def __init__(self, model, fields, embeds, narrowed, key=None):
+        self.model = model
+        self.fields = fields
+        # key of the Embed -> projection of the related model, or None to serialize it whole with its serialize()
+        self.embeds = embeds
+        # whether fields leaves columns out, so the others can be left unloaded
+        self.narrowed = narrowed
+        # the (fields, embed) parameters, part of the ETag of the response
+        self.key = key
+        self.versioned = 'updated_at' in inspect(model).column_attrs
+
+        self.serialize = compile_serializer(model, fields, {
+            embed_key: projection.serialize for embed_key, projection in embeds.items() if projection is not None
+        })
+
+    def loader_options(self):
+        """ Loader options for a select of the model, loading everything serialize() reads and nothing else """
+
+        mapper = inspect(self.model)
+        options = []
+
+        if self.narrowed:
+            names = {field.attribute for field in self.fields if field.attribute in mapper.column_attrs}
+            # updated_at for version(), the foreign keys for the relationships, embedded or not
+            names.update(name for name in ('updated_at',) if name in mapper.column_attrs)
+            for relationship in mapper.relationships:
+                names.update(mapper.get_property_by_column(column).key for column in relationship.local_columns)
+            options.append(load_only(*[getattr(self.model, name) for name in sorted(names)]))
+
+        for field in self.model.serialize.fields:
+            if isinstance(field, Embed):
+                attribute = getattr(self.model, field.attribute)
+                if field.key not in self.embeds:
+                    options.append(lazyload(attribute))
+                elif self.embeds[field.key] is None:
+                    options.append(joinedload(attribute))
+                else:
+                    options.append(joinedload(attribute).options(*self.embeds[field.key].loader_options()))
+
+        for name in dict.fromkeys(name for field in self.fields if not isinstance(field, Embed) for name in field.load):
+            options.append(joinedload(getattr(self.model, name)))
+
+        return options
+
+    def version(self, instance):
+        """
+        updated_at of instance and of the rows this projection embeds, see mnb_backend/conditional.py. Rows left
+        out of the response are left out of its version."""
+
+        version = (instance.updated_at,) if self.versioned else ()
+        for field in self.fields:
+            projection = self.embeds.get(field.key) if isinstance(field, Embed) else None
+            related = attrgetter(field.attribute)(instance) if projection is not None else None
+            if related is not None:
+                version += projection.version(related)
+
+        return version
+
+
+def parse_paths(value):
+    """
+    Parses 'id,owner.firstname' into {'id': {}, 'owner': {'firstname': {}}}."""
+
+    tree = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+
+    return tree
+
+
+def build_projection(model, fields_tree, embed_tree, prefix=''):
+    """
+    Returns the Projection of model keeping the keys in fields_tree, all of them if it's empty, and embedding those
+    in embed_tree, all of them if it's None. Raises ValueError for keys the model doesn't serialize."""
+
+    serializer_fields = model.serialize.fields
+    known = {field.key: field for field in serializer_fields}
+
+    for key in fields_tree:
+        if key not in known:
+            raise ValueError(f"unknown field {prefix}{key}")
+    for key in embed_tree or ():
+        if not isinstance(known.get(key), Embed):
+            raise ValueError(f"{prefix}{key} can't be embedded")
+
+    fields = []
+    embeds = {}
+    for field in serializer_fields:
+        if fields_tree and field.key not in fields_tree:
+            continue
+
+        nested_fields = fields_tree.get(field.key, {})
+
+        if isinstance(field, Embed):
+            if embed_tree is not None and field.key not in embed_tree:
+                continue
+
+            related = inspect(model).relationships[field.attribute].mapper.class_
+            if getattr(related.serialize, 'fields', None) is None:
+                if nested_fields:
+                    raise ValueError(f"{prefix}{field.key} can only be embedded whole")
+                embeds[field.key] = None
+            else:
+                embeds[field.key] = build_projection(related, nested_fields,
+                                                     None if embed_tree is None else embed_tree[field.key],
+                                                     f"{prefix}{field.key}.")
+        elif nested_fields:
+            raise ValueError(f"{prefix}{field.key} has no fields")
+
+        fields.append(field)
+
+    return Projection(model, fields, embeds, narrowed=bool(fields_tree))
+
+
+@lru_cache(maxsize=MAX_CACHED_PROJECTIONS)
+def make_projection(model, fields=None, embed=None):
+    """
+    Returns the Projection of model for the fields and embed parameters, None for either means it wasn't given.
+    Cached, so a projection is compiled once however many requests ask for it."""
+
+    projection = build_projection(model, parse_paths(fields or ''), None if embed is None else parse_paths(embed))
+    projection.key = (fields, embed)
+
+    return projection
+
+
+def get_projection(model, args):
+    """
+    Returns the Projection of model for the ?fields= and ?embed= of the request args. Aborts 400 if they name keys
+    the model doesn't have."""
+
+    try:
+        return make_projection(model, args.get('fields'), args.get('embed'))
+    except ValueError as error:
+        abort(400, description=f"{error}")
@@ -0,0 +1,96 @@
+"""Day bitmaps of the days a listing is booked.
+
+Bit i of a bitmap is set when first_day + i days is booked. It's stored as little endian bytes, so a listing's
+calendar costs a bit per day from its first reservation on: a year of bookings is 46 bytes.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from werkzeug.exceptions import abort
+
+from mnb_backend.general_helpers import date_numbers_format_string
+
+DEFAULT_AVAILABILITY_DAYS = 90
+MAX_AVAILABILITY_DAYS = 366
+
+
+def reservation_days(start_date, end_date):
+    """
+    Returns (first day, day after the last day) of the days a reservation from start_date to end_date touches. A
+    reservation ending at midnight doesn't touch the day it ends on."""
+
+    first_day = start_date.date()
+    end_day = end_date.date()
+    if end_date.time() != time.min:
+        end_day += timedelta(days=1)
+
+    return first_day, end_day
+
+
+def get_availability_range(args):
+    """
+    Reads ?from= and ?to= (YYYY-MM-DD, both included) from the request args. from defaults to today and to to
+    DEFAULT_AVAILABILITY_DAYS days later. Returns (first day, day after the last day)."""
+
+    try:
+        start_day = datetime.strptime(args['from'], date_numbers_format_string).date() \
+            if 'from' in args else date.today()
+        end_day = datetime.strptime(args['to'], date_numbers_format_string).date() + timedelta(days=1) \
+            if 'to' in args else start_day + timedelta(days=DEFAULT_AVAILABILITY_DAYS)
+    except ValueError:
+        abort(400, description="from and to must be dates like 2024-01-31")
+
+    if end_day <= start_day:
+        abort(400, description="to must not be before from")
+    if (end_day - start_day).days > MAX_AVAILABILITY_DAYS:
+        abort(400, description=f"from and to can be at most {MAX_AVAILABILITY_DAYS} days apart")
+
+    return start_day, end_day
+
+
+class DayBitmap:
+    """ The booked days of a listing, from first_day on. first_day is None while no day was ever booked. """
+
+    def __init__(self, first_day=None, data=b''):
+        self.first_day = first_day
+        self.bits = int.from_bytes(data, 'little')
+
+    def set_days(self, start_day, end_day, booked):
+        """
+        Marks the days from start_day up to, not including, end_day booked or free."""
+
+        if start_day >= end_day:
+            return
+
+        if booked:
+            if self.first_day is None:
+                self.first_day = start_day
+            elif start_day < self.first_day:
+                self.bits <<= (self.first_day - start_day).days
+                self.first_day = start_day
+        else:
+            # days before first_day are already free
+            if self.first_day is None:
+                return
+            start_day = max(start_day, self.first_day)
+            if start_day >= end_day:
+                return
+
+        mask = ((1 << (end_day - start_day).days) - 1) << (start_day - self.first_day).days
+        self.bits = self.bits | mask if booked else self.bits & ~mask
+
+    def booked_days(self, start_day, end_day):
+        """
+        Returns a list with whether each day from start_day up to, not including, end_day is booked."""
+
+        booked = []
+        day = start_day
+        while day < end_day:
+            offset = (day - self.first_day).days if self.first_day is not None else -1
+            booked.append(offset >= 0 and bool(self.bits >> offset & 1))
+            day += timedelta(days=1)
+
+        return booked
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
@@ -3,14 +3,29 @@ from datetime import datetime
 from werkzeug.exceptions import abort
 
 from flask import jsonify
+from psycopg2.errorcodes import EXCLUSION_VIOLATION
 
 from mnb_backend.database import db
 from mnb_backend.general_helpers import date_short_format_string, date_numbers_format_string
 from mnb_backend.listings.models import Listing
-from mnb_backend.enums import enum_serializer, ReservationStatusEnum
-from sqlalchemy import Enum as SQLAlchemyEnum
-
+from mnb_backend.users.models import User
+from mnb_backend.enums import ReservationStatusEnum
+from sqlalchemy import DDL, Enum as SQLAlchemyEnum, event, func, select
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSRANGE, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload
+
+from mnb_backend.reservations.calendar import DayBitmap, reservation_days
 from mnb_backend.reservations.reservation_helpers import get_time_duration_and_total
+from mnb_backend.serializers import Embed, Serializer
+
+
+# reservations with one of these statuses hold their listing for their period
+ACTIVE_RESERVATION_STATUSES = (
+    ReservationStatusEnum.PENDING,
+    ReservationStatusEnum.ACCEPTED,
+    ReservationStatusEnum.IN_PROGRESS,
+)
 
 
 # region reservations
@@ -72,27 +87,103 @@ class Reservation(db.Model):
         db.String(500),
     )
 
-    # create upcoming filter property
-    # create past filter property
+    # bumped on every change, see mnb_backend/conditional.py
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+    # [start_date, end_date), kept by postgres so the exclusion constraint below can compare periods
+    period = db.Column(
+        TSRANGE,
+        db.Computed("tsrange(start_date, end_date, '[)')"),
+    )
 
-    def serialize(self):
-        """ returns self """
+    __table_args__ = (
+        # a renter's reservations, newest first, paginated on (start_date, id)
+        db.Index('ix_reservations_renter_id_start_date', 'renter_id', 'start_date', 'id'),
+        # a listing's upcoming and past reservations, range scanned from now on (start_date, id)
+        db.Index('ix_reservations_listing_uid_start_date', 'listing_uid', 'start_date', 'id'),
+        # no two active reservations of a listing overlap. Backed by a GiST index, so checking a new booking
+        # against the listing's others is an index lookup, and two concurrent bookings can't both get in.
+        ExcludeConstraint(
+            ('listing_uid', '='),
+            ('period', '&&'),
+            name='reservations_listing_uid_period_excl',
+            using='gist',
+            where=status.in_(ACTIVE_RESERVATION_STATUSES),
+        ),
+    )
+
+    serialize = Serializer(
+        'id',
+        'reservation_date_created',
+        'start_date',
+        'end_date',
+        'status',
+        'duration',
+        'total',
+        'cancellation_reason',
+        # Embed('listing_owner', 'listing.owner'),
+        Embed('listing_renter', 'renter'),
+        Embed('listing'),
+    )
+
+    @classmethod
+    def serialization_plan(cls):
+        """ Loader options for everything serialize() touches, so a query can load it in one round trip """
+
+        return (
+            joinedload(cls.renter).options(*User.serialization_plan()),
+            joinedload(cls.listing).options(*Listing.serialization_plan()),
+        )
+
+    def version(self):
+        """ updated_at of this row and of the rows serialize() embeds, see mnb_backend/conditional.py """
+
+        return self.updated_at, *self.renter.version(), *self.listing.version()
+
+    @classmethod
+    def select_version(cls, reservation_id):
+        """ Select of version() of a reservation, without loading it """
 
-        listing = self.listing
+        renter = aliased(User)
+        owner = aliased(User)
 
-        return {
-            "id": self.id,
-            "reservation_date_created": self.reservation_date_created,
-            "start_date": self.start_date,
-            "end_date": self.end_date,
-            "status": enum_serializer(self.status),
-            "duration": str(self.duration),
-            "total": self.total,
-            "cancellation_reason": self.cancellation_reason,
-            # "listing_owner": listing.owner.serialize(),
-            "listing_renter": self.renter.serialize(),
-            "listing": listing.serialize(),
-        }
+        return select(cls.updated_at, renter.updated_at, Listing.updated_at, owner.updated_at) \
+            .join(renter, cls.renter) \
+            .join(Listing, cls.listing) \
+            .join(owner, Listing.owner) \
+            .where(cls.id == reservation_id)
+
+    @classmethod
+    def select_for_listing(cls, listing_id, upcoming, now=None, options=None):
+        """ Select of a listing's upcoming reservations (starting after now) or past ones (starting before now),
+        with the loader options of serialize() unless options are given. Paginate it on (start_date, id), descending
+        for past ones. """
+
+        now = now or datetime.now()
+        starts_in_range = cls.start_date > now if upcoming else cls.start_date < now
+
+        return select(cls) \
+            .options(*(cls.serialization_plan() if options is None else options)) \
+            .where(cls.listing_uid == listing_id, starts_in_range)
+
+    def calendar_days(self):
+        """ (first day, day after the last day) this reservation holds on its listing's calendar """
+
+        return reservation_days(self.start_date, self.end_date)
+
+    def update_listing_calendar(self, *previous_days):
+        """ Refreshes the days of the listing's calendar this reservation holds, and the (first day, end day)
+        ranges of previous_days it held before it was moved. Call it after changing the reservation, before
+        committing: the calendar stays locked until then. """
+
+        calendar = ListingCalendar.locked(self.listing.id)
+        for start_day, end_day in (self.calendar_days(), *previous_days):
+            calendar.refresh(start_day, end_day)
 
     def __repr__(self):
         return f"< Reservation # {self.id}, DateCreated: {self.reservation_date_created}, DateStart{self.start_date}, " \
@@ -121,10 +212,16 @@ class Reservation(db.Model):
             reservation.renter = user_renter
 
             db.session.add(reservation)
+            reservation.update_listing_calendar()
             db.session.commit()
 
             return reservation
 
+        except IntegrityError as e:
+            db.session.rollback()
+            abort_if_overlapping(e)
+            abort(500, description="Unable to create reservation")
+
         except Exception as e:
             print(e)
             db.session.rollback()
@@ -136,19 +233,135 @@ class Reservation(db.Model):
 
         # total, timedelta_duration, duration = get_time_duration_and_total(reservation.listing.rate_schedule, duration, reservation.listing)
         total, duration = get_time_duration_and_total(duration, reservation.listing)
+        previous_days = reservation.calendar_days()
 
         try:
             reservation.start_date = start_date
             reservation.duration = duration
             reservation.end_date = start_date + duration
             reservation.total = total
+            reservation.update_listing_calendar(previous_days)
             db.session.commit()
 
             return reservation
 
+        except IntegrityError as e:
+            db.session.rollback()
+            abort_if_overlapping(e)
+            abort(500, description="Unable to create reservation")
+
         except Exception as e:
             print(e)
             db.session.rollback()
             abort(500, description="Unable to create reservation")
 
 # endregion
+
+
+# region listing calendars
+class ListingCalendar(db.Model):
+    """ The days a listing is booked, as a DayBitmap, so its calendar is read in one small row instead of from every
+    reservation. Refreshed in the transaction of every reservation change, and built from the listing's
+    reservations the first time one changes. Until then reads build it without saving it, see built(). """
+
+    __tablename__ = "listing_calendars"
+
+    listing_id = db.Column(
+        db.Integer,
+        db.ForeignKey("listings.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    first_day = db.Column(
+        db.Date,
+    )
+
+    days = db.Column(
+        db.LargeBinary,
+        nullable=False,
+        default=b'',
+    )
+
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+    def __repr__(self):
+        return f"< ListingCalendar Listing #{self.listing_id}, FirstDay: {self.first_day}, Bytes: {len(self.days)} >"
+
+    @classmethod
+    def locked(cls, listing_id):
+        """ The listing's calendar, locked until the session commits. Creates it from the listing's reservations if
+        it doesn't exist yet. """
+
+        created = db.session.execute(
+            insert(cls)
+            .values(listing_id=listing_id, days=b'', updated_at=datetime.utcnow())
+            .on_conflict_do_nothing()
+            .returning(cls.listing_id)
+        ).first()
+
+        calendar = db.session.get(cls, listing_id, with_for_update=True, populate_existing=True)
+        if created:
+            calendar.refresh()
+
+        return calendar
+
+    @classmethod
+    def built(cls, listing_id):
+        """ The listing's calendar built from its reservations, not saved, for reads of a listing that doesn't have
+        one yet. Reads don't lock or write, the calendar is saved by the first reservation change. """
+
+        calendar = cls(listing_id=listing_id, days=b'')
+        calendar.refresh()
+
+        return calendar
+
+    def refresh(self, start_day=None, end_day=None):
+        """ Recomputes the days from start_day up to, not including, end_day from the listing's active
+        reservations, or every day when they aren't given. The overlap query is served by the index of the
+        reservations' exclusion constraint. """
+
+        reservations = select(Reservation.start_date, Reservation.end_date).where(
+            Reservation.listing_uid == self.listing_id,
+            Reservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        )
+
+        if start_day is None:
+            bitmap = DayBitmap()
+        else:
+            bitmap = DayBitmap(self.first_day, self.days)
+            bitmap.set_days(start_day, end_day, booked=False)
+            reservations = reservations.where(Reservation.period.overlaps(
+                func.tsrange(start_day, end_day, '[)')))
+
+        for reservation_start, reservation_end in db.session.execute(reservations):
+            reservation_start_day, reservation_end_day = reservation_days(reservation_start, reservation_end)
+            if start_day is not None:
+                reservation_start_day = max(reservation_start_day, start_day)
+                reservation_end_day = min(reservation_end_day, end_day)
+            bitmap.set_days(reservation_start_day, reservation_end_day, booked=True)
+
+        self.first_day = bitmap.first_day
+        self.days = bitmap.to_bytes()
+
+    def booked_days(self, start_day, end_day):
+        """ Whether each day from start_day up to, not including, end_day is booked """
+
+        return DayBitmap(self.first_day, self.days).booked_days(start_day, end_day)
+
+# endregion
+
+
+def abort_if_overlapping(error):
+    """ Aborts with 409 if an IntegrityError came from the overlap exclusion constraint """
+
+    if getattr(error.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+        abort(409, description="The listing is already reserved for some of those dates.")
+
+
+# the exclusion constraint compares listing_uid with = in a GiST index, which needs btree_gist
+event.listen(Reservation.__table__, 'before_create', DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"))
@@ -40,6 +40,7 @@ def attempt_to_cancel_reservation(reservation, reason):
     try:
         reservation.status = ReservationStatusEnum.CANCELLED
         reservation.cancellation_reason = reason
+        reservation.update_listing_calendar()
         db.session.commit()
     except Exception as e:
         print(e)
@@ -55,6 +56,7 @@ def attempt_to_accept_reservation_request(reservation):
 
     try:
         reservation.status = ReservationStatusEnum.ACCEPTED
+        reservation.update_listing_calendar()
         db.session.commit()
     except Exception as e:
         print(e)
@@ -70,6 +72,7 @@ def attempt_to_decline_reservation_request(reservation):
 
     try:
         reservation.status = ReservationStatusEnum.DECLINED
+        reservation.update_listing_calendar()
         db.session.commit()
     except Exception as e:
         print(e)
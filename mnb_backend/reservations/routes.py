@@ -4,9 +4,13 @@ from werkzeug.exceptions import abort
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
 
 from mnb_backend.general_helpers import date_short_format_string, date_numbers_format_string
 from mnb_backend.listings.models import Listing
+from mnb_backend.conditional import conditional_list, get_validators_or_404, not_modified, with_validators
+from mnb_backend.pagination import paginate
+from mnb_backend.projections import get_projection
 from mnb_backend.reservations.models import Reservation
 from mnb_backend.users.models import User
 from mnb_backend.reservations.reservation_helpers import reservation_is_in_future, \
@@ -25,7 +29,8 @@ reservations_routes = Blueprint('reservations_routes_routes', __name__)
 @reservations_routes.post("/<int:listing_uid>")
 @jwt_required()
 def create_reservation(listing_uid):
-    """ Creates a reservation for the pool you're looking at if you are logged in
+    """ Creates a reservation for the pool you're looking at if you are logged in.
+    Responds 409 if the listing already has an active reservation overlapping those dates.
 
     Returns JSON like:
         {reservation: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }}
@@ -61,36 +66,55 @@ def list_all_reservations():
     """Return all reservations in system.
 
     Returns JSON like: {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created,
-    start_date, end_date, status, rental_period, total }, ...}
+    start_date, end_date, status, rental_period, total }, ..., next_cursor}
+    In id order. Paginate with limit and the cursor returned as next_cursor. Narrow with ?fields= and ?embed=, see
+    mnb_backend/projections.py.
     """
-    reservations = Reservation.query.all()
+    projection = get_projection(Reservation, request.args)
+    reservations, next_cursor = paginate(select(Reservation).options(*projection.loader_options()),
+                                         [Reservation.id], request.args)
 
-    serialized = [reservation.serialize() for reservation in reservations]
-    return jsonify(reservations=serialized)
+    etag, last_modified = conditional_list('reservations', reservations, next_cursor, projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    serialized = [projection.serialize(reservation) for reservation in reservations]
+    return with_validators(jsonify(reservations=serialized, next_cursor=next_cursor), etag, last_modified)
 
 
 @reservations_routes.get("/<int:listing_uid>/upcoming")
 @jwt_required()
 def get_all_upcoming_reservations_for_listing(listing_uid):
-    """ Gets all upcoming reservations associated with listing_uid
+    """ Gets upcoming reservations associated with listing_uid, soonest first.
+    Paginate with limit and the cursor returned as next_cursor. Narrow with ?fields= and ?embed=, see
+    mnb_backend/projections.py.
 
     Returns JSON like:
-        {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }, ...}
+        {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date,
+        end_date, status, rental_period, total }, ..., next_cursor}
 
     """
 
     current_user_id = get_jwt_identity()
 
     listing = Listing.query.get_or_404(listing_uid)
-    if listing.owner.id == current_user_id:
-        reservations = list(filter(lambda r: r.start_date > datetime.now(), listing.reservations))
-
-        # reservations = listing.reservations.filter(Reservation.start_date > datetime.now())
-
-        serialized_reservations = ([reservation.serialize()
+    if listing.owner_id == current_user_id:
+        projection = get_projection(Reservation, request.args)
+        reservations, next_cursor = paginate(Reservation.select_for_listing(listing.id, upcoming=True,
+                                                                            options=projection.loader_options()),
+                                             [Reservation.start_date, Reservation.id], request.args)
+
+        # which reservations are upcoming changes with time, not with updated_at, so no Last-Modified
+        etag, _ = conditional_list('upcoming_reservations', reservations, next_cursor, projection)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        serialized_reservations = ([projection.serialize(reservation)
                                     for reservation in reservations])
 
-        return jsonify(reservations=serialized_reservations)
+        return with_validators(jsonify(reservations=serialized_reservations, next_cursor=next_cursor), etag)
 
     abort(401)
 
@@ -98,23 +122,36 @@ def get_all_upcoming_reservations_for_listing(listing_uid):
 @reservations_routes.get("/<int:listing_uid>/past")
 @jwt_required()
 def get_all_past_reservations_for_listing(listing_uid):
-    """ Gets all past reservations associated with listing_uid
+    """ Gets past reservations associated with listing_uid, most recent first.
+    Paginate with limit and the cursor returned as next_cursor. Narrow with ?fields= and ?embed=, see
+    mnb_backend/projections.py.
 
     Returns JSON like:
-        {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }, ...}
+        {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date,
+        end_date, status, rental_period, total }, ..., next_cursor}
 
     """
 
     current_user_id = get_jwt_identity()
 
     listing = Listing.query.get_or_404(listing_uid)
-    if listing.owner.id == current_user_id:
-        reservations = list(filter(lambda r: r.start_date < datetime.now(), listing.reservations))
-
-        serialized_reservations = ([reservation.serialize()
+    if listing.owner_id == current_user_id:
+        projection = get_projection(Reservation, request.args)
+        reservations, next_cursor = paginate(Reservation.select_for_listing(listing.id, upcoming=False,
+                                                                            options=projection.loader_options()),
+                                             [Reservation.start_date, Reservation.id], request.args,
+                                             descending=True)
+
+        # which reservations are past changes with time, not with updated_at, so no Last-Modified
+        etag, _ = conditional_list('past_reservations', reservations, next_cursor, projection)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        serialized_reservations = ([projection.serialize(reservation)
                                     for reservation in reservations])
 
-        return jsonify(reservations=serialized_reservations)
+        return with_validators(jsonify(reservations=serialized_reservations, next_cursor=next_cursor), etag)
 
     abort(401)
 
@@ -122,7 +159,7 @@ def get_all_past_reservations_for_listing(listing_uid):
 @reservations_routes.get("/user/<int:user_uid>")
 @jwt_required()
 def get_booked_reservations_for_user_uid(user_uid):
-    """ Gets all reservations created by a user_uid
+    """ Gets all reservations created by a user_uid. Narrow with ?fields= and ?embed=, see mnb_backend/projections.py.
 
     Returns JSON like:
         {reservations: {reservation_uid, listing_uid, owner_uid, renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }, ...}
@@ -136,14 +173,23 @@ def get_booked_reservations_for_user_uid(user_uid):
     user = User.query.get_or_404(user_uid)
 
     if user.id == current_user_id:
-        reservations = (Reservation.query
-                        .filter(owner_id=current_user_id)
-                        .order_by(Reservation.start_date.desc()))
-
-        serialized_reservations = ([reservation.serialize()
+        projection = get_projection(Reservation, request.args)
+        reservations, next_cursor = paginate(select(Reservation)
+                                             .options(*projection.loader_options())
+                                             .where(Reservation.renter_id == current_user_id),
+                                             [Reservation.start_date, Reservation.id], request.args,
+                                             descending=True)
+
+        etag, last_modified = conditional_list('user_reservations', reservations, next_cursor, projection)
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
+
+        serialized_reservations = ([projection.serialize(reservation)
                                     for reservation in reservations])
 
-        return jsonify(reservations=serialized_reservations)
+        return with_validators(jsonify(reservations=serialized_reservations, next_cursor=next_cursor), etag,
+                               last_modified)
 
     abort(401)
 
@@ -152,13 +198,21 @@ def get_booked_reservations_for_user_uid(user_uid):
 @jwt_required()
 @is_listing_owner_or_is_reservation_booker_or_is_admin
 def get_reservation(reservation_id):
-    """ Gets specific reservation """
+    """ Gets specific reservation. Sends an ETag and answers a matching If-None-Match with 304 Not Modified.
+    Narrow with ?fields= and ?embed=, see mnb_backend/projections.py. """
 
-    reservation = Reservation.query.get_or_404(reservation_id)
+    projection = get_projection(Reservation, request.args)
+    etag, last_modified = get_validators_or_404('reservations', reservation_id,
+                                                Reservation.select_version(reservation_id), projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    reservation = Reservation.query.options(*projection.loader_options()).get_or_404(reservation_id)
     if reservation:
-        serialized_reservation = reservation.serialize()
+        serialized_reservation = projection.serialize(reservation)
 
-        return jsonify(reservation=serialized_reservation), 200
+        return with_validators(jsonify(reservation=serialized_reservation), etag, last_modified), 200
 
     abort(401)
 
@@ -168,7 +222,8 @@ def get_reservation(reservation_id):
 @is_reservation_booker
 def update_reservation(reservation_id):
     """ Updates specific reservation Returns JSON like: {reservation: {reservation_uid, listing_uid, owner_uid,
-    renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }}"""
+    renter_uid, reservation_date_created, start_date, end_date, status, rental_period, total }}
+    Responds 409 if the new dates overlap another active reservation of the listing."""
 
     reservation = Reservation.query.get_or_404(reservation_id)
     is_in_future = reservation_is_in_future(reservation)
@@ -0,0 +1,78 @@
+"""test file for listing calendar day bitmaps"""
+from datetime import date, datetime, timedelta
+from unittest import TestCase
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from mnb_backend.reservations.calendar import DayBitmap, get_availability_range, reservation_days
+
+
+class ReservationDaysTestCase(TestCase):
+    def test_ending_at_midnight_frees_the_last_day(self):
+        self.assertEqual(reservation_days(datetime(2024, 3, 1), datetime(2024, 3, 6)),
+                         (date(2024, 3, 1), date(2024, 3, 6)))
+
+    def test_ending_during_a_day_holds_it(self):
+        self.assertEqual(reservation_days(datetime(2024, 3, 1, 12, 1), datetime(2024, 3, 6, 12, 1)),
+                         (date(2024, 3, 1), date(2024, 3, 7)))
+
+
+class DayBitmapTestCase(TestCase):
+    def test_empty_bitmap_is_free(self):
+        bitmap = DayBitmap()
+
+        self.assertEqual(bitmap.booked_days(date(2024, 3, 1), date(2024, 3, 4)), [False, False, False])
+        self.assertEqual(bitmap.to_bytes(), b'')
+
+    def test_set_and_clear_days(self):
+        bitmap = DayBitmap()
+        bitmap.set_days(date(2024, 3, 2), date(2024, 3, 5), booked=True)
+        bitmap.set_days(date(2024, 3, 3), date(2024, 3, 4), booked=False)
+
+        self.assertEqual(bitmap.booked_days(date(2024, 3, 1), date(2024, 3, 6)),
+                         [False, True, False, True, False])
+
+    def test_booking_before_first_day_grows_the_bitmap(self):
+        bitmap = DayBitmap()
+        bitmap.set_days(date(2024, 3, 10), date(2024, 3, 12), booked=True)
+        bitmap.set_days(date(2024, 3, 1), date(2024, 3, 2), booked=True)
+
+        self.assertEqual(bitmap.first_day, date(2024, 3, 1))
+        self.assertEqual([date(2024, 3, 1) + timedelta(days=offset)
+                          for offset, booked in enumerate(bitmap.booked_days(date(2024, 3, 1), date(2024, 3, 13)))
+                          if booked],
+                         [date(2024, 3, 1), date(2024, 3, 10), date(2024, 3, 11)])
+
+    def test_clearing_before_first_day_is_a_no_op(self):
+        bitmap = DayBitmap()
+        bitmap.set_days(date(2024, 3, 10), date(2024, 3, 12), booked=True)
+        bitmap.set_days(date(2024, 3, 1), date(2024, 3, 11), booked=False)
+
+        self.assertEqual(bitmap.first_day, date(2024, 3, 10))
+        self.assertEqual(bitmap.booked_days(date(2024, 3, 10), date(2024, 3, 12)), [False, True])
+
+    def test_round_trips_through_bytes(self):
+        bitmap = DayBitmap()
+        bitmap.set_days(date(2024, 1, 1), date(2024, 12, 31), booked=True)
+        data = bitmap.to_bytes()
+
+        self.assertEqual(len(data), 46)
+        self.assertEqual(DayBitmap(bitmap.first_day, data).booked_days(date(2023, 12, 31), date(2024, 1, 2)),
+                         [False, True])
+
+
+class GetAvailabilityRangeTestCase(TestCase):
+    def test_to_is_included(self):
+        self.assertEqual(get_availability_range(MultiDict({"from": "2024-03-01", "to": "2024-03-31"})),
+                         (date(2024, 3, 1), date(2024, 4, 1)))
+
+    def test_defaults_to_the_next_90_days(self):
+        self.assertEqual(get_availability_range(MultiDict()),
+                         (date.today(), date.today() + timedelta(days=90)))
+
+    def test_rejects_bad_ranges(self):
+        for args in ({"from": "03/01/2024"}, {"from": "2024-03-02", "to": "2024-03-01"},
+                     {"from": "2024-01-01", "to": "2025-06-01"}):
+            with self.assertRaises(BadRequest):
+                get_availability_range(MultiDict(args))
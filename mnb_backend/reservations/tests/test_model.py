@@ -10,6 +10,7 @@ from mnb_backend.general_helpers import date_short_format_string
 from mnb_backend.listings.models import Listing
 from mnb_backend.reservations.models import Reservation
 from mnb_backend.reservations.tests.setup import ReservationsBaseViewTestCase
+from mnb_backend.serializers import http_date
 from mnb_backend.users.models import User
 
 bcrypt = Bcrypt()
@@ -41,9 +42,9 @@ class CreateReservationTestCase(ReservationsBaseViewTestCase):
             self.assertEqual(len(l1.reservations), 1)
             self.assertEqual(serialized_reservation, {
                 "id": reservation1.id,
-                "reservation_date_created": reservation1.reservation_date_created,
-                "start_date": reservation1.start_date,
-                "end_date": reservation1.end_date,
+                "reservation_date_created": http_date(reservation1.reservation_date_created),
+                "start_date": http_date(reservation1.start_date),
+                "end_date": http_date(reservation1.end_date),
                 "status": reservation1.status.value,
                 "duration": str(reservation1.duration),
                 "total": reservation1.total,
@@ -76,9 +77,9 @@ class CreateReservationTestCase(ReservationsBaseViewTestCase):
             self.assertEqual(reservation1.start_date, updated_start_date)
             self.assertEqual(serialized_reservation, {
                 "id": reservation1.id,
-                "reservation_date_created": reservation1.reservation_date_created,
-                "start_date": reservation1.start_date,
-                "end_date": reservation1.end_date,
+                "reservation_date_created": http_date(reservation1.reservation_date_created),
+                "start_date": http_date(reservation1.start_date),
+                "end_date": http_date(reservation1.end_date),
                 "status": reservation1.status.value,
                 "duration": str(reservation1.duration),
                 "total": reservation1.total,
@@ -1,6 +1,8 @@
 """test file for reservation routes"""
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from threading import Barrier
 from mnb_backend.general_helpers import date_short_format_string
 
 from flask_bcrypt import Bcrypt
@@ -10,6 +12,7 @@ from sqlalchemy import JSON
 from mnb_backend import app
 from mnb_backend.database import db
 from mnb_backend.listings.models import Listing
+from mnb_backend.reservations.models import ListingCalendar, Reservation
 from mnb_backend.reservations.tests.setup import ReservationsBaseViewTestCase
 from mnb_backend.users.models import User
 
@@ -51,6 +54,64 @@ class CreateReservationTestCase(ReservationsBaseViewTestCase):
             self.assertEqual(len(l1.reservations), 1)
 
 
+class ReservationOverlapTestCase(ReservationsBaseViewTestCase):
+    def book(self, client, listing_id, renter_id, start_date, duration):
+        access_token = create_access_token(identity=renter_id)
+        return client.post(f"/api/reservations/{listing_id}",
+                           headers={
+                               "Content-Type": "application/json",
+                               "Authorization": f"Bearer {access_token}"},
+                           data=json.dumps({
+                               "start_date": start_date.strftime(date_short_format_string),
+                               "duration": duration,
+                               "renter": renter_id
+                           }))
+
+    def test_overlapping_reservation_conflicts(self):
+        start_date = datetime.utcnow().date() + timedelta(days=5)
+
+        with app.test_client() as client:
+            first = self.book(client, self.l1_id, self.u2_id, start_date, 5)
+            overlapping = self.book(client, self.l1_id, self.u2_id, start_date + timedelta(days=4), 5)
+            # periods are half open, a booking may start the day the previous one ends
+            adjacent = self.book(client, self.l1_id, self.u2_id, start_date + timedelta(days=5), 5)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(overlapping.status_code, 409)
+        self.assertEqual(adjacent.status_code, 201)
+        self.assertEqual(Reservation.query.count(), 2)
+
+    def test_declined_reservation_frees_its_dates(self):
+        start_date = datetime.utcnow().date() + timedelta(days=5)
+
+        with app.test_client() as client:
+            reservation_id = self.book(client, self.l1_id, self.u2_id, start_date, 5).get_json()["reservation"]["id"]
+            client.patch(f"/api/reservations/{reservation_id}/decline",
+                         headers={"Authorization": f"Bearer {create_access_token(identity=self.u1_id)}"})
+
+            response = self.book(client, self.l1_id, self.u2_id, start_date, 5)
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_parallel_bookings_for_same_dates_book_once(self):
+        start_date = datetime.utcnow().date() + timedelta(days=5)
+        bookings = 8
+        barrier = Barrier(bookings)
+
+        def book():
+            # each thread has its own app context, so its own session and connection
+            with app.app_context(), app.test_client() as client:
+                barrier.wait()
+                return self.book(client, self.l1_id, self.u2_id, start_date, 5).status_code
+
+        with ThreadPoolExecutor(max_workers=bookings) as executor:
+            status_codes = list(executor.map(lambda _: book(), range(bookings)))
+
+        db.session.expire_all()
+        self.assertEqual(sorted(status_codes), [201] + [409] * (bookings - 1))
+        self.assertEqual(Reservation.query.count(), 1)
+
+
 class ReadReservationTestCase(ReservationsBaseViewTestCase):
     def test_list_all_reservations_happy(self):
         # Arrange
@@ -68,7 +129,7 @@ class ReadReservationTestCase(ReservationsBaseViewTestCase):
         }
 
         json_data2 = {
-            "start_date": "Thu Sep 04 2023",
+            "start_date": "Thu Sep 14 2023",
             "duration": 10,
             "renter": u2.id
         }
@@ -130,7 +191,7 @@ class ReadReservationTestCase(ReservationsBaseViewTestCase):
         }
 
         json_data3 = {
-            "start_date": (datetime.utcnow().date() + timedelta(days=2)).strftime(date_short_format_string),
+            "start_date": (datetime.utcnow().date() + timedelta(days=12)).strftime(date_short_format_string),
             "duration": 10,
             "renter": u2.id
         }
@@ -168,6 +229,41 @@ class ReadReservationTestCase(ReservationsBaseViewTestCase):
             self.assertEqual(len(data["reservations"]), 2)
             self.assertEqual(len(l1.reservations), 3)
 
+    def test_upcoming_reservations_for_listing_paginate_soonest_first(self):
+        # Arrange
+        u1 = db.session.get(User, self.u1_id)
+        u2 = db.session.get(User, self.u2_id)
+        l1 = db.session.get(Listing, self.l1_id)
+        access_token = create_access_token(identity=u1.id)
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {access_token}"}
+
+        with app.test_client() as client:
+            for days in (-3, 9, 3, 6):
+                client.post(f"/api/reservations/{l1.id}",
+                            headers=headers,
+                            data=json.dumps({
+                                "start_date": (datetime.utcnow().date() + timedelta(days=days))
+                                .strftime(date_short_format_string),
+                                "duration": 1,
+                                "renter": u2.id
+                            }))
+
+            # Act
+            start_dates = []
+            query_string = {"limit": 2}
+            while True:
+                data = client.get(f"/api/reservations/{l1.id}/upcoming",
+                                  headers=headers, query_string=query_string).get_json()
+                start_dates.extend(reservation["start_date"] for reservation in data["reservations"])
+                if data["next_cursor"] is None:
+                    break
+                query_string["cursor"] = data["next_cursor"]
+
+            # Assert
+            expected = [(datetime.utcnow().date() + timedelta(days=days)) for days in (3, 6, 9)]
+            self.assertEqual([datetime.strptime(start_date, "%a, %d %b %Y %H:%M:%S %Z").date()
+                              for start_date in start_dates], expected)
+
     def test_get_all_past_reservations_for_listing_happy(self):
         # Arrange
         u1 = db.session.get(User, self.u1_id)
@@ -195,13 +291,13 @@ class ReadReservationTestCase(ReservationsBaseViewTestCase):
 
         json_data2 = {
             "start_date": "Fri Aug 23 2023",
-            "duration": 10,
+            "duration": 5,
             "renter": u2.id
         }
 
         json_data3 = {
             "start_date": "Wed Aug 16 2023",
-            "duration": 10,
+            "duration": 5,
             "renter": u2.id
         }
 
@@ -332,6 +428,33 @@ class ReadReservationTestCase(ReservationsBaseViewTestCase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(len(l1.reservations), 1)
 
+    def test_get_reservation_is_304_until_it_changes(self):
+        owner_headers = {"Authorization": f"Bearer {create_access_token(identity=self.u1_id)}"}
+        renter_headers = {"Content-Type": "application/json",
+                          "Authorization": f"Bearer {create_access_token(identity=self.u2_id)}"}
+
+        with app.test_client() as client:
+            reservation_id = client.post(f"/api/reservations/{self.l1_id}",
+                                         headers=renter_headers,
+                                         data=json.dumps({
+                                             "start_date": (datetime.utcnow().date() + timedelta(days=5))
+                                             .strftime(date_short_format_string),
+                                             "duration": 5,
+                                             "renter": self.u2_id
+                                         })).get_json()["reservation"]["id"]
+
+            etag = client.get(f"/api/reservations/{reservation_id}", headers=owner_headers).headers["ETag"]
+            unchanged = client.get(f"/api/reservations/{reservation_id}",
+                                   headers={**owner_headers, "If-None-Match": etag})
+
+            client.patch(f"/api/reservations/{reservation_id}/accept", headers=owner_headers)
+            changed = client.get(f"/api/reservations/{reservation_id}",
+                                 headers={**owner_headers, "If-None-Match": etag})
+
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.get_json()["reservation"]["status"], "Accepted")
+
 
 class UpdateReservationTestCase(ReservationsBaseViewTestCase):
     def test_update_reservation_happy(self):
@@ -502,3 +625,66 @@ class UpdateReservationTestCase(ReservationsBaseViewTestCase):
 
             # Assert
             self.assertEqual(data["reservation"]["status"], "Declined")
+
+
+class ListingAvailabilityTestCase(ReservationsBaseViewTestCase):
+    def book(self, client, start_date, duration):
+        access_token = create_access_token(identity=self.u2_id)
+        return client.post(f"/api/reservations/{self.l1_id}",
+                           headers={
+                               "Content-Type": "application/json",
+                               "Authorization": f"Bearer {access_token}"},
+                           data=json.dumps({
+                               "start_date": start_date.strftime(date_short_format_string),
+                               "duration": duration,
+                               "renter": self.u2_id
+                           })).get_json()["reservation"]["id"]
+
+    def booked_days(self, client, start_date, end_date):
+        response = client.get(f"/api/listings/{self.l1_id}/availability",
+                              query_string={"from": start_date.isoformat(), "to": end_date.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        return [day["date"] for day in response.get_json()["availability"]["days"] if day["booked"]]
+
+    def test_availability_follows_reservation_changes(self):
+        start_date = datetime.utcnow().date() + timedelta(days=5)
+        owner_token = create_access_token(identity=self.u1_id)
+        renter_token = create_access_token(identity=self.u2_id)
+
+        with app.test_client() as client:
+            # Act / Assert
+            self.assertEqual(self.booked_days(client, start_date, start_date + timedelta(days=9)), [])
+
+            first_id = self.book(client, start_date, 2)
+            second_id = self.book(client, start_date + timedelta(days=4), 2)
+            self.assertEqual(self.booked_days(client, start_date, start_date + timedelta(days=9)),
+                             [(start_date + timedelta(days=offset)).isoformat() for offset in (0, 1, 4, 5)])
+
+            client.patch(f"/api/reservations/{first_id}/decline",
+                         headers={"Authorization": f"Bearer {owner_token}"})
+            client.patch(f"/api/reservations/{second_id}",
+                         headers={"Content-Type": "application/json", "Authorization": f"Bearer {renter_token}"},
+                         data=json.dumps({
+                             "start_date": (start_date + timedelta(days=7)).strftime(date_short_format_string),
+                             "duration": 2,
+                         }))
+            self.assertEqual(self.booked_days(client, start_date, start_date + timedelta(days=9)),
+                             [(start_date + timedelta(days=offset)).isoformat() for offset in (7, 8)])
+
+    def test_availability_read_doesnt_save_calendar(self):
+        start_date = datetime.utcnow().date() + timedelta(days=5)
+        with app.test_client() as client:
+            self.book(client, start_date, 2)
+            ListingCalendar.query.delete()
+            db.session.commit()
+
+            booked_days = self.booked_days(client, start_date, start_date + timedelta(days=3))
+
+        self.assertEqual(booked_days, [start_date.isoformat(), (start_date + timedelta(days=1)).isoformat()])
+        self.assertEqual(ListingCalendar.query.count(), 0)
+
+    def test_availability_of_missing_listing_is_404(self):
+        with app.test_client() as client:
+            response = client.get("/api/listings/0/availability")
+
+        self.assertEqual(response.status_code, 404)
@@ -1,88 +1,99 @@
 """Routes for searches blueprint."""
 
 from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import abort
 
-from mnb_backend.addresses.models import Address, City
 from mnb_backend.listings.models import Listing
-from mnb_backend.users.models import User
-from mnb_backend.util_filters import get_all_books_in_zipcode, get_all_users_in_city, get_all_users_in_state, \
-    get_all_users_in_zipcode, get_all_listings_in_city, get_all_listings_in_state, basic_listing_search, books_within_radius, \
-    locations_within_radius
+from mnb_backend.pagination import decode_cursor, get_page_limit
+from mnb_backend.projections import get_projection
+from mnb_backend.searches.search_engine import NEARBY_DEFAULT_RADIUS_KM, check_coordinates, get_number_arg, \
+    get_search_filters, get_user_coordinates, search_listings, search_nearby_listings
 
 searches_routes = Blueprint('searches_routes', __name__)
 
 
+def serialize_search_result(projection, listing, distance):
+    """ Serializes a listing found by a search, adding its distance in meters for radius searches """
+
+    serialized = projection.serialize(listing)
+    if distance is not None:
+        serialized["distance"] = distance
+
+    return serialized
+
+
 # region Search Endpoints
 @searches_routes.get("/")
+@jwt_required(optional=True)
 def search():
-    """ Searches listing properties for matched or similar values.
+    """ Searches listings. Every filter is optional and they can be combined:
+        title, mount_type, activity_type, min_price, max_price, city, state, zipcode, latitude + longitude + radius (km)
+    Paginate with limit and the cursor returned as next_cursor. Listings of the logged-in user are left out.
+    Radius searches come back nearest first with the distance in meters. Narrow the listings with ?fields= and
+    ?embed=, see mnb_backend/projections.py.
 
     Returns JSON like:
-        {listings: {listing_uid, owner_id, orig_image_url, small_image_url, title, author, isbn, genre, condition, price, reservations}, ...}
+        {listings: [{id, owner_id, owner, primary_image_url, title, mount_type, activity_type, rate_price, status,
+        distance}, ...], next_cursor}
     """
 
-    # query_string = request.query_string
-
-    # endurance
-    # 94108
-
-    # logged_in_user_uid, listing_title, listing_author, city, state, zipcode
-    title = request.args.get('title')
-    author = request.args.get('author')
-    isbn = request.args.get('isbn')
-    city = request.args.get('city')
-    state = request.args.get('state')
-    zipcode = request.args.get('zipcode')  # mandatory
-
-    request.args.keys()
-    # if len(key) > 0:
-    # TODO: Create dynamic filter: if filter is not empty, add filter to ultimate filter
-    # https://stackoverflow.com/questions/41305129/sqlalchemy-dynamic-filtering
-
-    # test = Book.query.filter(Book.title.ilike(f"%{title}%") | Book.author.ilike(f"%{author}%") | Book.isbn.ilike(f"%{isbn}%")).all()
-    # qs = Book.query.filter(Book.title.ilike(f"%{title}%") | Book.author.ilike(f"%{author}%") | Book.isbn.ilike(f"%{isbn}%")).all()
-    # qs = filter book by mandatory field
-    # if author is not none, qs = qs.filter(author)
-
-    city_users = get_all_users_in_city("Hercules")
-    state_users = get_all_users_in_state("CA")
-    zipcode_users = get_all_users_in_zipcode("94547")
-    users = User.query.join(Address).join(City).filter(City.city_name == "Hercules").all()
-    city_listings = get_all_listings_in_city("Hercules")
-    state_listings = get_all_listings_in_state("CA")
-    zipcode_listings = get_all_books_in_zipcode("94547")
-    all_listings = Listing.query.all()
-    searched_listings = basic_listing_search(1, title, author, city, state, zipcode)
-
-    serialized = [listing.serialize() for listing in searched_listings]
-    return jsonify(listings=serialized)
-
-
-@searches_routes.get("/api/search/listings_nearby")
-def list_nearby_books():
-    """ Shows all books nearby
-
-    Returns JSON like: {books: {book_uid, owner_id, orig_image_url, small_image_url, title, author, isbn, genre,
-    condition, price, reservations},...}
+    filters = get_search_filters(request.args)
+    limit = get_page_limit(request.args)
+    cursor_values = decode_cursor(request.args.get('cursor'))
+
+    projection = get_projection(Listing, request.args)
+
+    results, next_cursor = search_listings(filters, limit, cursor_values, exclude_owner_id=get_jwt_identity(),
+                                           options=projection.loader_options())
+
+    serialized = [serialize_search_result(projection, listing, distance) for listing, distance in results]
+    return jsonify(listings=serialized, next_cursor=next_cursor)
+
+
+@searches_routes.get("/nearby")
+@jwt_required(optional=True)
+def list_nearby():
+    """ Shows listings near a point, nearest first.
+    Takes latitude, longitude, radius (km), limit and cursor. latitude and longitude default to the logged-in user's
+    stored location. Listings of the logged-in user are left out. Narrow the listings with ?fields= and ?embed=, see
+    mnb_backend/projections.py.
+
+    Returns JSON like:
+        {listings: [{id, owner_id, owner, primary_image_url, title, mount_type, activity_type, rate_price, status,
+        distance}, ...], next_cursor}
     """
 
-    title = request.args.get('title')
-    author = request.args.get('author')
+    current_user_id = get_jwt_identity()
 
-    books = books_within_radius(38.006370860286694, -122.28195023589687, 1000, 1, title, author)
+    latitude = get_number_arg(request.args, 'latitude')
+    longitude = get_number_arg(request.args, 'longitude')
+    radius = get_number_arg(request.args, 'radius')
+    if radius is None:
+        radius = NEARBY_DEFAULT_RADIUS_KM
 
-    serialized = [book.serialize() for book in books]
+    if radius <= 0:
+        abort(400, description="radius must be positive")
 
-    return jsonify(books=serialized)
+    if (latitude is None or longitude is None) and current_user_id is not None:
+        user_coordinates = get_user_coordinates(current_user_id)
+        if user_coordinates is not None:
+            latitude, longitude = user_coordinates
 
+    if latitude is None or longitude is None:
+        abort(400, description="latitude and longitude required")
+    check_coordinates(latitude, longitude)
 
-@searches_routes.get("/api/search/nearby")
-def list_nearby():
-    """ Shows all points nearby """
+    limit = get_page_limit(request.args)
+    cursor_values = decode_cursor(request.args.get('cursor'))
+
+    projection = get_projection(Listing, request.args)
 
-    locations = locations_within_radius(38.006370860286694, -122.28195023589687, 1000)
+    results, next_cursor = search_nearby_listings(latitude, longitude, radius, limit, cursor_values,
+                                                  exclude_owner_id=current_user_id, options=projection.loader_options())
 
-    return locations
+    serialized = [serialize_search_result(projection, listing, distance) for listing, distance in results]
+    return jsonify(listings=serialized, next_cursor=next_cursor)
 
 
 # endregion
@@ -0,0 +1,283 @@
+"""Composable listing search.
+
+Every filter given in the request is folded into a single SELECT on listings, which is then keyset paginated and
+eager loaded with Listing.serialization_plan(), so a search costs a fixed number of queries no matter how many
+filters or results there are.
+"""
+import math
+import re
+
+from sqlalchemy import Float, cast, func, null, or_, select
+from werkzeug.exceptions import abort
+
+from mnb_backend.addresses.models import Address, City, State, ZipCode, Location
+from mnb_backend.database import db
+from mnb_backend.listings.helpers import get_mount_type_enum, get_activity_type_enum
+from mnb_backend.listings.models import Listing
+from mnb_backend.pagination import build_page, keyset_paginate, load_cursor_values
+from mnb_backend.users.models import User
+
+TEXT_FILTERS = ('title', 'mount_type', 'activity_type', 'city', 'state', 'zipcode')
+NUMBER_FILTERS = ('min_price', 'max_price', 'latitude', 'longitude', 'radius')
+
+NEARBY_DEFAULT_RADIUS_KM = 25
+NEARBY_MAX_RADIUS_KM = 500
+# most owner locations a nearby search looks at, so a dense area can't make the response slower
+NEARBY_SCAN_LIMIT = 1000
+
+
+# region filters
+def get_number_arg(args, name):
+    """
+    Reads a number from the request args, None when it wasn't given or is blank. Aborts with a 400 if it isn't a
+    finite number."""
+
+    value = args.get(name)
+    if value is None or value.strip() == "":
+        return None
+
+    try:
+        number = float(value)
+    except ValueError:
+        abort(400, description=f"{name} must be a number")
+
+    if not math.isfinite(number):
+        abort(400, description=f"{name} must be a number")
+
+    return number
+
+
+def check_coordinates(latitude, longitude):
+    """
+    Aborts with a 400 unless latitude and longitude are on the globe."""
+
+    if not -90 <= latitude <= 90:
+        abort(400, description="latitude must be between -90 and 90")
+    if not -180 <= longitude <= 180:
+        abort(400, description="longitude must be between -180 and 180")
+
+
+def get_search_filters(args):
+    """
+    Pulls the supported search filters out of the request args. Filters that weren't given are left out.
+
+    Returns a dict like:
+        {title, mount_type, activity_type, min_price, max_price, city, state, zipcode, latitude, longitude, radius}
+    """
+
+    filters = {}
+
+    for name in TEXT_FILTERS:
+        value = args.get(name)
+        if value is not None and value.strip() != "":
+            filters[name] = value.strip()
+
+    for name in NUMBER_FILTERS:
+        value = get_number_arg(args, name)
+        if value is not None:
+            filters[name] = value
+
+    try:
+        if 'mount_type' in filters:
+            filters['mount_type'] = get_mount_type_enum(filters['mount_type'])
+        if 'activity_type' in filters:
+            filters['activity_type'] = get_activity_type_enum(filters['activity_type'])
+    except KeyError as error:
+        abort(400, description=f"Unknown listing type {error}")
+
+    radius_filters = [name for name in ('latitude', 'longitude', 'radius') if name in filters]
+    if 0 < len(radius_filters) < 3:
+        abort(400, description="latitude, longitude and radius must be given together")
+    if radius_filters:
+        check_coordinates(filters['latitude'], filters['longitude'])
+        if filters['radius'] <= 0:
+            abort(400, description="radius must be positive")
+
+    return filters
+
+
+def uses_location_filters(filters):
+    """
+    Returns True if any filter needs the owner's address."""
+
+    return any(name in filters for name in ('city', 'state', 'zipcode', 'radius'))
+
+
+# endregion
+
+# region title search
+def title_search_clauses(title):
+    """
+    Builds the clauses for a full-text title search, backed by the listings.search_vector and trigram indexes.
+
+    Every word is matched as a prefix ("bask" finds "Basket"), and titles that are close enough by trigram word
+    similarity also match so small typos ("cargi") still find results.
+
+    Returns (match_clause, rank), rank is higher for better matches."""
+
+    words = re.findall(r"\w+", title.lower())
+    prefix_query = " & ".join(f"{word}:*" for word in words)
+    ts_query = func.to_tsquery('english', prefix_query)
+
+    full_text_match = Listing.search_vector.op('@@')(ts_query)
+    # title %> query is true when word_similarity(query, title) is above pg_trgm.word_similarity_threshold
+    typo_match = Listing.title.op('%>')(title)
+
+    # ts_rank and word_similarity are real. The rank goes into the cursor as a Python float and comes back as double
+    # precision, which the real wouldn't compare equal to, so the rank is double precision throughout.
+    rank = cast(func.ts_rank(Listing.search_vector, ts_query) + func.word_similarity(title, Listing.title), Float(53))
+
+    if len(words) == 0:
+        return typo_match, rank
+
+    return or_(full_text_match, typo_match), rank
+
+
+# endregion
+
+# region search
+def build_listing_search(filters, exclude_owner_id=None):
+    """
+    Builds one SELECT for the listings matching every given filter."""
+
+    stmt = select(Listing)
+
+    if 'title' in filters:
+        title_match, _ = title_search_clauses(filters['title'])
+        stmt = stmt.where(title_match)
+    if 'mount_type' in filters:
+        stmt = stmt.where(Listing.mount_type == filters['mount_type'])
+    if 'activity_type' in filters:
+        stmt = stmt.where(Listing.activity_type == filters['activity_type'])
+    if 'min_price' in filters:
+        stmt = stmt.where(Listing.rate_price >= filters['min_price'])
+    if 'max_price' in filters:
+        stmt = stmt.where(Listing.rate_price <= filters['max_price'])
+    if exclude_owner_id is not None:
+        stmt = stmt.where(Listing.owner_id != exclude_owner_id)
+
+    if uses_location_filters(filters):
+        # a listing has one owner and addresses.user_id is unique, so the joins can't duplicate listing rows
+        stmt = stmt.join(User, Listing.owner_id == User.id).join(Address, Address.user_id == User.id)
+
+        if 'zipcode' in filters:
+            stmt = stmt.join(ZipCode, Address.zipcode_uid == ZipCode.id).where(ZipCode.code == filters['zipcode'])
+        if 'city' in filters or 'state' in filters:
+            stmt = stmt.join(City, Address.city_uid == City.id)
+        if 'city' in filters:
+            stmt = stmt.where(City.city_name.ilike(filters['city']))
+        if 'state' in filters:
+            stmt = stmt.join(State, State.city_uid == City.id) \
+                .where(State.state_abbreviation == filters['state'].upper())
+        if 'radius' in filters:
+            radius_m = filters['radius'] * 1000
+            stmt = stmt.join(Location, Location.address_id == Address.id) \
+                .where(Location.within_radius(filters['latitude'], filters['longitude'], radius_m))
+
+    return stmt
+
+
+def get_distance_column(filters):
+    """
+    Returns the distance in meters from the searched point, or NULL when the search has no radius."""
+
+    if 'radius' in filters:
+        return Location.distance_from(filters['latitude'], filters['longitude'])
+
+    return null()
+
+
+def get_search_ordering(filters):
+    """
+    Picks the order results come back in: best title match first when searching by title, nearest first when
+    searching by radius, otherwise by id.
+
+    Returns (sort_columns, descending), the last sort column is always Listing.id to keep the ordering stable."""
+
+    if 'title' in filters:
+        _, rank = title_search_clauses(filters['title'])
+        return [rank, Listing.id], True
+
+    if 'radius' in filters:
+        return [get_distance_column(filters), Listing.id], False
+
+    return [Listing.id], False
+
+
+def search_listings(filters, limit, cursor_values=None, exclude_owner_id=None, options=None):
+    """
+    Runs a listing search and returns one page of results, loaded with options, the loader options of serialize() by
+    default.
+
+    Returns (results, next_cursor), results is a list of (listing, distance in meters or None)."""
+
+    sort_columns, descending = get_search_ordering(filters)
+    cursor_values = load_cursor_values(sort_columns, cursor_values)
+
+    stmt = build_listing_search(filters, exclude_owner_id)
+    # the sort key is selected too so the next cursor can be built from the last row
+    stmt = stmt.add_columns(get_distance_column(filters), *sort_columns)
+    stmt = keyset_paginate(stmt, sort_columns, cursor_values, limit, descending)
+    stmt = stmt.options(*(Listing.serialization_plan() if options is None else options))
+
+    rows = db.session.execute(stmt).all()
+    rows, next_cursor = build_page(rows, limit, lambda row: list(row[2:]))
+
+    return [(row[0], row[1]) for row in rows], next_cursor
+
+# endregion
+
+
+# region nearby
+def get_user_coordinates(user_id):
+    """
+    Returns (latitude, longitude) of the user's stored location, or None if they don't have one."""
+
+    stmt = select(Location.point_y, Location.point_x) \
+        .join(Address, Location.address_id == Address.id) \
+        .where(Address.user_id == user_id)
+    row = db.session.execute(stmt).first()
+
+    if row is None or row.point_y is None:
+        return None
+
+    return row.point_y, row.point_x
+
+
+def search_nearby_listings(latitude, longitude, radius_km, limit, cursor_values=None, exclude_owner_id=None,
+                           options=None):
+    """
+    Finds listings near a point, nearest first, loaded with options, the loader options of serialize() by default.
+
+    Only the NEARBY_SCAN_LIMIT owner locations closest to the point are considered. They are found by walking the
+    gist index in distance order, so the work done is bounded no matter how many listings are in the area.
+
+    Returns (results, next_cursor), results is a list of (listing, distance in meters)."""
+
+    radius_m = min(radius_km, NEARBY_MAX_RADIUS_KM) * 1000
+    distance = Location.distance_from(latitude, longitude)
+
+    nearest_locations = select(Location.address_id, distance.label('distance')) \
+        .where(Location.within_radius(latitude, longitude, radius_m)) \
+        .order_by(distance) \
+        .limit(NEARBY_SCAN_LIMIT) \
+        .subquery()
+
+    stmt = select(Listing, nearest_locations.c.distance, Listing.id) \
+        .join(User, Listing.owner_id == User.id) \
+        .join(Address, Address.user_id == User.id) \
+        .join(nearest_locations, nearest_locations.c.address_id == Address.id)
+
+    if exclude_owner_id is not None:
+        stmt = stmt.where(Listing.owner_id != exclude_owner_id)
+
+    sort_columns = [nearest_locations.c.distance, Listing.id]
+    stmt = keyset_paginate(stmt, sort_columns, load_cursor_values(sort_columns, cursor_values), limit)
+    stmt = stmt.options(*(Listing.serialization_plan() if options is None else options))
+
+    rows = db.session.execute(stmt).all()
+    rows, next_cursor = build_page(rows, limit, lambda row: [row[1], row[2]])
+
+    return [(row[0], row[1]) for row in rows], next_cursor
+
+# endregion
@@ -0,0 +1,83 @@
+"""Setup for search tests"""
+from unittest import TestCase
+
+from mnb_backend import app
+from mnb_backend.addresses.models import Address, Location, City, State, ZipCode
+from mnb_backend.addresses.states import states
+from mnb_backend.database import db
+from mnb_backend.enums import UserStatusEnums, RackMountTypeEnum, RackActivityTypeEnum
+from mnb_backend.listings.models import Listing
+from mnb_backend.users.models import User
+from mnb_backend.test_setup_helpers import delete_all_tables
+
+
+class SearchBaseViewTestCase(TestCase):
+    def setUp(self):
+        """
+        Create test client, add sample data. u1 lives in Hercules, CA and u2 lives in Tucson, AZ."""
+
+        delete_all_tables(self)
+
+        # Insert all states into the database
+        for state_data in states:
+            state = State(state_name=state_data['name'], state_abbreviation=state_data['abbreviation'])
+            db.session.add(state)
+
+        u1 = User.signup("ua@email.com", "password", "uafirstname", "uafirstname", "I am a test user",
+                         UserStatusEnums.ACTIVE)
+        u2 = User.signup("ub@email.com", "password", "ubfirstname", "ubfirstname", "I am a test user",
+                         UserStatusEnums.ACTIVE)
+        db.session.add_all([u1, u2])
+        db.session.commit()
+
+        self.u1_id = u1.id
+        self.u2_id = u2.id
+
+        address1 = Address(street_address="164 Glenwood")
+        address2 = Address(street_address="1200 N Stone Ave")
+        db.session.add_all([address1, address2])
+        address1.user = u1
+        address2.user = u2
+
+        location1 = Location(point='POINT(-122.28195023589687 38.006370860286694)')
+        location2 = Location(point='POINT(-110.961431 32.239627)')
+        db.session.add_all([location1, location2])
+        address1.location = location1
+        address2.location = location2
+
+        city1 = City(city_name="Hercules")
+        city2 = City(city_name="Tucson")
+        db.session.add_all([city1, city2])
+        address1.city = city1
+        address2.city = city2
+
+        city1.state = State.query.filter(State.state_abbreviation == "CA").first()
+        city2.state = State.query.filter(State.state_abbreviation == "AZ").first()
+
+        zipcode1 = ZipCode(code=94547)
+        zipcode2 = ZipCode(code=85705)
+        db.session.add_all([zipcode1, zipcode2])
+        address1.zipcode = zipcode1
+        address2.zipcode = zipcode2
+        db.session.commit()
+
+        l1 = Listing.create_listing(owner=u1, title="Large Cargo Basket", mount_type=RackMountTypeEnum.ROOF.value,
+                                    activity_type=RackActivityTypeEnum.CARGO.value, rate_price=2000)
+        l2 = Listing.create_listing(owner=u1, title="Two Bike Hitch Rack", mount_type=RackMountTypeEnum.HITCH.value,
+                                    activity_type=RackActivityTypeEnum.BICYCLE.value, rate_price=1500)
+        l3 = Listing.create_listing(owner=u2, title="Ski Roof Rack", mount_type=RackMountTypeEnum.ROOF.value,
+                                    activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value, rate_price=1000)
+        l4 = Listing.create_listing(owner=u2, title="Small Cargo Box", mount_type=RackMountTypeEnum.ROOF.value,
+                                    activity_type=RackActivityTypeEnum.CARGO.value, rate_price=500)
+
+        self.l1_id = l1.id
+        self.l2_id = l2.id
+        self.l3_id = l3.id
+        self.l4_id = l4.id
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Rollback any failed session transactions"""
+        db.session.rollback()
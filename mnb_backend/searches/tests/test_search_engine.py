@@ -0,0 +1,49 @@
+"""test file for the search engine queries"""
+from mnb_backend.addresses.models import Location
+from mnb_backend.database import db
+from mnb_backend.searches.search_engine import build_listing_search, get_search_filters, get_search_ordering
+from mnb_backend.searches.tests.setup import SearchBaseViewTestCase
+from mnb_backend.pagination import keyset_paginate
+
+db.drop_all()
+db.create_all()
+
+
+def explain(stmt):
+    """ Returns the query plan for stmt as one string """
+
+    compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+
+    # the test tables are tiny, so take sequential scans off the table to see whether the index is usable at all
+    db.session.execute(db.text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(db.session.execute(db.text(f"EXPLAIN {compiled}")).scalars())
+    db.session.rollback()
+
+    return plan
+
+
+class RadiusSearchIndexTestCase(SearchBaseViewTestCase):
+    def test_radius_filter_uses_geography_index(self):
+        stmt = db.select(Location.id).where(Location.within_radius(38.0, -122.28, 50000))
+
+        self.assertIn("idx_locations_geog", explain(stmt))
+
+    def test_nearest_first_ordering_uses_geography_index(self):
+        stmt = db.select(Location.id).order_by(Location.distance_from(38.0, -122.28)).limit(10)
+
+        self.assertIn("idx_locations_geog", explain(stmt))
+
+    def test_listing_radius_search_uses_geography_index(self):
+        filters = get_search_filters({"latitude": "38.0", "longitude": "-122.28", "radius": "50"})
+        sort_columns, descending = get_search_ordering(filters)
+        stmt = keyset_paginate(build_listing_search(filters), sort_columns, None, 20, descending)
+
+        self.assertIn("idx_locations_geog", explain(stmt))
+
+    def test_radius_search_returns_distance(self):
+        with self.client as client:
+            data = client.get("/api/searches/", query_string={
+                "latitude": 38.006370860286694, "longitude": -122.28195023589687, "radius": 50}).get_json()
+
+        self.assertEqual(len(data["listings"]), 2)
+        self.assertAlmostEqual(data["listings"][0]["distance"], 0, places=3)
@@ -0,0 +1,216 @@
+"""test file for search routes"""
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.enums import RackMountTypeEnum, RackActivityTypeEnum
+from mnb_backend.listings.models import Listing
+from mnb_backend.pagination import encode_cursor
+from mnb_backend.searches.tests.setup import SearchBaseViewTestCase
+from mnb_backend.test_setup_helpers import count_queries
+from mnb_backend.users.models import User
+
+db.drop_all()
+db.create_all()
+
+searches_root = "/api/searches"
+
+
+class SearchListingsTestCase(SearchBaseViewTestCase):
+    def search(self, query_string, headers=None):
+        with app.test_client() as client:
+            response = client.get(f"{searches_root}/", query_string=query_string, headers=headers)
+        return response
+
+    def test_search_no_filters_returns_all_listings(self):
+        response = self.search({})
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([listing["id"] for listing in data["listings"]],
+                         [self.l1_id, self.l2_id, self.l3_id, self.l4_id])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_search_by_title(self):
+        data = self.search({"title": "cargo"}).get_json()
+
+        self.assertCountEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l4_id])
+
+    def test_search_by_title_prefix(self):
+        data = self.search({"title": "bask"}).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l1_id])
+
+    def test_search_by_title_tolerates_typos(self):
+        data = self.search({"title": "cargi"}).get_json()
+
+        self.assertCountEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l4_id])
+
+    def test_search_by_title_ranks_best_match_first(self):
+        data = self.search({"title": "cargo box"}).get_json()
+
+        self.assertEqual(data["listings"][0]["id"], self.l4_id)
+
+    def test_search_by_title_paginates_with_cursor(self):
+        first_page = self.search({"title": "rack", "limit": 1}).get_json()
+        second_page = self.search({"title": "rack", "limit": 1, "cursor": first_page["next_cursor"]}).get_json()
+
+        first_ids = [listing["id"] for listing in first_page["listings"]]
+        second_ids = [listing["id"] for listing in second_page["listings"]]
+        self.assertEqual(len(first_ids), 1)
+        self.assertEqual(len(second_ids), 1)
+        self.assertCountEqual(first_ids + second_ids, [self.l2_id, self.l3_id])
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_search_rejects_mistyped_cursor(self):
+        for cursor in [encode_cursor(["x", 1]), encode_cursor([1.0, "1"]), encode_cursor([1.0])]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.search({"title": "rack", "cursor": cursor}).status_code, 400)
+
+    def test_search_combines_filters(self):
+        data = self.search({
+            "mount_type": RackMountTypeEnum.ROOF.value,
+            "activity_type": RackActivityTypeEnum.CARGO.value,
+            "max_price": 1000,
+        }).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l4_id])
+
+    def test_search_by_city_and_state(self):
+        data = self.search({"city": "hercules", "state": "CA"}).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l2_id])
+
+    def test_search_by_zipcode(self):
+        data = self.search({"zipcode": "85705"}).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l3_id, self.l4_id])
+
+    def test_search_by_radius(self):
+        data = self.search({"latitude": 38.0, "longitude": -122.28, "radius": 50}).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l2_id])
+
+    def test_search_rejects_bad_radius_filters(self):
+        for query in [{"latitude": 1000, "longitude": -122.28, "radius": 50},
+                      {"latitude": 38.0, "longitude": -200, "radius": 50},
+                      {"latitude": "nan", "longitude": -122.28, "radius": 50},
+                      {"latitude": 38.0, "longitude": -122.28, "radius": "inf"},
+                      {"latitude": 38.0, "longitude": -122.28, "radius": 0}]:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 400)
+
+    def test_search_leaves_out_logged_in_users_listings(self):
+        access_token = create_access_token(identity=self.u1_id)
+        data = self.search({}, headers={"Authorization": f"Bearer {access_token}"}).get_json()
+
+        self.assertEqual([listing["id"] for listing in data["listings"]], [self.l3_id, self.l4_id])
+
+    def test_search_paginates_with_cursor(self):
+        first_page = self.search({"limit": 3}).get_json()
+        second_page = self.search({"limit": 3, "cursor": first_page["next_cursor"]}).get_json()
+
+        self.assertEqual([listing["id"] for listing in first_page["listings"]], [self.l1_id, self.l2_id, self.l3_id])
+        self.assertEqual([listing["id"] for listing in second_page["listings"]], [self.l4_id])
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_search_rejects_bad_filters(self):
+        self.assertEqual(self.search({"mount_type": "trunk"}).status_code, 400)
+        self.assertEqual(self.search({"min_price": "cheap"}).status_code, 400)
+        self.assertEqual(self.search({"latitude": 38.0}).status_code, 400)
+        self.assertEqual(self.search({"cursor": "not a cursor"}).status_code, 400)
+
+    @patch("mnb_backend.addresses.models.fuzz_coordinates")
+    def test_search_query_count_is_constant(self, mock_fuzz_coordinates):
+        mock_fuzz_coordinates.return_value = (-122.28195077277807, 38.006370801958916)
+
+        db.session.commit()
+        with count_queries() as few_results_statements:
+            self.search({"title": "ski", "city": "Tucson"})
+
+        u1 = db.session.get(User, self.u1_id)
+        for i in range(5):
+            Listing.create_listing(owner=u1, title=f"Ski Rack {i}", mount_type=RackMountTypeEnum.ROOF.value,
+                                   activity_type=RackActivityTypeEnum.SKISSNOWBOARD.value, rate_price=400)
+
+        db.session.commit()
+        with count_queries() as many_results_statements:
+            response = self.search({"title": "ski"})
+
+        self.assertEqual(len(response.get_json()["listings"]), 6)
+        self.assertEqual(len(few_results_statements), len(many_results_statements))
+
+
+class NearbyListingsTestCase(SearchBaseViewTestCase):
+    def nearby(self, query_string, headers=None):
+        with app.test_client() as client:
+            response = client.get(f"{searches_root}/nearby", query_string=query_string, headers=headers)
+        return response
+
+    def test_nearby_orders_by_distance(self):
+        data = self.nearby({"latitude": 32.25, "longitude": -110.98, "radius": 2000}).get_json()
+
+        ids = [listing["id"] for listing in data["listings"]]
+        self.assertCountEqual(ids[:2], [self.l3_id, self.l4_id])
+        self.assertCountEqual(ids[2:], [self.l1_id, self.l2_id])
+        distances = [listing["distance"] for listing in data["listings"]]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_nearby_filters_by_radius(self):
+        data = self.nearby({"latitude": 38.0, "longitude": -122.28, "radius": 50}).get_json()
+
+        self.assertCountEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l2_id])
+
+    def test_nearby_defaults_to_logged_in_users_location(self):
+        access_token = create_access_token(identity=self.u2_id)
+        data = self.nearby({"radius": 50}, headers={"Authorization": f"Bearer {access_token}"}).get_json()
+
+        self.assertEqual(data["listings"], [])
+
+        data = self.nearby({"radius": 2000}, headers={"Authorization": f"Bearer {access_token}"}).get_json()
+
+        self.assertCountEqual([listing["id"] for listing in data["listings"]], [self.l1_id, self.l2_id])
+
+    def test_nearby_paginates_with_cursor(self):
+        query = {"latitude": 32.25, "longitude": -110.98, "radius": 2000, "limit": 3}
+        first_page = self.nearby(query).get_json()
+        second_page = self.nearby({**query, "cursor": first_page["next_cursor"]}).get_json()
+
+        self.assertEqual(len(first_page["listings"]), 3)
+        self.assertEqual(len(second_page["listings"]), 1)
+        self.assertIsNone(second_page["next_cursor"])
+        self.assertCountEqual([listing["id"] for listing in first_page["listings"] + second_page["listings"]],
+                              [self.l1_id, self.l2_id, self.l3_id, self.l4_id])
+
+    @patch("mnb_backend.searches.search_engine.NEARBY_SCAN_LIMIT", 1)
+    def test_nearby_caps_scanned_locations(self):
+        data = self.nearby({"latitude": 32.25, "longitude": -110.98, "radius": 2000}).get_json()
+
+        self.assertCountEqual([listing["id"] for listing in data["listings"]], [self.l3_id, self.l4_id])
+
+    def test_nearby_rejects_bad_params(self):
+        self.assertEqual(self.nearby({}).status_code, 400)
+        self.assertEqual(self.nearby({"latitude": 38.0}).status_code, 400)
+        self.assertEqual(self.nearby({"latitude": 38.0, "longitude": -122.28, "radius": "far"}).status_code, 400)
+        self.assertEqual(self.nearby({"latitude": 38.0, "longitude": -122.28, "radius": -1}).status_code, 400)
+        for query in [{"latitude": 1000, "longitude": -122.28}, {"latitude": 38.0, "longitude": "inf"},
+                      {"latitude": "nan", "longitude": -122.28},
+                      {"latitude": 38.0, "longitude": -122.28, "radius": "nan"}]:
+            with self.subTest(query=query):
+                self.assertEqual(self.nearby(query).status_code, 400)
+
+    def test_nearby_rejects_mistyped_cursor(self):
+        for cursor in [encode_cursor(["x", 1]), encode_cursor([1.0, "1"]), encode_cursor([1.0])]:
+            with self.subTest(cursor=cursor):
+                response = self.nearby({"latitude": 32.25, "longitude": -110.98, "cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_nearby_rejects_bad_coordinates_of_logged_in_user(self):
+        access_token = create_access_token(identity=self.u2_id)
+        response = self.nearby({"latitude": "abc", "longitude": -122.28},
+                               headers={"Authorization": f"Bearer {access_token}"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "latitude must be a number")
@@ -0,0 +1,287 @@
+"""Blob storage backends.
+
+Code stores blobs under a logical bucket ('images', 'large_images', 'small_images'). STORAGE_BUCKETS maps those to
+real bucket names, and STORAGE_BACKEND picks where they live:
+
+    s3      Amazon S3. The boto3 client is only created on first use, so the app starts without AWS credentials.
+    local   files under STORAGE_LOCAL_ROOT/<bucket>/<key>, served from STORAGE_LOCAL_BASE_URL.
+    memory  a dict in the process, for tests and benchmarks.
+
+Every backend has put(bucket, key, body, content_type=None) -> url, where body is bytes or a file-like object that
+is streamed rather than read into memory where the backend allows it, get(bucket, key, length=None) -> bytes, the
+first length bytes only when length is given, delete(bucket, key), url(bucket, key), head(bucket, key) ->
+{size, content_type} or None, and presign_upload(bucket, key, content_type, max_bytes, expires_in) -> {url, fields}:
+a form POST a client can send the file to directly, restricted to that key, content type and size.
+"""
+
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from mnb_backend.errors import StorageError
+
+
+def read_body(body):
+    """
+    Returns the bytes of body, which is bytes or a file-like object."""
+
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+
+    return body.read()
+
+
+class S3Storage:
+    """ Stores blobs in S3 buckets. """
+
+    def __init__(self, buckets, region, access_key_id=None, secret_access_key=None, max_pool_connections=10,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024):
+        self.buckets = buckets
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.max_pool_connections = max_pool_connections
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self._client = None
+        self._transfer_config = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """ boto3 client, created on first use. boto3 clients are thread safe, so all threads share it. """
+
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config as BotoConfig
+
+                    self._client = boto3.client(
+                        's3',
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        config=BotoConfig(max_pool_connections=self.max_pool_connections),
+                    )
+
+        return self._client
+
+    @property
+    def transfer_config(self):
+        """ Files larger than multipart_threshold are sent as a multipart upload, multipart_chunksize at a time. """
+
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            self._transfer_config = TransferConfig(multipart_threshold=self.multipart_threshold,
+                                                   multipart_chunksize=self.multipart_chunksize, max_concurrency=4)
+
+        return self._transfer_config
+
+    def put(self, bucket, key, body, content_type=None):
+        extra = {'ContentType': content_type} if content_type else {}
+        try:
+            if isinstance(body, (bytes, bytearray)):
+                self.client.put_object(Body=body, Bucket=self.buckets[bucket], Key=key, **extra)
+            else:
+                self.client.upload_fileobj(body, self.buckets[bucket], key, ExtraArgs=extra,
+                                           Config=self.transfer_config)
+        except Exception as error:
+            raise StorageError(f"Failed to upload {bucket}/{key}: {error}") from error
+
+        return self.url(bucket, key)
+
+    def get(self, bucket, key, length=None):
+        byte_range = {} if length is None else {'Range': f"bytes=0-{length - 1}"}
+        try:
+            return self.client.get_object(Bucket=self.buckets[bucket], Key=key, **byte_range)['Body'].read()
+        except Exception as error:
+            raise StorageError(f"Failed to download {bucket}/{key}: {error}") from error
+
+    def delete(self, bucket, key):
+        try:
+            self.client.delete_object(Bucket=self.buckets[bucket], Key=key)
+        except Exception as error:
+            raise StorageError(f"Failed to delete {bucket}/{key}: {error}") from error
+
+    def url(self, bucket, key):
+        return f"https://{self.buckets[bucket]}.s3.{self.region}.amazonaws.com/{key}"
+
+    def head(self, bucket, key):
+        try:
+            response = self.client.head_object(Bucket=self.buckets[bucket], Key=key)
+        except self.client.exceptions.ClientError as error:
+            if error.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise StorageError(f"Failed to read {bucket}/{key}: {error}") from error
+        except Exception as error:
+            raise StorageError(f"Failed to read {bucket}/{key}: {error}") from error
+
+        return {'size': response['ContentLength'], 'content_type': response.get('ContentType')}
+
+    def presign_upload(self, bucket, key, content_type, max_bytes, expires_in):
+        try:
+            return self.client.generate_presigned_post(
+                Bucket=self.buckets[bucket],
+                Key=key,
+                Fields={'Content-Type': content_type},
+                Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_bytes]],
+                ExpiresIn=expires_in,
+            )
+        except Exception as error:
+            raise StorageError(f"Failed to presign upload of {bucket}/{key}: {error}") from error
+
+
+class LocalStorage:
+    """ Stores blobs as files on local disk. """
+
+    def __init__(self, buckets, root, base_url, secret_key=None):
+        self.buckets = buckets
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        self.policy_serializer = URLSafeTimedSerializer(secret_key or 'local-storage', salt='local-upload')
+
+    def path(self, bucket, key):
+        if '/' in key or key in ('', '.', '..'):
+            raise StorageError(f"Invalid key {key!r}")
+
+        return os.path.join(self.root, self.buckets[bucket], key)
+
+    def put(self, bucket, key, body, content_type=None):
+        path = self.path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first so a reader never sees half an image
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, 'wb') as blob_file:
+            if isinstance(body, (bytes, bytearray)):
+                blob_file.write(body)
+            else:
+                shutil.copyfileobj(body, blob_file)
+        os.replace(temporary_path, path)
+
+        return self.url(bucket, key)
+
+    def get(self, bucket, key, length=None):
+        try:
+            with open(self.path(bucket, key), 'rb') as blob_file:
+                return blob_file.read(-1 if length is None else length)
+        except FileNotFoundError as error:
+            raise StorageError(f"No blob {bucket}/{key}") from error
+
+    def delete(self, bucket, key):
+        try:
+            os.remove(self.path(bucket, key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, bucket, key):
+        return f"{self.base_url}/{self.buckets[bucket]}/{key}"
+
+    def head(self, bucket, key):
+        try:
+            return {'size': os.path.getsize(self.path(bucket, key)), 'content_type': None}
+        except FileNotFoundError:
+            return None
+
+    def presign_upload(self, bucket, key, content_type, max_bytes, expires_in):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        policy = self.policy_serializer.dumps({'bucket': bucket, 'key': key, 'content_type': content_type,
+                                               'max_bytes': max_bytes, 'expires_at': expires_at.timestamp()})
+
+        return {'url': f"{self.base_url}/{self.buckets[bucket]}",
+                'fields': {'key': key, 'Content-Type': content_type, 'policy': policy}}
+
+    def load_upload_policy(self, policy):
+        """ Returns the conditions of a policy made by presign_upload, raises StorageError if it's forged or
+        expired. """
+
+        try:
+            conditions = self.policy_serializer.loads(policy)
+        except BadSignature as error:
+            raise StorageError("Invalid upload policy") from error
+
+        if conditions['expires_at'] < datetime.now(timezone.utc).timestamp():
+            raise StorageError("Upload policy expired")
+
+        return conditions
+
+
+class MemoryStorage:
+    """ Stores blobs in a dict of (bucket, key) -> bytes. """
+
+    def __init__(self, buckets, base_url='memory://'):
+        self.buckets = buckets
+        self.base_url = base_url
+        self.blobs = {}
+        self.content_types = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket, key, body, content_type=None):
+        data = read_body(body)
+        with self._lock:
+            self.blobs[(self.buckets[bucket], key)] = data
+            self.content_types[(self.buckets[bucket], key)] = content_type
+
+        return self.url(bucket, key)
+
+    def get(self, bucket, key, length=None):
+        try:
+            return self.blobs[(self.buckets[bucket], key)][:length]
+        except KeyError as error:
+            raise StorageError(f"No blob {bucket}/{key}") from error
+
+    def delete(self, bucket, key):
+        with self._lock:
+            self.blobs.pop((self.buckets[bucket], key), None)
+            self.content_types.pop((self.buckets[bucket], key), None)
+
+    def url(self, bucket, key):
+        return f"{self.base_url}{self.buckets[bucket]}/{key}"
+
+    def head(self, bucket, key):
+        blob_key = (self.buckets[bucket], key)
+        if blob_key not in self.blobs:
+            return None
+
+        return {'size': len(self.blobs[blob_key]), 'content_type': self.content_types.get(blob_key)}
+
+    def presign_upload(self, bucket, key, content_type, max_bytes, expires_in):
+        return {'url': f"{self.base_url}{self.buckets[bucket]}", 'fields': {'key': key, 'Content-Type': content_type}}
+
+
+BACKENDS = {
+    's3': lambda config: S3Storage(config['STORAGE_BUCKETS'], config['STORAGE_S3_REGION'],
+                                   config['AWS_ACCESS_KEY_ID'], config['AWS_SECRET_ACCESS_KEY'],
+                                   config['STORAGE_MAX_POOL_CONNECTIONS'], config['STORAGE_S3_MULTIPART_THRESHOLD'],
+                                   config['STORAGE_S3_MULTIPART_CHUNKSIZE']),
+    'local': lambda config: LocalStorage(config['STORAGE_BUCKETS'], config['STORAGE_LOCAL_ROOT'],
+                                         config['STORAGE_LOCAL_BASE_URL'], config['SECRET_KEY']),
+    'memory': lambda config: MemoryStorage(config['STORAGE_BUCKETS']),
+}
+
+
+def build_storage(config):
+    """
+    Builds the backend named in config['STORAGE_BACKEND']."""
+
+    try:
+        return BACKENDS[config['STORAGE_BACKEND']](config)
+    except KeyError as error:
+        raise ValueError(f"Unknown storage backend {config['STORAGE_BACKEND']!r}") from error
+
+
+def get_storage():
+    """
+    Returns the storage backend of the current app, building it the first time."""
+
+    extensions = current_app.extensions
+    if 'storage' not in extensions:
+        extensions['storage'] = build_storage(current_app.config)
+
+    return extensions['storage']
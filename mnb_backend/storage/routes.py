@@ -0,0 +1,55 @@
+"""Routes for storage blueprint. Only registered with the local backend, S3 serves its own files and takes presigned
+uploads itself."""
+from flask import Blueprint, current_app, request, send_from_directory
+from werkzeug.exceptions import abort
+
+from mnb_backend.errors import StorageError
+from mnb_backend.storage.backends import get_storage
+
+storage_routes = Blueprint('storage_routes', __name__)
+
+
+def get_bucket_name(bucket):
+    """ Returns the logical name of a real bucket name, aborts 404 if it isn't one of ours """
+
+    for name, bucket_name in current_app.config['STORAGE_BUCKETS'].items():
+        if bucket_name == bucket:
+            return name
+
+    abort(404)
+
+
+@storage_routes.get("/<bucket>/<key>")
+def get_blob(bucket, key):
+    """ Serves a blob stored by the local backend """
+
+    get_bucket_name(bucket)
+
+    return send_from_directory(current_app.config['STORAGE_LOCAL_ROOT'], f"{bucket}/{key}")
+
+
+@storage_routes.post("/<bucket>")
+def upload_blob(bucket):
+    """ Takes a form POST made from presign_upload, like S3 does for presigned POSTs. Returns 204 """
+
+    storage = get_storage()
+
+    try:
+        conditions = storage.load_upload_policy(request.form.get('policy', ''))
+    except StorageError as error:
+        abort(403, description=str(error))
+
+    file = request.files.get('file')
+    if (file is None
+            or conditions['bucket'] != get_bucket_name(bucket)
+            or conditions['key'] != request.form.get('key')
+            or conditions['content_type'] != request.form.get('Content-Type')):
+        abort(403, description="Upload doesn't match its policy")
+
+    data = file.read(conditions['max_bytes'] + 1)
+    if not 0 < len(data) <= conditions['max_bytes']:
+        abort(400, description="File size out of range")
+
+    storage.put(conditions['bucket'], conditions['key'], data, content_type=conditions['content_type'])
+
+    return '', 204
@@ -0,0 +1,143 @@
+"""test file for storage backends"""
+import os
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from mnb_backend import app
+from mnb_backend.errors import StorageError
+from mnb_backend.storage.backends import LocalStorage, MemoryStorage, S3Storage, build_storage, get_storage
+
+BUCKETS = {'images': 'test-images'}
+
+
+class LocalStorageTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(BUCKETS, self.root.name, "http://localhost:5001/media/")
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_put_get_delete(self):
+        url = self.storage.put('images', 'abc', BytesIO(b"image data"))
+
+        self.assertEqual(url, "http://localhost:5001/media/test-images/abc")
+        self.assertTrue(os.path.exists(os.path.join(self.root.name, "test-images", "abc")))
+        self.assertEqual(self.storage.get('images', 'abc'), b"image data")
+
+        self.storage.delete('images', 'abc')
+
+        with self.assertRaises(StorageError):
+            self.storage.get('images', 'abc')
+
+    def test_put_streams_files(self):
+        self.storage.put('images', 'abc', BytesIO(b"image data" * 100_000))
+
+        self.assertEqual(self.storage.get('images', 'abc'), b"image data" * 100_000)
+        self.assertEqual(self.storage.get('images', 'abc', length=5), b"image")
+
+    def test_rejects_keys_outside_bucket(self):
+        with self.assertRaises(StorageError):
+            self.storage.put('images', '../abc', b"image data")
+
+
+class MemoryStorageTestCase(TestCase):
+    def test_put_get_delete(self):
+        storage = MemoryStorage(BUCKETS)
+
+        url = storage.put('images', 'abc', b"image data")
+
+        self.assertEqual(url, "memory://test-images/abc")
+        self.assertEqual(storage.get('images', 'abc'), b"image data")
+        self.assertEqual(storage.get('images', 'abc', length=5), b"image")
+
+        storage.delete('images', 'abc')
+
+        self.assertEqual(storage.blobs, {})
+
+
+class S3StorageTestCase(TestCase):
+    def test_client_is_created_on_first_use(self):
+        storage = S3Storage(BUCKETS, 'us-west-1')
+
+        with patch("boto3.client") as mock_client:
+            self.assertEqual(storage.url('images', 'abc'), "https://test-images.s3.us-west-1.amazonaws.com/abc")
+            mock_client.assert_not_called()
+
+            storage.put('images', 'abc', b"image data", content_type="image/jpeg")
+
+        mock_client.return_value.put_object.assert_called_once_with(
+            Body=b"image data", Bucket="test-images", Key="abc", ContentType="image/jpeg")
+
+    def test_files_are_uploaded_with_the_transfer_manager(self):
+        storage = S3Storage(BUCKETS, 'us-west-1', multipart_threshold=5 * 1024 * 1024)
+        body = BytesIO(b"image data")
+
+        with patch("boto3.client") as mock_client:
+            storage.put('images', 'abc', body, content_type="image/jpeg")
+
+        mock_client.return_value.upload_fileobj.assert_called_once_with(
+            body, "test-images", "abc", ExtraArgs={"ContentType": "image/jpeg"}, Config=storage.transfer_config)
+        self.assertEqual(storage.transfer_config.multipart_threshold, 5 * 1024 * 1024)
+        mock_client.return_value.put_object.assert_not_called()
+
+    def test_get_reads_a_range(self):
+        storage = S3Storage(BUCKETS, 'us-west-1')
+
+        with patch("boto3.client") as mock_client:
+            storage.get('images', 'abc', length=16)
+
+        mock_client.return_value.get_object.assert_called_once_with(Bucket="test-images", Key="abc",
+                                                                    Range="bytes=0-15")
+
+    def test_failures_raise_storage_error(self):
+        storage = S3Storage(BUCKETS, 'us-west-1')
+
+        with patch("boto3.client") as mock_client:
+            mock_client.return_value.delete_object.side_effect = ConnectionError("S3 unavailable")
+            with self.assertRaises(StorageError):
+                storage.delete('images', 'abc')
+
+
+class BuildStorageTestCase(TestCase):
+    def test_app_uses_configured_backend(self):
+        self.assertIsInstance(get_storage(), MemoryStorage)
+
+    def test_build_storage_rejects_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            build_storage({**app.config, 'STORAGE_BACKEND': 'floppy'})
+
+
+class LocalPresignedUploadTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(BUCKETS, self.root.name, "http://localhost:5001/media", "secret")
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_policy_round_trip(self):
+        upload = self.storage.presign_upload('images', 'abc', 'image/jpeg', 100, 60)
+
+        conditions = self.storage.load_upload_policy(upload["fields"]["policy"])
+
+        self.assertEqual(upload["url"], "http://localhost:5001/media/test-images")
+        self.assertEqual((conditions["key"], conditions["content_type"], conditions["max_bytes"]),
+                         ("abc", "image/jpeg", 100))
+
+    def test_policy_rejects_forged_and_expired(self):
+        upload = self.storage.presign_upload('images', 'abc', 'image/jpeg', 100, -1)
+
+        with self.assertRaises(StorageError):
+            self.storage.load_upload_policy(upload["fields"]["policy"])
+        with self.assertRaises(StorageError):
+            self.storage.load_upload_policy(upload["fields"]["policy"] + "x")
+
+    def test_head(self):
+        self.assertIsNone(self.storage.head('images', 'abc'))
+
+        self.storage.put('images', 'abc', b"image data")
+
+        self.assertEqual(self.storage.head('images', 'abc'), {'size': 10, 'content_type': None})
@@ -1,12 +1,25 @@
 """test setup helpers"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
 from mnb_backend.addresses.models import Address, Location, City, State, ZipCode
+from mnb_backend.cache import get_response_cache
 from mnb_backend.database import db
+from mnb_backend.geocoding.geocoder import clear_geocode_cache
+from mnb_backend.geocoding.models import GeocodeCache
+from mnb_backend.images.models import ImageBlob
 from mnb_backend.listings.models import Listing
 from mnb_backend.users.models import User
 from mnb_backend.user_images.models import UserImage
 from mnb_backend.listing_images.models import ListingImage
-from mnb_backend.reservations.models import Reservation
+from mnb_backend.reservations.models import ListingCalendar, Reservation
 from mnb_backend.messages.models import Message
+from mnb_backend.uploads.models import UploadIntent
+from mnb_backend.workers.models import Job
+
+# starts with the JPEG magic bytes, so uploads accept it as an image
+TEST_JPEG_BYTES = b"\xff\xd8\xff\xe0test image data"
 
 
 def delete_all_tables(self):
@@ -15,7 +28,9 @@ def delete_all_tables(self):
 
     # This order is important
     Message.query.delete()
+    UploadIntent.query.delete()
     Reservation.query.delete()
+    ListingCalendar.query.delete()
     ListingImage.query.delete()
     Listing.query.delete()
     Location.query.delete()
@@ -24,9 +39,28 @@ def delete_all_tables(self):
     State.query.delete()
     City.query.delete()
     UserImage.query.delete()
+    ImageBlob.query.delete()
     User.query.delete()
+    GeocodeCache.query.delete()
+    Job.query.delete()
 
     db.session.commit()  # Commit after deletion
+    clear_geocode_cache()
+    get_response_cache().clear()
+
+
+@contextmanager
+def count_queries():
+    """
+    Records every SQL statement sent to the database inside the block. Yields the list of statements."""
 
+    statements = []
 
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
 
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
@@ -0,0 +1,98 @@
+"""test file for the response cache"""
+from unittest import TestCase
+
+from mnb_backend.cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=2, ttl=10, stale_ttl=5, clock=self.clock)
+        self.loads = []
+
+    def loader(self, value, tags=()):
+        def load():
+            self.loads.append(value)
+            return value, list(tags)
+        return load
+
+    def test_hit_after_miss(self):
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('a')), 'a')
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('b')), 'a')
+
+        self.assertEqual(self.loads, ['a'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_stale_entry_is_reloaded_and_expired_entry_is_a_miss(self):
+        self.cache.get(('listings', 1), self.loader('a'))
+
+        self.clock.now = 12
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('b')), 'b')
+
+        self.clock.now = 30
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('c')), 'c')
+        self.assertEqual(self.loads, ['a', 'b', 'c'])
+
+    def test_stale_entry_is_served_while_it_reloads(self):
+        self.cache.get(('listings', 1), self.loader('a'))
+        self.clock.now = 12
+
+        def reload():
+            # a concurrent request arriving while this one reloads gets the stale copy
+            self.assertEqual(self.cache.get(('listings', 1), self.loader('unused')), 'a')
+            return 'b', []
+
+        self.assertEqual(self.cache.get(('listings', 1), reload), 'b')
+        self.assertEqual(self.cache.stale_hits, 1)
+        self.assertEqual(self.loads, ['a'])
+
+    def test_invalidate_drops_entries_tagged_with_a_resource(self):
+        self.cache.get(('listings', 1), self.loader('listing', [('users', 3)]))
+        self.cache.get(('users', 3), self.loader('user'))
+
+        self.cache.invalidate(('users', 3))
+
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('listing 2')), 'listing 2')
+        self.assertEqual(self.cache.get(('users', 3), self.loader('user 2')), 'user 2')
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_load_racing_an_invalidation_isnt_stored(self):
+        def load():
+            self.cache.invalidate(('listings', 1))
+            return 'read before the write', []
+
+        self.assertEqual(self.cache.get(('listings', 1), load), 'read before the write')
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('b')), 'b')
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.get(('listings', 1), self.loader('a'))
+        self.cache.get(('listings', 2), self.loader('b'))
+        self.cache.get(('listings', 1), self.loader('unused'))
+        self.cache.get(('listings', 3), self.loader('c'))
+
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('unused')), 'a')
+        self.assertEqual(self.cache.get(('listings', 2), self.loader('b again')), 'b again')
+        self.assertEqual(self.cache.evictions, 2)
+
+    def test_errors_arent_cached(self):
+        def fail():
+            raise LookupError
+
+        with self.assertRaises(LookupError):
+            self.cache.get(('listings', 1), fail)
+        self.assertEqual(self.cache.get(('listings', 1), self.loader('a')), 'a')
+
+    def test_disabled_cache_always_loads(self):
+        cache = ResponseCache(max_entries=0, ttl=10, stale_ttl=5)
+        cache.get(('listings', 1), self.loader('a'))
+        cache.get(('listings', 1), self.loader('b'))
+
+        self.assertEqual(self.loads, ['a', 'b'])
@@ -0,0 +1,93 @@
+"""test file for the database connection pool"""
+import sqlite3
+from unittest import TestCase
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+
+from mnb_backend.config import Config, ProductionConfig
+from mnb_backend.database import InstrumentedNullPool, InstrumentedQueuePool, get_engine_options
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+def make_config(config_class=Config, **settings):
+    config = {name: getattr(config_class, name) for name in dir(config_class) if name.isupper()}
+    config.update(settings)
+
+    return config
+
+
+class EngineOptionsTestCase(TestCase):
+    def test_queue_pool_takes_the_pool_settings(self):
+        options = get_engine_options(make_config(ProductionConfig, DATABASE_POOL='queue', DATABASE_POOL_SIZE=16))
+
+        self.assertIs(options["poolclass"], InstrumentedQueuePool)
+        self.assertEqual(options["pool_size"], 16)
+        self.assertEqual(options["pool_timeout"], ProductionConfig.DATABASE_POOL_TIMEOUT)
+
+    def test_pgbouncer_opens_a_connection_per_checkout(self):
+        options = get_engine_options(make_config(DATABASE_POOL='pgbouncer',
+                                                 SQLALCHEMY_DATABASE_URI='postgresql:///mnb'))
+
+        self.assertTrue(issubclass(options["poolclass"], NullPool))
+        self.assertNotIn("pool_size", options)
+        self.assertNotIn("connect_args", options)
+
+    def test_pgbouncer_turns_off_psycopg_prepared_statements(self):
+        options = get_engine_options(make_config(DATABASE_POOL='pgbouncer',
+                                                 SQLALCHEMY_DATABASE_URI='postgresql+psycopg:///mnb'))
+
+        self.assertEqual(options["connect_args"], {"prepare_threshold": None})
+
+    def test_unknown_pool_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_engine_options(make_config(DATABASE_POOL='static'))
+
+
+class InstrumentedPoolTestCase(TestCase):
+    def test_counts_checkouts_and_checkins(self):
+        pool = InstrumentedQueuePool(connect, pool_size=2, max_overflow=0)
+
+        first = pool.connect()
+        second = pool.connect()
+        first.close()
+        stats = pool.stats.as_dict()
+
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["checked_out"], 1)
+        self.assertEqual(stats["peak_checked_out"], 2)
+        self.assertEqual(stats["connects"], 2)
+        self.assertIsNotNone(stats["wait_ms_mean"])
+        second.close()
+
+    def test_counts_timeouts_and_their_wait(self):
+        pool = InstrumentedQueuePool(connect, pool_size=1, max_overflow=0, timeout=0.05)
+
+        connection = pool.connect()
+        with self.assertRaises(exc.TimeoutError):
+            pool.connect()
+        stats = pool.stats.as_dict()
+
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["wait_ms_max"], 50)
+        connection.close()
+
+    def test_null_pool_connects_on_every_checkout(self):
+        pool = InstrumentedNullPool(connect)
+
+        for _ in range(3):
+            pool.connect().close()
+        stats = pool.stats.as_dict()
+
+        self.assertEqual(stats["connects"], 3)
+        self.assertEqual(stats["checked_out"], 0)
+
+    def test_recreated_pool_is_instrumented(self):
+        pool = InstrumentedQueuePool(connect, pool_size=1, max_overflow=0).recreate()
+
+        pool.connect().close()
+
+        self.assertEqual(pool.stats.as_dict()["checkouts"], 1)
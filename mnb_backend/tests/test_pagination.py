@@ -0,0 +1,38 @@
+"""test file for keyset pagination cursors"""
+from datetime import datetime
+from unittest import TestCase
+
+from sqlalchemy import Float, cast, literal
+from werkzeug.exceptions import BadRequest
+
+from mnb_backend.messages.models import Message
+from mnb_backend.pagination import decode_cursor, encode_cursor, load_cursor_values
+
+
+class LoadCursorValuesTestCase(TestCase):
+    def test_round_trips_sort_keys(self):
+        sort_columns = [Message.timestamp, Message.message_uid]
+        sort_key = [datetime(2024, 1, 2, 3, 4, 5), 7]
+
+        self.assertEqual(load_cursor_values(sort_columns, decode_cursor(encode_cursor(sort_key))), sort_key)
+
+    def test_numbers_load_as_floats(self):
+        rank = cast(literal(1), Float(53))
+
+        self.assertEqual(load_cursor_values([rank, Message.message_uid], [1, 3]), [1.0, 3])
+
+    def test_values_of_the_wrong_type_are_rejected(self):
+        rank = cast(literal(1), Float(53))
+        for sort_columns, cursor_values in [
+            ([Message.message_uid], ["x"]),
+            ([Message.message_uid], [1.5]),
+            ([Message.message_uid], [True]),
+            ([Message.message_uid], [None]),
+            ([Message.message_uid], [1, 2]),
+            ([Message.timestamp, Message.message_uid], [3, 1]),
+            ([Message.timestamp, Message.message_uid], ["yesterday", 1]),
+            ([rank, Message.message_uid], ["1.0", 1]),
+            ([rank, Message.message_uid], [float("nan"), 1]),
+        ]:
+            with self.subTest(cursor_values=cursor_values), self.assertRaises(BadRequest):
+                load_cursor_values(sort_columns, cursor_values)
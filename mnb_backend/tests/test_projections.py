@@ -0,0 +1,80 @@
+"""test file for ?fields= and ?embed= projections"""
+from unittest import TestCase
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from mnb_backend.addresses.models import Address, City, Location, State, ZipCode
+from mnb_backend.enums import ListingStatusEnum, LocationStatusEnum, RackActivityTypeEnum, RackMountTypeEnum, \
+    UserStatusEnums
+from mnb_backend.listings.models import Listing
+from mnb_backend.projections import make_projection, parse_paths
+from mnb_backend.users.models import User
+
+
+def make_listing():
+    address = Address(id=3, user_id=2, street_address="1 Main St", apt_number=None,
+                      city=City(id=4, city_name="Hercules", state=State(id=5, state_abbreviation="CA")),
+                      zipcode=ZipCode(id=6, code="94547"),
+                      location=Location(id=7, point_x=-122.2, point_y=38.0, status=LocationStatusEnum.GEOCODED))
+    owner = User(id=2, status=UserStatusEnums.ACTIVE, email="ua@email.com", firstname="ua", lastname="ub",
+                 about_me="", is_admin=False, preferred_trade_location=None, user_rating=5, profile_image=None,
+                 address=address)
+
+    return Listing(id=1, owner=owner, owner_id=2, primary_image_url=None, title="Roof rack",
+                   mount_type=RackMountTypeEnum.ROOF, activity_type=RackActivityTypeEnum.BICYCLE, rate_price=40,
+                   status=ListingStatusEnum.AVAILABLE)
+
+
+def compile_select(projection):
+    stmt = select(projection.model).options(*projection.loader_options())
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class ParsePathsTestCase(TestCase):
+    def test_nests_dotted_paths(self):
+        self.assertEqual(parse_paths("id, owner.firstname,owner.address.city,"),
+                         {"id": {}, "owner": {"firstname": {}, "address": {"city": {}}}})
+
+
+class ProjectionTestCase(TestCase):
+    def test_without_parameters_serializes_whole(self):
+        listing = make_listing()
+
+        self.assertEqual(make_projection(Listing).serialize(listing), listing.serialize())
+
+    def test_fields_keep_only_their_keys(self):
+        projection = make_projection(Listing, "id,title,owner.firstname")
+
+        self.assertEqual(projection.serialize(make_listing()),
+                         {"id": 1, "title": "Roof rack", "owner": {"firstname": "ua"}})
+
+    def test_embed_limits_depth(self):
+        serialized = make_projection(Listing, None, "owner").serialize(make_listing())
+
+        self.assertEqual(serialized["owner"]["firstname"], "ua")
+        self.assertNotIn("address", serialized["owner"])
+        self.assertNotIn("owner", make_projection(Listing, None, "").serialize(make_listing()))
+
+    def test_version_only_covers_embedded_rows(self):
+        listing = make_listing()
+
+        self.assertEqual(len(make_projection(Listing).version(listing)), 3)
+        self.assertEqual(len(make_projection(Listing, None, "").version(listing)), 1)
+
+    def test_loads_only_what_it_serializes(self):
+        narrowed = compile_select(make_projection(Listing, "id,title,owner.firstname"))
+        whole = compile_select(make_projection(Listing))
+
+        self.assertNotIn("addresses", narrowed)
+        self.assertNotIn("listings.rate_price", narrowed)
+        self.assertIn("users_1.firstname", narrowed)
+        self.assertNotIn("users_1.email", narrowed)
+        self.assertIn("addresses", whole)
+        self.assertNotIn("JOIN users", compile_select(make_projection(Listing, None, "")))
+
+    def test_unknown_keys_are_rejected(self):
+        for fields, embed in [("id,password", None), ("title.length", None), (None, "title"),
+                              ("owner.address.location.point_x", None)]:
+            with self.subTest(fields=fields, embed=embed), self.assertRaises(ValueError):
+                make_projection(Listing, fields, embed)
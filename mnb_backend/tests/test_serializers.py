@@ -0,0 +1,83 @@
+"""test file for the compiled serializers and the orjson JSON provider"""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date as werkzeug_http_date
+
+from mnb_backend.addresses.models import City, State
+from mnb_backend.enums import ReservationStatusEnum
+from mnb_backend.json_provider import OrjsonProvider
+from mnb_backend.reservations.models import Reservation
+from mnb_backend.serializers import http_date
+
+
+class HttpDateTestCase(TestCase):
+    def test_matches_werkzeug(self):
+        for value in [
+            datetime(2024, 1, 2, 3, 4, 5),
+            datetime(2024, 2, 29, 23, 59, 59, 999999),
+            datetime(2023, 12, 31, 20, 0, tzinfo=timezone(timedelta(hours=-8))),
+            date(2024, 7, 4),
+        ]:
+            self.assertEqual(http_date(value), werkzeug_http_date(value))
+
+
+class SerializerTestCase(TestCase):
+    def test_converts_columns_by_type(self):
+        reservation = Reservation(
+            id=1,
+            start_date=datetime(2024, 1, 2, 12),
+            end_date=datetime(2024, 1, 5, 12),
+            duration=timedelta(days=3),
+            status=ReservationStatusEnum.ACCEPTED,
+            total=300,
+        )
+
+        serialized = reservation.serialize()
+
+        self.assertEqual(serialized["start_date"], "Tue, 02 Jan 2024 12:00:00 GMT")
+        self.assertEqual(serialized["duration"], "3 days, 0:00:00")
+        self.assertEqual(serialized["status"], "Accepted")
+        self.assertEqual(serialized["total"], 300)
+        self.assertIsNone(serialized["reservation_date_created"])
+        self.assertIsNone(serialized["listing"])
+
+    def test_reads_loaded_rows_from_their_dict(self):
+        city = City(id=1, city_name="Hercules", state=State(id=1, state_abbreviation="CA", state_name="California"))
+        partial = City(id=2, state=State(id=2, state_abbreviation="AZ", state_name="Arizona"))
+
+        self.assertEqual(city.serialize(), {"id": 1, "city_name": "Hercules", "state": "CA"})
+        self.assertEqual(partial.serialize(), {"id": 2, "city_name": None, "state": "AZ"})
+
+    def test_serialize_is_compiled_once(self):
+        Reservation(id=1).serialize()
+
+        self.assertEqual(Reservation.serialize.__qualname__, "Reservation.serialize")
+        self.assertIs(Reservation.serialize, Reservation.serialize)
+
+
+class OrjsonProviderTestCase(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = OrjsonProvider(self.app)
+        self.default_app = Flask(__name__)
+
+    def test_same_output_as_the_default_provider(self):
+        payload = {"b": [1, 2.5, None, True], "a": {"when": datetime(2024, 1, 2, 3, 4, 5), "day": date(2024, 1, 2)},
+                   "total": Decimal("10.50")}
+
+        with self.app.app_context():
+            body = self.app.json.response(payload).get_data()
+        with self.default_app.app_context():
+            expected = DefaultJSONProvider(self.default_app).response(payload).get_data()
+
+        self.assertEqual(body, expected)
+
+    def test_encodes_enums_and_loads(self):
+        with self.app.app_context():
+            body = self.app.json.dumps({"status": ReservationStatusEnum.PENDING})
+
+            self.assertEqual(self.app.json.loads(body), {"status": "Pending"})
@@ -0,0 +1,108 @@
+"""Ingesting files uploaded through the API.
+
+An uploaded file is read once, CHUNK_BYTES at a time, into a SpooledTemporaryFile: up to UPLOAD_SPOOL_BYTES stay in
+memory and the rest rolls over to a temporary file on disk, so memory per file is bounded however large the upload.
+The same pass enforces UPLOAD_MAX_IMAGE_BYTES, sniffs the type from the file's magic bytes (the content_type the
+client sent is not trusted) and computes the sha256 of the contents.
+
+MAX_CONTENT_LENGTH caps the whole request before any of it is parsed.
+"""
+
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+from flask import current_app
+
+from mnb_backend.errors import UploadError
+
+CHUNK_BYTES = 64 * 1024
+
+ALLOWED_IMAGE_CONTENT_TYPES = ('image/jpeg', 'image/png')
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+)
+# bytes sniff_image_type needs from the start of a file
+IMAGE_SIGNATURE_BYTES = max(len(signature) for signature, content_type in IMAGE_SIGNATURES)
+
+
+def sniff_image_type(header):
+    """
+    Returns the content type of the image starting with header, or None if it isn't a supported image."""
+
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+
+    return None
+
+
+class IngestedFile:
+    """ An uploaded file spooled to memory or disk, positioned at its start.
+
+    content_type is sniffed from the contents, sha256 is the hex digest of the contents. """
+
+    def __init__(self, filename, stream, content_type, size, sha256):
+        self.filename = filename
+        self.stream = stream
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def seek(self, offset, whence=0):
+        return self.stream.seek(offset, whence)
+
+    def tell(self):
+        return self.stream.tell()
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"< IngestedFile {self.filename}, {self.content_type}, {self.size} bytes, sha256 {self.sha256} >"
+
+
+def ingest_upload(file, allowed_content_types=ALLOWED_IMAGE_CONTENT_TYPES):
+    """
+    Reads an uploaded file (a werkzeug FileStorage or any file-like object) into an IngestedFile.
+
+    Raises UploadError with status 415 if it isn't one of allowed_content_types, 413 if it's larger than
+    UPLOAD_MAX_IMAGE_BYTES. The caller closes the IngestedFile when done with it."""
+
+    max_bytes = current_app.config['UPLOAD_MAX_IMAGE_BYTES']
+    stream = getattr(file, 'stream', file)
+    spooled = SpooledTemporaryFile(max_size=current_app.config['UPLOAD_SPOOL_BYTES'])
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        chunk = stream.read(CHUNK_BYTES)
+        content_type = sniff_image_type(chunk)
+        if content_type not in allowed_content_types:
+            raise UploadError(f"File must be one of {', '.join(allowed_content_types)}", 415)
+
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadError(f"File is larger than {max_bytes} bytes", 413)
+
+            digest.update(chunk)
+            spooled.write(chunk)
+            chunk = stream.read(CHUNK_BYTES)
+    except Exception:
+        spooled.close()
+        raise
+
+    spooled.seek(0)
+
+    return IngestedFile(getattr(file, 'filename', None), spooled, content_type, size, digest.hexdigest())
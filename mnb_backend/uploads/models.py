@@ -0,0 +1,94 @@
+"""Model for UploadIntent"""
+from datetime import datetime
+
+from sqlalchemy import Enum as SQLAlchemyEnum
+
+from mnb_backend.database import db
+from mnb_backend.enums import UploadIntentStatusEnum, UploadPurposeEnum
+from mnb_backend.serializers import Serializer
+
+
+# region UploadIntent
+class UploadIntent(db.Model):
+    """ A presigned upload handed to a client, waiting for the client to confirm it uploaded the file. """
+
+    __tablename__ = 'upload_intents'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # set for listing images
+    listing_id = db.Column(
+        db.Integer,
+        db.ForeignKey('listings.id', ondelete="CASCADE"),
+        nullable=True,
+    )
+
+    purpose = db.Column(
+        SQLAlchemyEnum(UploadPurposeEnum, name='upload_purpose_enum'),
+        nullable=False,
+    )
+
+    status = db.Column(
+        SQLAlchemyEnum(UploadIntentStatusEnum, name='upload_intent_status_enum'),
+        nullable=False,
+        default=UploadIntentStatusEnum.PENDING,
+    )
+
+    # logical storage bucket and key the client uploads to
+    bucket = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    key = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+    content_type = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    max_bytes = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    expires_at = db.Column(
+        db.DateTime,
+        nullable=False,
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self):
+        return f"< UploadIntent #{self.id}, Purpose: {self.purpose}, Key: {self.key}, Status: {self.status} >"
+
+    serialize = Serializer(
+        'id',
+        'purpose',
+        'status',
+        'listing_id',
+        'key',
+        'content_type',
+        'max_bytes',
+        'expires_at',
+    )
+
+# endregion
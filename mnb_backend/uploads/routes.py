@@ -0,0 +1,169 @@
+"""Routes for uploads blueprint.
+
+Images are uploaded straight to storage instead of through the API:
+    1) POST an upload intent, get back a presigned form POST restricted to one key, content type and size
+    2) the client sends the file to upload.url with upload.fields
+    3) POST /<upload_intent_id>/confirm, before the intent expires. The API checks the file landed and is the image it
+       was declared as, and registers it
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import select
+from werkzeug.exceptions import abort
+
+from mnb_backend.api_helpers import db_add_listing_images, db_add_user_image
+from mnb_backend.database import db
+from mnb_backend.enums import UploadIntentStatusEnum, UploadPurposeEnum
+from mnb_backend.errors import StorageError
+from mnb_backend.listings.models import Listing
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.uploads.ingest import ALLOWED_IMAGE_CONTENT_TYPES, IMAGE_SIGNATURE_BYTES, sniff_image_type
+from mnb_backend.uploads.models import UploadIntent
+
+uploads_routes = Blueprint('uploads_routes', __name__)
+
+
+def create_upload_intent(user_id, purpose, listing_id=None):
+    """ Creates an upload intent for the content_type in the request body and presigns its upload.
+    Returns (upload_intent, upload) """
+
+    content_type = (request.get_json(silent=True) or {}).get('content_type')
+    if content_type not in ALLOWED_IMAGE_CONTENT_TYPES:
+        abort(400, description=f"content_type must be one of {', '.join(ALLOWED_IMAGE_CONTENT_TYPES)}")
+
+    key = f"{uuid.uuid4()}"
+    max_bytes = current_app.config['UPLOAD_MAX_IMAGE_BYTES']
+    expires_in = current_app.config['UPLOAD_INTENT_EXPIRES_IN']
+
+    try:
+        upload = get_storage().presign_upload('images', key, content_type, max_bytes, expires_in)
+    except StorageError as error:
+        print("Error", error)
+        abort(502, description="Failed to create upload")
+
+    upload_intent = UploadIntent(
+        user_id=user_id,
+        listing_id=listing_id,
+        purpose=purpose,
+        bucket='images',
+        key=key,
+        content_type=content_type,
+        max_bytes=max_bytes,
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+    db.session.add(upload_intent)
+    db.session.commit()
+
+    return upload_intent, upload
+
+
+# region Upload Endpoints Start
+
+@uploads_routes.post("/listing_images/<int:listing_id>")
+@jwt_required()
+def create_listing_image_upload(listing_id):
+    """ Starts a direct upload of a listing image. Takes JSON like {content_type}
+
+    Returns JSON like:
+        {upload_intent: {id, purpose, status, listing_id, key, content_type, max_bytes, expires_at},
+        upload: {url, fields}}
+    """
+
+    current_user_id = get_jwt_identity()
+    listing = Listing.query.get_or_404(listing_id)
+
+    if current_user_id != listing.owner_id:
+        abort(401, "Not authorized")
+
+    upload_intent, upload = create_upload_intent(current_user_id, UploadPurposeEnum.LISTING_IMAGE, listing_id)
+
+    return jsonify(upload_intent=upload_intent.serialize(), upload=upload), 201
+
+
+@uploads_routes.post("/user_images")
+@jwt_required()
+def create_user_image_upload():
+    """ Starts a direct upload of the current user's profile image. Takes JSON like {content_type}
+
+    Returns JSON like:
+        {upload_intent: {id, purpose, status, listing_id, key, content_type, max_bytes, expires_at},
+        upload: {url, fields}}
+    """
+
+    current_user_id = get_jwt_identity()
+
+    upload_intent, upload = create_upload_intent(current_user_id, UploadPurposeEnum.USER_IMAGE)
+
+    return jsonify(upload_intent=upload_intent.serialize(), upload=upload), 201
+
+
+@uploads_routes.post("/<int:upload_intent_id>/confirm")
+@jwt_required()
+def confirm_upload(upload_intent_id):
+    """ Registers a file the client uploaded directly as a listing image or user image.
+
+    Returns JSON like:
+        {listing_image: {id, listing_id, image_url}} or {user_image: {id, image_url, user_id}}
+    """
+
+    current_user_id = get_jwt_identity()
+
+    # locked so two confirms of the same upload can't both register it
+    upload_intent = db.session.execute(
+        select(UploadIntent).where(UploadIntent.id == upload_intent_id).with_for_update()
+    ).scalar_one_or_none()
+
+    if upload_intent is None:
+        abort(404)
+
+    if upload_intent.user_id != current_user_id:
+        abort(401, "Not authorized")
+
+    if upload_intent.status == UploadIntentStatusEnum.CONFIRMED:
+        abort(409, description="Upload already confirmed")
+
+    # the listing may have changed hands since the upload started
+    if upload_intent.purpose == UploadPurposeEnum.LISTING_IMAGE and \
+            db.session.get(Listing, upload_intent.listing_id).owner_id != current_user_id:
+        abort(401, "Not authorized")
+
+    storage = get_storage()
+
+    if upload_intent.expires_at < datetime.utcnow():
+        storage.delete(upload_intent.bucket, upload_intent.key)
+        abort(410, description="Upload expired")
+
+    try:
+        blob = storage.head(upload_intent.bucket, upload_intent.key)
+        header = storage.get(upload_intent.bucket, upload_intent.key, length=IMAGE_SIGNATURE_BYTES) \
+            if blob is not None else None
+    except StorageError as error:
+        print("Error", error)
+        abort(502, description="Failed to check upload")
+
+    if blob is None:
+        abort(400, description="File hasn't been uploaded")
+
+    # the content type the client declared is checked against the file's magic bytes, some backends don't keep it
+    if blob['size'] > upload_intent.max_bytes or \
+            blob['content_type'] not in (None, upload_intent.content_type) or \
+            sniff_image_type(header) != upload_intent.content_type:
+        storage.delete(upload_intent.bucket, upload_intent.key)
+        abort(400, description="Uploaded file doesn't match the upload")
+
+    image_url = storage.url(upload_intent.bucket, upload_intent.key)
+
+    # saved by the commit that adds the image
+    upload_intent.status = UploadIntentStatusEnum.CONFIRMED
+
+    if upload_intent.purpose == UploadPurposeEnum.LISTING_IMAGE:
+        [listing_image] = db_add_listing_images(upload_intent.listing_id, [image_url])
+        return jsonify(listing_image=listing_image.serialize()), 201
+
+    user_image = db_add_user_image(current_user_id, image_url)
+    return jsonify(user_image=user_image.serialize()), 201
+
+# endregion
@@ -0,0 +1,62 @@
+"""test file for upload ingestion"""
+import hashlib
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from werkzeug.datastructures import FileStorage
+
+from mnb_backend import app
+from mnb_backend.errors import UploadError
+from mnb_backend.test_setup_helpers import TEST_JPEG_BYTES
+from mnb_backend.uploads.ingest import ingest_upload, sniff_image_type
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\ntest image data"
+
+
+class SniffImageTypeTestCase(TestCase):
+    def test_sniffs_magic_bytes(self):
+        self.assertEqual(sniff_image_type(TEST_JPEG_BYTES), "image/jpeg")
+        self.assertEqual(sniff_image_type(PNG_BYTES), "image/png")
+        self.assertIsNone(sniff_image_type(b"%PDF-1.4"))
+        self.assertIsNone(sniff_image_type(b""))
+
+
+class IngestUploadTestCase(TestCase):
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_ingest_upload(self):
+        file = FileStorage(BytesIO(TEST_JPEG_BYTES), filename="a.png", content_type="image/png")
+
+        with ingest_upload(file) as image_file:
+            self.assertEqual((image_file.filename, image_file.content_type, image_file.size),
+                             ("a.png", "image/jpeg", len(TEST_JPEG_BYTES)))
+            self.assertEqual(image_file.sha256, hashlib.sha256(TEST_JPEG_BYTES).hexdigest())
+            self.assertEqual(image_file.read(), TEST_JPEG_BYTES)
+
+    def test_large_uploads_spool_to_disk(self):
+        data = TEST_JPEG_BYTES + b"\0" * 200_000
+
+        with patch.dict(app.config, UPLOAD_SPOOL_BYTES=100_000), ingest_upload(BytesIO(data)) as image_file:
+            self.assertTrue(image_file.stream._rolled)
+            self.assertEqual(image_file.read(), data)
+
+        with ingest_upload(BytesIO(data)) as image_file:
+            self.assertFalse(image_file.stream._rolled)
+
+    def test_rejects_files_that_arent_images(self):
+        with self.assertRaises(UploadError) as context:
+            ingest_upload(FileStorage(BytesIO(b"%PDF-1.4"), filename="a.jpg", content_type="image/jpeg"))
+
+        self.assertEqual(context.exception.status_code, 415)
+
+    def test_rejects_files_over_the_limit(self):
+        with patch.dict(app.config, UPLOAD_MAX_IMAGE_BYTES=100), self.assertRaises(UploadError) as context:
+            ingest_upload(BytesIO(TEST_JPEG_BYTES + b"\0" * 200_000))
+
+        self.assertEqual(context.exception.status_code, 413)
@@ -0,0 +1,149 @@
+"""test file for upload routes"""
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from mnb_backend import app
+from mnb_backend.database import db
+from mnb_backend.enums import UploadIntentStatusEnum, UserStatusEnums
+from mnb_backend.listing_images.tests.setup import ListingImagesBaseViewTestCase
+from mnb_backend.listings.models import Listing
+from mnb_backend.storage.backends import get_storage
+from mnb_backend.test_setup_helpers import TEST_JPEG_BYTES
+from mnb_backend.uploads.models import UploadIntent
+from mnb_backend.users.models import User
+
+db.drop_all()
+db.create_all()
+
+uploads_root = "/api/uploads"
+
+TEST_PNG_BYTES = b"\x89PNG\r\n\x1a\ntest image data"
+
+
+class UploadIntentTestCase(ListingImagesBaseViewTestCase):
+    def post(self, url, user_id, json=None):
+        access_token = create_access_token(identity=user_id)
+        with app.test_client() as client:
+            return client.post(url, headers={"Authorization": f"Bearer {access_token}"}, json=json)
+
+    def upload(self, upload, data=None, content_type=None):
+        """ Stands in for the client sending the file to storage with the presigned form """
+
+        fields = upload["fields"]
+        if data is None:
+            data = TEST_PNG_BYTES if fields["Content-Type"] == "image/png" else TEST_JPEG_BYTES
+        get_storage().put('images', fields["key"], data, content_type=content_type or fields["Content-Type"])
+
+    def test_listing_image_upload_flow(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+
+        self.assertEqual(response.status_code, 201)
+        upload_intent = response.json["upload_intent"]
+        self.assertEqual(upload_intent["status"], UploadIntentStatusEnum.PENDING.value)
+        self.assertEqual(response.json["upload"]["fields"]["key"], upload_intent["key"])
+
+        self.upload(response.json["upload"])
+        response = self.post(f"{uploads_root}/{upload_intent['id']}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json["listing_image"]["image_url"].endswith(upload_intent["key"]))
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 1)
+        self.assertEqual(db.session.get(UploadIntent, upload_intent["id"]).status, UploadIntentStatusEnum.CONFIRMED)
+
+    def test_user_image_upload_flow(self):
+        response = self.post(f"{uploads_root}/user_images", self.u1_id, json={"content_type": "image/png"})
+        self.upload(response.json["upload"])
+
+        response = self.post(f"{uploads_root}/{response.json['upload_intent']['id']}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(db.session.get(User, self.u1_id).profile_image.id, response.json["user_image"]["id"])
+
+    def test_upload_intent_rejects_bad_content_type(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "application/pdf"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_upload_intent_only_for_listing_owner(self):
+        u2 = User.signup("u2@email.com", "password", "u2firstname", "u2lastname", "I am a test user",
+                         UserStatusEnums.ACTIVE)
+        db.session.commit()
+
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", u2.id,
+                             json={"content_type": "image/jpeg"})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_confirm_before_upload(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+
+        response = self.post(f"{uploads_root}/{response.json['upload_intent']['id']}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+    def test_confirm_rejects_mismatched_file(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+        upload = response.json["upload"]
+        self.upload(upload, content_type="text/html")
+
+        response = self.post(f"{uploads_root}/{response.json['upload_intent']['id']}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(get_storage().head('images', upload["fields"]["key"]))
+
+    def test_confirm_rejects_file_that_isnt_the_declared_image(self):
+        for data in [b"<html>not an image</html>", TEST_PNG_BYTES]:
+            with self.subTest(data=data):
+                response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                                     json={"content_type": "image/jpeg"})
+                upload = response.json["upload"]
+                self.upload(upload, data=data)
+
+                response = self.post(f"{uploads_root}/{response.json['upload_intent']['id']}/confirm", self.u1_id)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIsNone(get_storage().head('images', upload["fields"]["key"]))
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+    def test_confirm_expired_upload(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+        upload_intent_id = response.json["upload_intent"]["id"]
+        self.upload(response.json["upload"])
+        db.session.get(UploadIntent, upload_intent_id).expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        response = self.post(f"{uploads_root}/{upload_intent_id}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+    def test_confirm_after_listing_changed_hands(self):
+        u2 = User.signup("u2@email.com", "password", "u2firstname", "u2lastname", "I am a test user",
+                         UserStatusEnums.ACTIVE)
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+        self.upload(response.json["upload"])
+        db.session.get(Listing, self.l1_id).owner_id = u2.id
+        db.session.commit()
+
+        response = self.post(f"{uploads_root}/{response.json['upload_intent']['id']}/confirm", self.u1_id)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 0)
+
+    def test_confirm_twice(self):
+        response = self.post(f"{uploads_root}/listing_images/{self.l1_id}", self.u1_id,
+                             json={"content_type": "image/jpeg"})
+        upload_intent_id = response.json["upload_intent"]["id"]
+        self.upload(response.json["upload"])
+
+        self.assertEqual(self.post(f"{uploads_root}/{upload_intent_id}/confirm", self.u1_id).status_code, 201)
+        self.assertEqual(self.post(f"{uploads_root}/{upload_intent_id}/confirm", self.u1_id).status_code, 409)
+        self.assertEqual(len(db.session.get(Listing, self.l1_id).images), 1)
@@ -1,16 +1,41 @@
 """User Image Routes"""
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.exceptions import abort
+from werkzeug.exceptions import HTTPException, abort
 
-from mnb_backend.api_helpers import aws_delete_image, aws_upload_image, db_add_user_image
+from mnb_backend.api_helpers import aws_delete_image, aws_put_image, db_add_user_image
+from mnb_backend.cache import invalidate
 from mnb_backend.database import db
+from mnb_backend.errors import UploadError
+from mnb_backend.images.blobs import add_blob_references, get_blob_url, release_blob
+from mnb_backend.images.jobs import enqueue_make_renditions
+from mnb_backend.uploads.ingest import ingest_upload
 from mnb_backend.user_images.models import UserImage
 from mnb_backend.users.models import User
 
 user_images_routes = Blueprint('user_images_routes', __name__)
 
 
+def ingest_profile_image(profile_image):
+    """ Reads an uploaded profile image into an IngestedFile, aborts with 413 or 415 if it's rejected. """
+
+    try:
+        return ingest_upload(profile_image)
+    except UploadError as error:
+        abort(error.status_code, description=str(error))
+
+
+def store_profile_image(image_file):
+    """ Takes a reference to the blob of an ingested profile image, uploading it if it isn't stored yet. Returns the
+    blob, aborts with 502 if the upload failed. """
+
+    [(image_file, blob, error)] = add_blob_references([image_file], aws_put_image)
+    if error is not None:
+        abort(502, description="Failed to upload image")
+
+    return blob
+
+
 # region User Image Endpoints Start
 
 @user_images_routes.post("/")
@@ -24,8 +49,10 @@ def add_user_image():
     profile_image = request.files.get("profile_image")
     if profile_image is not None:
 
-        image_url = aws_upload_image(profile_image)
-        image_element = db_add_user_image(current_user_id, image_url)
+        with ingest_profile_image(profile_image) as image_file:
+            blob = store_profile_image(image_file)
+        image_element = db_add_user_image(current_user_id, get_blob_url(blob), blob)
+        invalidate(('users', current_user_id))
         image = UserImage.query.get_or_404(image_element.id)
 
         return jsonify(user_image=image.serialize()), 201
@@ -44,7 +71,7 @@ def get_current_user_image():
     user = User.query.get_or_404(current_user_id)
     user_image = user.profile_image
 
-    return jsonify(user_image=user_image.serialize()), 200
+    return jsonify(user_image=user_image.serialize(rendition='card')), 200
 
 
 @user_images_routes.patch("/current/")
@@ -54,29 +81,44 @@ def update_user_image():
     Returns JSON like:
         {user_image: {user_image_uid, image_url, user_uid}}"""
 
+    profile_image = request.files.get("profile_image")
+    image_file = ingest_profile_image(profile_image) if profile_image is not None else None
+
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get_or_404(current_user_id)
         user_image = user.profile_image
 
         if user.id == user_image.user.id:
-            profile_image = request.files.get("profile_image")
-
-            if user_image is not None:
-                aws_delete_image(user_image.image_url)
-
-            if profile_image is not None:
-                image_url = aws_upload_image(profile_image)
-                user_image.image_url = image_url
+            if image_file is not None:
+                blob = store_profile_image(image_file)
+                old_blob_id = user_image.blob_id
+                if old_blob_id is None:
+                    aws_delete_image(user_image.image_url)
+
+                user_image.image_url = get_blob_url(blob)
+                user_image.blob = blob
+                user_image.renditions = blob.renditions
+                if old_blob_id is not None:
+                    release_blob(db.session.connection(), old_blob_id)
+                if user_image.renditions is None:
+                    enqueue_make_renditions('user_image', user_image.id)
                 db.session.commit()
+                invalidate(('users', user.id))
 
                 return jsonify(user_image=user_image.serialize()), 200
 
         abort(401, "Not authorized")
 
+    except HTTPException:
+        # the 401, 404 and the 502 of a failed upload
+        raise
     except Exception as error:
         print("Error", error)
         abort(500, description="Failed to update image")
+    finally:
+        if image_file is not None:
+            image_file.close()
 
 
 
@@ -93,9 +135,12 @@ def delete_user_image():
         user_image = user.profile_image
 
         if user.id == user_image.user.id or user.is_admin:
-            aws_delete_image(user_image.image_url)
+            # images stored as a blob are deleted from storage once nothing references the blob
+            if user_image.blob_id is None:
+                aws_delete_image(user_image.image_url)
             db.session.delete(user_image)
             db.session.commit()
+            invalidate(('users', user.id))
 
             return jsonify(user=user.serialize(), user_profile_image=user.profile_image), 200
 
@@ -2,6 +2,7 @@
 
 import unittest
 from io import BytesIO
+from unittest.mock import patch
 
 from flask_jwt_extended import create_access_token
 
@@ -11,6 +12,7 @@ from mnb_backend.enums import UserStatusEnums
 from mnb_backend.users.models import User
 from mnb_backend.user_images.models import UserImage
 from mnb_backend.user_images.tests.setup import UserModelTestCase
+from mnb_backend.test_setup_helpers import TEST_JPEG_BYTES
 
 """
 Code Analysis
@@ -55,7 +57,7 @@ class TestAddUserImage(UserModelTestCase):
         access_token = create_access_token(identity=u1.id)
 
         # create a test image file
-        test_image = BytesIO(b"test image data")
+        test_image = BytesIO(TEST_JPEG_BYTES)
         test_image.name = "test_image.jpg"
 
         # make a request to add the user image
@@ -75,7 +77,7 @@ class TestAddUserImage(UserModelTestCase):
         """Tests that an unauthenticated user cannot upload a profile image and receives an error response."""
 
         # create a test image file
-        test_image = BytesIO(b"test image data")
+        test_image = BytesIO(TEST_JPEG_BYTES)
         test_image.name = "test_image.jpg"
 
         # make a request to add the user image without authentication
@@ -96,7 +98,7 @@ class TestGetCurrentUserImage(UserModelTestCase):
         access_token = create_access_token(identity=u1.id)
 
         # create a test image file
-        test_image = BytesIO(b"test image data")
+        test_image = BytesIO(TEST_JPEG_BYTES)
         test_image.name = "test_image.jpg"
 
         # make a request to add the user image
@@ -123,7 +125,7 @@ class TestUpdateUserImage(UserModelTestCase):
         access_token = create_access_token(identity=u1.id)
 
         # create a test image file
-        test_image = BytesIO(b"test image data")
+        test_image = BytesIO(TEST_JPEG_BYTES)
         test_image.name = "test_image.jpg"
 
         # make a request to add the user image
@@ -132,7 +134,7 @@ class TestUpdateUserImage(UserModelTestCase):
                                         data={"profile_image": test_image})
 
             # create a test image file
-            test_image = BytesIO(b"test image data")
+            test_image = BytesIO(TEST_JPEG_BYTES)
             test_image.name = "test_image.jpg"
 
             response = client.patch("/api/user_images/current/", headers={"Authorization": f"Bearer {access_token}"},
@@ -145,6 +147,24 @@ class TestUpdateUserImage(UserModelTestCase):
             self.assertIn("image_url", response.json["user_image"])
             self.assertIn("user_id", response.json["user_image"])
 
+    def test_update_user_image_failed_upload(self):
+        access_token = create_access_token(identity=self.u1_id)
+
+        with app.test_client() as client:
+            test_image = BytesIO(TEST_JPEG_BYTES)
+            test_image.name = "test_image.jpg"
+            client.post("/api/user_images/", headers={"Authorization": f"Bearer {access_token}"},
+                        data={"profile_image": test_image})
+
+            test_image = BytesIO(TEST_JPEG_BYTES + b"other contents")
+            test_image.name = "test_image.jpg"
+            with patch("mnb_backend.user_images.routes.aws_put_image", side_effect=ConnectionError("S3 unavailable")):
+                response = client.patch("/api/user_images/current/",
+                                        headers={"Authorization": f"Bearer {access_token}"},
+                                        data={"profile_image": test_image})
+
+        self.assertEqual(response.status_code, 502)
+
 
 class TestDeleteUserImage(UserModelTestCase):
     def test_delete_user_image_happy(self):
@@ -155,7 +175,7 @@ class TestDeleteUserImage(UserModelTestCase):
         access_token = create_access_token(identity=u1.id)
 
         # create a test image file
-        test_image = BytesIO(b"test image data")
+        test_image = BytesIO(TEST_JPEG_BYTES)
         test_image.name = "test_image.jpg"
 
         # make a request to add the user image
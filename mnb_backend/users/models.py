@@ -1,14 +1,19 @@
 """Models for Users"""
+from datetime import datetime
+
 from flask_bcrypt import Bcrypt
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
+from mnb_backend.addresses.models import Address
 from mnb_backend.database import db
 
-from mnb_backend.enums import UserStatusEnums, enum_serializer
-from sqlalchemy import Enum as SQLAlchemyEnum
+from mnb_backend.enums import UserStatusEnums
+from sqlalchemy import Enum as SQLAlchemyEnum, select
 
 from mnb_backend.auth.auth_helpers import is_valid_name, is_valid_email
 from mnb_backend.errors import EmailAlreadyExistsError
+from mnb_backend.serializers import Embed, Serializer
 
 bcrypt = Bcrypt()
 
@@ -76,6 +81,15 @@ class User(db.Model):
         default=5.0
     )
 
+    # bumped on every change, and when their address or profile image changes, see
+    # mnb_backend/conditional.py
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
     profile_image = db.relationship('UserImage', back_populates='user', uselist=False, lazy=True, cascade='delete')
 
     listings = db.relationship('Listing', back_populates='owner', uselist=True, lazy=True, cascade='delete')
@@ -88,28 +102,39 @@ class User(db.Model):
     received_messages = db.relationship('Message', back_populates='recipient', foreign_keys='Message.recipient_uid',
                                         lazy=True, uselist=True, cascade='delete')
 
-    def serialize(self):
-        """ returns self """
-
-        # TODO: check out marshmellow suggested by David for serializing:
-        #  https://flask-marshmallow.readthedocs.io/en/latest/
-
-        address_serialized = self.address.serialize() if self.address else None
-        user_image_serialized = self.profile_image.serialize() if self.profile_image else None
-
-        return {
-            "id": self.id,
-            "status": enum_serializer(self.status),
-            "email": self.email,
-            "firstname": self.firstname,
-            "lastname": self.lastname,
-            "about_me": self.about_me,
-            "is_admin": self.is_admin,
-            "preferred_trade_location": self.preferred_trade_location,
-            "user_rating": self.user_rating,
-            "user_image": user_image_serialized,
-            "address": address_serialized
-        }
+    serialize = Serializer(
+        'id',
+        'status',
+        'email',
+        'firstname',
+        'lastname',
+        'about_me',
+        'is_admin',
+        'preferred_trade_location',
+        'user_rating',
+        Embed('user_image', 'profile_image'),
+        Embed('address'),
+    )
+
+    @classmethod
+    def serialization_plan(cls):
+        """ Loader options for everything serialize() touches, so a query can load it in one round trip """
+
+        return (
+            joinedload(cls.address).options(*Address.serialization_plan()),
+            joinedload(cls.profile_image),
+        )
+
+    def version(self):
+        """ updated_at of this row and of the rows serialize() embeds, see mnb_backend/conditional.py """
+
+        return (self.updated_at,)
+
+    @classmethod
+    def select_version(cls, user_id):
+        """ Select of version() of a user, without loading it """
+
+        return select(cls.updated_at).where(cls.id == user_id)
 
     @classmethod
     def signup(cls, email, password, firstname, lastname, about_me, status, is_admin=False):
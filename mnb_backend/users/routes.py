@@ -2,12 +2,17 @@
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
 from mnb_backend.api_helpers import upload_to_aws
+from mnb_backend.cache import get_response_cache, invalidate
+from mnb_backend.conditional import conditional_list, get_validators_or_404, not_modified, with_validators
 from mnb_backend.database import db
 from mnb_backend.decorators import admin_required
 from mnb_backend.enums import UserStatusEnums
+from mnb_backend.pagination import paginate
+from mnb_backend.projections import get_projection
 from mnb_backend.user_images.models import UserImage
 from mnb_backend.users.models import User
 from mnb_backend.auth.auth_helpers import is_valid_name, is_valid_email
@@ -106,31 +111,49 @@ def create_admin_user():
 
 @user_routes.get("/")
 def list_users():
-    """Return all users in system.
+    """Return users in system, in id order. Paginate with limit and the cursor returned as next_cursor. Narrow with
+    ?fields= and ?embed=, see mnb_backend/projections.py.
 
     Returns JSON like:
         {users: [{user_uid, email, status, firstname, lastname, image_url,
-        location, books, reservations}, ...]}
+        location, books, reservations}, ...], next_cursor}
     """
 
-    users = User.query.all()
+    projection = get_projection(User, request.args)
+    users, next_cursor = paginate(select(User).options(*projection.loader_options()), [User.id], request.args)
 
-    serialized = [user.serialize() for user in users]
+    etag, last_modified = conditional_list('users', users, next_cursor, projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
 
-    return jsonify(users=serialized)
+    serialized = [projection.serialize(user) for user in users]
+
+    return with_validators(jsonify(users=serialized, next_cursor=next_cursor), etag, last_modified)
 
 
 @user_routes.get('/<int:user_uid>')
 def show_user(user_uid):
-    """Show user profile.
+    """Show user profile. Served from the response cache. Sends an ETag and answers a matching If-None-Match with
+    304 Not Modified. Narrow with ?fields= and ?embed=, see mnb_backend/projections.py.
 
     Returns JSON like:
         {user: user_uid, email, image_url, firstname, lastname, address, owned_books, reservations}
     """
-    user = User.query.get_or_404(user_uid)
-    user = user.serialize()
 
-    return jsonify(user=user)
+    projection = get_projection(User, request.args)
+    etag, last_modified = get_validators_or_404('users', user_uid, User.select_version(user_uid), projection)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    def load():
+        user = User.query.options(*projection.loader_options()).get_or_404(user_uid)
+        return projection.serialize(user), [('users', user_uid)]
+
+    user = get_response_cache().get(('users', user_uid, etag), load)
+
+    return with_validators(jsonify(user=user), etag, last_modified)
 
 
 @user_routes.patch('/<int:user_uid>')
@@ -162,6 +185,7 @@ def update_user(user_uid):
 
         db.session.add(user)
         db.session.commit()
+        invalidate(('users', user.id))
 
         return jsonify(user=user.serialize()), 200
 
@@ -190,6 +214,7 @@ def toggle_user_status(user_uid):
 
         db.session.add(user)
         db.session.commit()
+        invalidate(('users', user.id))
 
         return jsonify(user=user.serialize()), 200
 
@@ -211,6 +236,7 @@ def delete_user(user_uid):
     current_user = User.query.get_or_404(current_user_id)
     db.session.delete(user_to_delete)
     db.session.commit()
+    invalidate(('users', user_uid))
 
     return jsonify("User successfully deleted"), 200
 
@@ -201,6 +201,21 @@ class UserListShowTestCase(UserBaseViewTestCase):
             self.assertIsInstance(data['users'], list)
             self.assertEqual(len(data['users']), 10)
 
+    def test_list_users_paginates_with_cursor(self):
+        with app.test_client() as client:
+            for i in string.ascii_lowercase[:5]:
+                User.signup(f'user{i}@example.com', 'password', f'firstname{i}', f'lastname{i}', 'I am a test user',
+                            UserStatusEnums.ACTIVE)
+            user_ids = [user.id for user in User.query.order_by(User.id)]
+
+            first_page = client.get('/api/users/', query_string={"limit": 3}).get_json()
+            second_page = client.get('/api/users/', query_string={"limit": 3, "cursor": first_page["next_cursor"]})
+            second_page = second_page.get_json()
+
+            self.assertEqual([user["id"] for user in first_page["users"]], user_ids[:3])
+            self.assertEqual([user["id"] for user in second_page["users"]], user_ids[3:6])
+            self.assertEqual(client.get('/api/users/', query_string={"cursor": "bad"}).status_code, 400)
+
 
 class ShowSpecificUserTestCase(UserBaseViewTestCase):
 
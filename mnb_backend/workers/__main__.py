@@ -0,0 +1,36 @@
+"""Runs the background job worker.
+
+    python -m mnb_backend.workers [--batch-size 50] [--poll-interval 5] [--kind geocode_location] [--once]
+"""
+
+import argparse
+import logging
+
+from mnb_backend import app
+from mnb_backend.images.jobs import get_image_pool
+from mnb_backend.workers.worker import HANDLERS, run_forever, run_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--poll-interval', type=float, default=5, help="seconds to sleep when there are no jobs")
+    parser.add_argument('--kind', action='append', choices=sorted(HANDLERS), dest='kinds',
+                        help="only run jobs of this kind, can be repeated")
+    parser.add_argument('--once', action='store_true', help="run a single batch and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    with app.app_context():
+        # start the image processes before anything else starts threads
+        get_image_pool()
+
+        if args.once:
+            print(f"ran {run_once(args.batch_size, args.kinds)} jobs")
+        else:
+            run_forever(args.batch_size, args.poll_interval, args.kinds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Model for Job"""
+from datetime import datetime
+
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy.dialects.postgresql import JSONB
+
+from mnb_backend.database import db
+from mnb_backend.enums import JobStatusEnum
+
+
+# region Job
+class Job(db.Model):
+    """ Background job waiting for, or taken by, a worker. """
+
+    __tablename__ = 'jobs'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    kind = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    payload = db.Column(
+        JSONB,
+        nullable=False,
+    )
+
+    status = db.Column(
+        SQLAlchemyEnum(JobStatusEnum, name='job_status_enum'),
+        nullable=False,
+        default=JobStatusEnum.PENDING,
+    )
+
+    attempts = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+    )
+
+    max_attempts = db.Column(
+        db.Integer,
+        nullable=False,
+        default=5,
+    )
+
+    # not picked up before this time, pushed back after each failed attempt
+    run_after = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    # when a worker claimed the job, a RUNNING job claimed too long ago is taken over by another worker
+    locked_at = db.Column(
+        db.DateTime,
+        nullable=True,
+    )
+
+    last_error = db.Column(
+        db.Text,
+        nullable=True,
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f"< Job #{self.id}, Kind: {self.kind}, Status: {self.status}, Attempts: {self.attempts} >"
+
+# endregion
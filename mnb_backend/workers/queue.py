@@ -0,0 +1,105 @@
+"""Database backed job queue.
+
+Jobs are rows in the jobs table. Workers claim a batch with SELECT ... FOR UPDATE SKIP LOCKED, so any number of them
+can poll the table without handing the same job out twice. A job whose worker died is claimed again once its lease
+runs out. A failed job is retried with exponential backoff until it runs out of attempts.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+from mnb_backend.database import db
+from mnb_backend.enums import JobStatusEnum
+from mnb_backend.workers.models import Job
+
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def enqueue(kind, payload, max_attempts=5, run_after=None):
+    """
+    Adds a job to the session, so it is committed together with whatever the caller is writing."""
+
+    job = Job(kind=kind, payload=payload, max_attempts=max_attempts, run_after=run_after or datetime.utcnow())
+    db.session.add(job)
+
+    return job
+
+
+def claim_jobs(batch_size, kinds=None, now=None):
+    """
+    Claims up to batch_size jobs that are due, oldest first, and commits the claim.
+
+    Returns rows with id, kind, payload, attempts and max_attempts. attempts already counts this run."""
+
+    now = now or datetime.utcnow()
+
+    claimable = select(Job.id) \
+        .where(or_(
+            and_(Job.status == JobStatusEnum.PENDING, Job.run_after <= now),
+            and_(Job.status == JobStatusEnum.RUNNING, Job.locked_at < now - timedelta(seconds=LEASE_SECONDS)),
+        )) \
+        .order_by(Job.run_after) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True)
+
+    if kinds is not None:
+        claimable = claimable.where(Job.kind.in_(kinds))
+
+    stmt = update(Job) \
+        .where(Job.id.in_(claimable.scalar_subquery())) \
+        .values(status=JobStatusEnum.RUNNING, locked_at=now, attempts=Job.attempts + 1) \
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+
+    jobs = db.session.execute(stmt).all()
+    db.session.commit()
+
+    return sorted(jobs, key=lambda job: job.id)
+
+
+def get_retry_delay(attempts):
+    """
+    Seconds to wait before retrying a job that has failed attempts times."""
+
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def mark_done(job_ids):
+    """
+    Marks claimed jobs as done. Doesn't commit."""
+
+    if job_ids:
+        db.session.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids))
+            .values(status=JobStatusEnum.DONE, locked_at=None, last_error=None)
+        )
+
+
+def mark_failed(job, error, now=None):
+    """
+    Puts a claimed job back in the queue after a backoff, or marks it FAILED when it has no attempts left.
+    Doesn't commit."""
+
+    now = now or datetime.utcnow()
+
+    if is_last_attempt(job):
+        values = {'status': JobStatusEnum.FAILED}
+    else:
+        values = {'status': JobStatusEnum.PENDING,
+                  'run_after': now + timedelta(seconds=get_retry_delay(job.attempts))}
+
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job.id)
+        .values(locked_at=None, last_error=str(error), **values)
+    )
+
+
+def is_last_attempt(job):
+    """
+    Whether a failure of this claimed job will be final."""
+
+    return job.attempts >= job.max_attempts
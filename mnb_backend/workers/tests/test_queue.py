@@ -0,0 +1,82 @@
+"""test file for the job queue and worker"""
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from mnb_backend.database import db
+from mnb_backend.enums import JobStatusEnum
+from mnb_backend.test_setup_helpers import delete_all_tables
+from mnb_backend.workers.models import Job
+from mnb_backend.workers.queue import LEASE_SECONDS, RETRY_BASE_SECONDS, claim_jobs, enqueue, get_retry_delay
+from mnb_backend.workers.worker import run_once
+
+db.drop_all()
+db.create_all()
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        delete_all_tables(self)
+
+        job1 = enqueue("test", {"n": 1})
+        job2 = enqueue("test", {"n": 2}, max_attempts=1)
+        job3 = enqueue("test", {"n": 3}, run_after=datetime.utcnow() + timedelta(hours=1))
+        db.session.commit()
+
+        self.job1_id = job1.id
+        self.job2_id = job2.id
+        self.job3_id = job3.id
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def test_claim_jobs_takes_due_jobs_once(self):
+        jobs = claim_jobs(10)
+
+        self.assertEqual([job.id for job in jobs], [self.job1_id, self.job2_id])
+        self.assertEqual([job.attempts for job in jobs], [1, 1])
+        self.assertEqual(db.session.get(Job, self.job1_id).status, JobStatusEnum.RUNNING)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_claim_jobs_respects_batch_size_and_kinds(self):
+        self.assertEqual([job.id for job in claim_jobs(1)], [self.job1_id])
+        self.assertEqual(claim_jobs(10, kinds=["other"]), [])
+
+    def test_claim_jobs_takes_over_expired_lease(self):
+        claim_jobs(10)
+
+        jobs = claim_jobs(10, now=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS + 1))
+
+        self.assertEqual([job.id for job in jobs], [self.job1_id, self.job2_id])
+        self.assertEqual([job.attempts for job in jobs], [2, 2])
+
+    def test_get_retry_delay_backs_off_exponentially(self):
+        self.assertEqual([get_retry_delay(attempts) for attempts in (1, 2, 3)],
+                         [RETRY_BASE_SECONDS, RETRY_BASE_SECONDS * 2, RETRY_BASE_SECONDS * 4])
+        self.assertEqual(get_retry_delay(100), 3600)
+
+    def test_run_once_records_outcomes(self):
+        def handler(jobs):
+            return {job.id: ValueError("boom") for job in jobs if job.payload["n"] != 1}
+
+        with patch.dict("mnb_backend.workers.worker.HANDLERS", {"test": handler}):
+            self.assertEqual(run_once(), 2)
+
+        job1 = db.session.get(Job, self.job1_id)
+        job2 = db.session.get(Job, self.job2_id)
+        self.assertEqual(job1.status, JobStatusEnum.DONE)
+        self.assertEqual(job2.status, JobStatusEnum.FAILED)
+        self.assertEqual(job2.last_error, "boom")
+
+    def test_run_once_retries_with_backoff(self):
+        def handler(jobs):
+            raise ValueError("geocoder down")
+
+        with patch.dict("mnb_backend.workers.worker.HANDLERS", {"test": handler}):
+            run_once()
+
+        job1 = db.session.get(Job, self.job1_id)
+        self.assertEqual(job1.status, JobStatusEnum.PENDING)
+        self.assertEqual(job1.last_error, "geocoder down")
+        self.assertGreater(job1.run_after, datetime.utcnow() + timedelta(seconds=RETRY_BASE_SECONDS - 5))
+        self.assertEqual(db.session.get(Job, self.job2_id).status, JobStatusEnum.FAILED)
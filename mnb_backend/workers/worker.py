@@ -0,0 +1,58 @@
+"""Worker loop: claims jobs, hands them to their handler, records the outcome."""
+
+import logging
+import time
+from itertools import groupby
+
+from mnb_backend.database import db
+from mnb_backend.geocoding.jobs import GEOCODE_LOCATION, geocode_locations
+from mnb_backend.images.blobs import DELETE_BLOB, delete_blobs
+from mnb_backend.images.jobs import MAKE_RENDITIONS, make_renditions_batch
+from mnb_backend.workers.queue import claim_jobs, mark_done, mark_failed
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler. A handler takes a list of claimed jobs of its kind, writes its results to the session and returns
+# {job id: error} for the jobs that failed. The worker commits the results and the job outcomes together.
+HANDLERS = {
+    GEOCODE_LOCATION: geocode_locations,
+    MAKE_RENDITIONS: make_renditions_batch,
+    DELETE_BLOB: delete_blobs,
+}
+
+
+def run_once(batch_size=50, kinds=None):
+    """
+    Claims and runs one batch of due jobs. Returns the number of jobs claimed."""
+
+    jobs = claim_jobs(batch_size, kinds=kinds or list(HANDLERS))
+
+    for kind, kind_jobs in groupby(sorted(jobs, key=lambda job: job.kind), key=lambda job: job.kind):
+        kind_jobs = list(kind_jobs)
+
+        try:
+            failures = HANDLERS[kind](kind_jobs)
+        except Exception as error:
+            logger.exception("%s batch failed", kind)
+            db.session.rollback()
+            failures = {job.id: error for job in kind_jobs}
+
+        for job in kind_jobs:
+            if job.id in failures:
+                logger.warning("%s job %s failed (attempt %s/%s): %s", kind, job.id, job.attempts,
+                               job.max_attempts, failures[job.id])
+                mark_failed(job, failures[job.id])
+
+        mark_done([job.id for job in kind_jobs if job.id not in failures])
+        db.session.commit()
+
+    return len(jobs)
+
+
+def run_forever(batch_size=50, poll_interval=5, kinds=None):
+    """
+    Runs batches until interrupted, sleeping poll_interval seconds whenever the queue is empty."""
+
+    while True:
+        if run_once(batch_size, kinds) == 0:
+            time.sleep(poll_interval)